@@ -16,16 +16,22 @@ mkdir -p /tmp
 
 # Copy database to tmp (for Vercel)
 echo "🗃️ Setting up database..."
-if [ -f "db.sqlite3" ]; then
-    cp db.sqlite3 /tmp/db.sqlite3
-else
-    # Create empty database if it doesn't exist
-    python3 manage.py migrate --noinput
-    cp db.sqlite3 /tmp/db.sqlite3
-fi
+# Apply pending migrations (creates db.sqlite3 if it doesn't exist)
+python3 manage.py migrate --noinput
+# Fold any WAL back into the file: the deployed copy is opened read-only
+python3 -c "import sqlite3; sqlite3.connect('db.sqlite3').execute('PRAGMA journal_mode = DELETE')"
+cp db.sqlite3 /tmp/db.sqlite3
+
+# Bundle the templates' inline CSS/JS (collectstatic hashes and compresses the bundles)
+echo "📦 Building page assets..."
+python3 manage.py build_assets
 
 # Collect static files
 echo "🎨 Collecting static files..."
 python3 manage.py collectstatic --noinput --clear
 
+# Last, after every write: public workers serve the students pages from it
+echo "📸 Building the Students snapshot..."
+python3 manage.py build_snapshot
+
 echo "✅ Build process completed successfully!"
@@ -5,14 +5,14 @@ import sys
 path = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, path)
 
-# Set Django settings
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings.production')
+# Public pages run with the slim settings: no admin/auth/sessions/messages
+# apps are imported on a cold start. /admin/ is routed to index_admin.py.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings.public')
+os.environ.setdefault('DJANGO_ENV', 'public')
+# The public pages only read: open the deployed database as immutable
+os.environ.setdefault('SQLITE_READ_ONLY', 'True')
 
-# Django setup
-import django
-django.setup()
-
-# Import Django WSGI application
+# Import Django WSGI application (runs django.setup())
 from django.core.wsgi import get_wsgi_application
 
 # Create WSGI application
@@ -0,0 +1,31 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Add project to Python path
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path)
+
+# Admin entry point: full production settings with the admin stack
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings.production')
+os.environ.setdefault('DJANGO_ENV', 'production')
+# The admin and the batch API write, so never the immutable profile
+os.environ.setdefault('SQLITE_READ_ONLY', 'False')
+# Vercel's filesystem is read-only apart from the temporary directory:
+# writes go to a copy of the deployed database there, which lasts as
+# long as the function instance
+if 'SQLITE_PATH' not in os.environ and not os.access(path, os.W_OK):
+    database = os.path.join(tempfile.gettempdir(), 'db.sqlite3')
+    if not os.path.exists(database):
+        shutil.copyfile(os.path.join(path, 'db.sqlite3'), database)
+    os.environ['SQLITE_PATH'] = database
+
+# Import Django WSGI application (runs django.setup())
+from django.core.wsgi import get_wsgi_application
+
+# Create WSGI application
+application = get_wsgi_application()
+
+# Export for Vercel (this is what Vercel looks for)
+app = application
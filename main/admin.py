@@ -1,15 +1,122 @@
-from django.contrib import admin
-from .models import Students
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+from .bulk import delete_students, update_prefix
+from .models import PREFIX_CHOICES, ContactMessage, Project, SiteConfiguration, Skill, Students
+from .pagination import keyset_paginate
+from .search import search_students
+from .stats import get_student_stats
 
 # Register your models here.
 
-# Students Admin
+KEYSET_VARS = ('after', 'before')
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StudentRangeFilter(admin.SimpleListFilter):
+    title = 'ช่วงรหัสนักเรียน'
+    parameter_name = 'student_range'
+
+    def lookups(self, request, model_admin):
+        # From the materialized statistics, not a GROUP BY over the table
+        return [
+            (str(group['start']), f"{group['start']}–{group['end']}")
+            for group in get_student_stats()['by_range']
+        ]
+
+    def queryset(self, request, queryset):
+        start = _int_or_none(self.value())
+        if start is None:
+            return queryset
+        return queryset.filter(student_id__gte=start, student_id__lt=start + settings.STUDENT_STATS_RANGE_SIZE)
+
+
+class StudentsChangeList(ChangeList):
+    """
+    Counts from the statistics table (or a capped COUNT) and keyset pages
+    on student_id (?after=/?before=) instead of COUNT(*) and OFFSET.
+    """
+
+    def estimate_count(self):
+        """Return ``(count, capped)`` without counting the whole table."""
+        filters = self.get_filters_params()
+        if not self.query:
+            stats = get_student_stats()
+            if not filters:
+                return stats['total'], False
+            if filters.keys() == {'name_prefix__exact'}:
+                prefix = filters['name_prefix__exact'][-1]
+                return next((group['count'] for group in stats['by_prefix'] if group['name_prefix'] == prefix), 0), False
+            if filters.keys() == {StudentRangeFilter.parameter_name}:
+                start = _int_or_none(filters[StudentRangeFilter.parameter_name][-1])
+                return next((group['count'] for group in stats['by_range'] if group['start'] == start), 0), False
+        limit = settings.ADMIN_COUNT_LIMIT
+        count = self.queryset.order_by()[:limit + 1].count()
+        return min(count, limit), count > limit
+
+    def get_results(self, request):
+        self.result_count, self.count_is_capped = self.estimate_count()
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.can_show_all = self.result_count <= self.list_max_show_all and not self.count_is_capped
+        # Only for the admin pagination tag; the count is preset so it never queries
+        self.paginator = Paginator(self.queryset, self.list_per_page)
+        self.paginator.count = self.result_count
+        self.keyset_page = None
+
+        if self.show_all and self.can_show_all:
+            self.result_list = self.queryset._clone()
+            self.multi_page = False
+            return
+        cursors = getattr(request, 'keyset_cursors', {})
+        self.keyset_page = keyset_paginate(
+            self.queryset, 'student_id',
+            after=cursors.get('after'), before=cursors.get('before'),
+            page_size=self.list_per_page,
+        )
+        self.result_list = self.keyset_page.object_list
+        self.multi_page = self.keyset_page.has_next or self.keyset_page.has_previous
+
+    @property
+    def next_url(self):
+        return self.get_query_string({'after': self.keyset_page.next_cursor})
+
+    @property
+    def previous_url(self):
+        return self.get_query_string({'before': self.keyset_page.previous_cursor})
+
+
+def _set_prefix_action(index, prefix):
+    def set_prefix(modeladmin, request, queryset):
+        updated = update_prefix(queryset, prefix, settings.ADMIN_BULK_CHUNK_SIZE)
+        modeladmin.message_user(request, f'เปลี่ยนคำนำหน้าเป็น "{prefix}" แล้ว {updated:,} คน', messages.SUCCESS)
+
+    set_prefix.__name__ = f'set_prefix_{index}'
+    return admin.action(description=f'เปลี่ยนคำนำหน้าเป็น "{prefix}"', permissions=['change'])(set_prefix)
+
+
+# Students Admin - stays fast with millions of rows: no COUNT(*) or OFFSET,
+# indexed filters and search, and bulk actions as chunked UPDATE/DELETE
 @admin.register(Students)
 class StudentsAdmin(admin.ModelAdmin):
     list_display = ('student_id', 'name_prefix', 'first_name', 'last_name')
-    list_filter = ('name_prefix',)
+    list_filter = ('name_prefix', StudentRangeFilter)
     search_fields = ('student_id', 'first_name', 'last_name')
     ordering = ('student_id',)
+    sortable_by = ()  # keyset pages follow student_id
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    actions = ['delete_in_chunks', *(_set_prefix_action(index, value) for index, (value, _) in enumerate(PREFIX_CHOICES))]
     
     fieldsets = (
         ('ข้อมูลนักเรียน', {
@@ -17,6 +124,77 @@ class StudentsAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the trigram index instead of LIKE '%term%' table scans
+        return search_students(queryset, search_term), False
+
+    def get_changelist(self, request, **kwargs):
+        return StudentsChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # The keyset cursors are not lookups: keep them out of the filters
+        request.GET = request.GET.copy()
+        request.keyset_cursors = {
+            name: _int_or_none(request.GET.pop(name, [None])[-1]) for name in KEYSET_VARS
+        }
+        return super().changelist_view(request, extra_context)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # delete_selected loads (and lists) every selected object
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='ลบนักเรียนที่เลือก (ทีละชุด)', permissions=['delete'])
+    def delete_in_chunks(self, request, queryset):
+        if request.POST.get('post') != 'yes':
+            limit = settings.ADMIN_COUNT_LIMIT
+            count = queryset.order_by()[:limit + 1].count()
+            return TemplateResponse(request, 'admin/main/students/delete_in_chunks.html', {
+                **self.admin_site.each_context(request),
+                'title': 'ยืนยันการลบนักเรียน',
+                'opts': self.model._meta,
+                'count': min(count, limit),
+                'count_is_capped': count > limit,
+                'chunk_size': settings.ADMIN_BULK_CHUNK_SIZE,
+                'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+                'select_across': request.POST.get('select_across', '0'),
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                'media': self.media,
+            })
+        deleted = delete_students(queryset, settings.ADMIN_BULK_CHUNK_SIZE)
+        self.message_user(request, f'ลบนักเรียนแล้ว {deleted:,} คน', messages.SUCCESS)
+
+# Contact Messages Admin
+@admin.register(ContactMessage)
+class ContactMessageAdmin(admin.ModelAdmin):
+    list_display = ('name', 'lastname', 'email', 'created_at')
+    search_fields = ('name', 'lastname', 'email')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('created_at',)
+
+# Skills Admin
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'proficiency', 'is_featured', 'order')
+    list_filter = ('category', 'is_featured')
+    list_editable = ('proficiency', 'is_featured', 'order')
+    search_fields = ('name',)
+
+# Projects Admin
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    list_display = ('title', 'status', 'progress', 'is_featured', 'order', 'created_date')
+    list_filter = ('status', 'is_featured')
+    search_fields = ('title', 'short_description')
+    filter_horizontal = ('technologies',)
+
+# Site Configuration Admin (a single row)
+@admin.register(SiteConfiguration)
+class SiteConfigurationAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return not SiteConfiguration.objects.exists()
+
 # Customize admin site
 admin.site.site_header = '🎯 Portfolio Administration'
 admin.site.site_title = 'Portfolio Admin'
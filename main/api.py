@@ -0,0 +1,85 @@
+"""
+Students JSON API (``/api/students/``).
+
+Pages come from ``values_list`` and are dumped as they are: ``rows`` is
+an array of value arrays under a ``fields`` header, so no model instance,
+dict or serializer is built per row and ``json.dumps`` runs once per
+page. Pages are keyset cursors on ``student_id`` (``?after=``/``?before=``)
+and ``?fields=`` projects the columns.
+
+The ETag is the ``'students'`` page-cache tag version plus the request
+parameters, so it is known before any query: a matching
+``If-None-Match`` is answered 304 without touching the table. Bodies are
+kept in the page cache under the ETag (and their gzip/br encodings by
+the compression middleware), so until the next change of the students a
+page is read and encoded once; a 10k-row page read from SQLite takes
+longer than serving it from the cache. Workers with the build's snapshot
+(``main/snapshot.py``) read pages from it and use its version instead.
+"""
+
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from .models import Students
+from .page_cache import KEY_PREFIX, get_cache
+from .pagination import akeyset_paginate
+from .snapshot import get_snapshot
+
+KEY = 'student_id'
+
+
+def page_etag(version, fields, after, before, limit):
+    """Strong ETag of one page of the Students table at ``version``."""
+    params = f'{",".join(fields)}|{after}|{before}|{limit}'.encode()
+    digest = hashlib.blake2b(params, digest_size=8).hexdigest()
+    return f'"students-{version}-{digest}"'
+
+
+async def astudents_page(fields, after=None, before=None, limit=1000):
+    """``(rows, next_cursor, previous_cursor)`` with rows as ``fields`` tuples."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.page_rows(fields, after, before, limit)
+    columns = fields if KEY in fields else (KEY, *fields)
+    page = await akeyset_paginate(
+        Students.objects.values_list(*columns, named=True), KEY,
+        after=after, before=before, page_size=limit,
+    )
+    rows = page.object_list if columns is fields else [row[1:] for row in page.object_list]
+    return rows, page.next_cursor, page.previous_cursor
+
+
+def _link(path, cursor_name, cursor, fields, limit):
+    if cursor is None:
+        return None
+    return f'{path}?{urlencode({cursor_name: cursor, "fields": ",".join(fields), "limit": limit})}'
+
+
+def encode_students_page(path, fields, limit, rows, next_cursor, previous_cursor):
+    """The JSON body of one page, as bytes."""
+    return json.dumps(
+        {
+            'fields': fields,
+            'count': len(rows),
+            'next': _link(path, 'after', next_cursor, fields, limit),
+            'previous': _link(path, 'before', previous_cursor, fields, limit),
+            'rows': rows,
+        },
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+
+
+async def astudents_page_body(path, etag, fields, after=None, before=None, limit=1000):
+    """The body for ``etag``, from the page cache or read and encoded now."""
+    key = f'{KEY_PREFIX}:api:{etag.strip(chr(34))}'
+    body = get_cache().get(key) if settings.PAGE_CACHE_ENABLED else None
+    if body is None:
+        rows, next_cursor, previous_cursor = await astudents_page(fields, after, before, limit)
+        body = encode_students_page(path, fields, limit, rows, next_cursor, previous_cursor)
+        if settings.PAGE_CACHE_ENABLED:
+            get_cache().set(key, body, settings.PAGE_CACHE_TIMEOUT)
+    return body
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if settings.STUDENTS_SNAPSHOT:
+            # Map the snapshot on a cold start, not in the first request
+            from .snapshot import get_snapshot
+            get_snapshot()
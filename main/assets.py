@@ -0,0 +1,272 @@
+"""
+Build-time asset pipeline for the page templates.
+
+``build_page`` rewrites one template's source: every inline ``<style>``
+and ``<script>`` block without template syntax, and every local
+stylesheet or script loaded through ``{% static %}``, is minified into a
+content-named bundle under ``bundles/``. An inline stylesheet is replaced
+by the rules that style the page's first screen (``critical_css``),
+still inline, followed by its bundle loaded without blocking rendering.
+Linked stylesheets and scripts keep their tag, pointing at the bundle,
+so the cascade and the execution order are unchanged.
+
+The minifiers are deliberately conservative: strings are never touched,
+CSS keeps the spaces that separate selectors, and JavaScript keeps its
+line breaks so automatic semicolon insertion still applies.
+
+``manage.py build_assets`` writes the bundles and rewritten templates
+under ``ASSET_BUILD_ROOT``; collectstatic then hashes them and writes
+their gzip and Brotli variants for WhiteNoise.
+"""
+
+import hashlib
+import re
+
+BUNDLE_DIR = 'bundles'
+
+_STYLE_RE = re.compile(r'<style(?P<attrs>[^>]*)>(?P<body>.*?)</style>', re.S | re.I)
+_SCRIPT_RE = re.compile(r'<script(?P<attrs>[^>]*)>(?P<body>.*?)</script>', re.S | re.I)
+_STATIC_LINK_RE = re.compile(
+    r'<link\b(?=[^>]*\brel=["\']stylesheet["\'])[^>]*\bhref="\{%\s*static\s+[\'"](?P<path>[^\'"]+\.css)[\'"]\s*%\}"[^>]*>',
+    re.I,
+)
+_STATIC_SCRIPT_RE = re.compile(
+    r'<script\b[^>]*\bsrc="\{%\s*static\s+[\'"](?P<path>[^\'"]+\.js)[\'"]\s*%\}"[^>]*>\s*</script>',
+    re.I,
+)
+_TEMPLATE_SYNTAX_RE = re.compile(r'\{[{%#]')
+_LOAD_STATIC_RE = re.compile(r'\{%\s*load\s+[^%]*\bstatic\b[^%]*%\}')
+_EXTENDS_RE = re.compile(r'\{%\s*extends\s[^%]*%\}')
+# url() references that would break once the stylesheet moves to bundles/
+_RELATIVE_URL_RE = re.compile(r'url\((?!\s*[\'"]?\s*(?:[a-z][\w+.-]*:|/|#))', re.I)
+
+# Pseudo-classes that only apply after user interaction
+_STATE_PSEUDO_RE = re.compile(r':(hover|focus|focus-within|focus-visible|active|visited|checked|target)\b')
+_PSEUDO_RE = re.compile(r'::?[\w-]+(\([^)]*\))?')
+_SIMPLE_RE = re.compile(r'([.#]?)(-?[_a-zA-Z][\w-]*)')
+
+
+def _split_strings(source):
+    """Yield ``(is_string, text)`` pieces of CSS/JS source."""
+    start = index = 0
+    length = len(source)
+    while index < length:
+        char = source[index]
+        if char in '"\'`':
+            if index > start:
+                yield False, source[start:index]
+            end = index + 1
+            while end < length and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            yield True, source[index:end + 1]
+            start = index = end + 1
+        else:
+            index += 1
+    if start < length:
+        yield False, source[start:]
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    parts = []
+    for is_string, text in _split_strings(re.sub(r'/\*.*?\*/', '', source, flags=re.S)):
+        if not is_string:
+            text = re.sub(r'\s+', ' ', text)
+            text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+            text = re.sub(r':\s+', ':', text)
+            text = text.replace(';}', '}')
+        parts.append(text)
+    return ''.join(parts).strip()
+
+
+def _strip_js_comments(source):
+    """Remove comments from JavaScript, leaving string literals intact."""
+    out = []
+    index, length = 0, len(source)
+    while index < length:
+        char = source[index]
+        if char in '"\'`':
+            end = index + 1
+            while end < length and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[index:end + 1])
+            index = end + 1
+        elif source.startswith('/*', index):
+            end = source.find('*/', index + 2)
+            index = length if end < 0 else end + 2
+        elif source.startswith('//', index) and (not out or out[-1][-1:] in ' \t\r\n;{}(),'):
+            # Only a comment at a token boundary, so regex literals such
+            # as /https?:\/\// keep their slashes
+            end = source.find('\n', index)
+            index = length if end < 0 else end
+        else:
+            out.append(char)
+            index += 1
+    return ''.join(out)
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines; line breaks are kept."""
+    lines = (line.strip() for line in _strip_js_comments(source).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _fold_tokens(markup, fold_bytes):
+    """Tag names, classes and ids used in the first ``fold_bytes`` of <body>."""
+    body = markup.find('<body')
+    markup = markup[body if body >= 0 else 0:][:fold_bytes]
+    tags = {tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', markup)} | {'html', 'body'}
+    classes, ids = set(), set()
+    for value in re.findall(r'\bclass="([^"]*)"', markup):
+        classes.update(name for name in value.split() if not _TEMPLATE_SYNTAX_RE.search(name))
+    ids.update(re.findall(r'\bid="([^"{]*)"', markup))
+    return tags, classes, ids
+
+
+def _selector_matches(selector, tokens):
+    if _STATE_PSEUDO_RE.search(selector):
+        return False
+    tags, classes, ids = tokens
+    selector = re.sub(r'\[[^\]]*\]', ' ', _PSEUDO_RE.sub(' ', selector))
+    for prefix, name in _SIMPLE_RE.findall(selector):
+        found = classes if prefix == '.' else ids if prefix == '#' else tags
+        if (name.lower() if not prefix else name) not in found:
+            return False
+    return True
+
+
+def _blocks(css):
+    """Yield ``(prelude, body)`` for each top-level block of minified CSS."""
+    index = 0
+    while index < len(css):
+        brace = css.find('{', index)
+        if brace < 0:
+            return
+        prelude = css[index:brace].strip()
+        if prelude.startswith('@') and ';' in prelude:
+            # Statements such as @import or @charset before the block
+            prelude = prelude[prelude.rindex(';') + 1:].strip()
+        depth, end = 1, brace + 1
+        while depth and end < len(css):
+            depth += {'{': 1, '}': -1}.get(css[end], 0)
+            end += 1
+        yield prelude, css[brace + 1:end - 1]
+        index = end
+
+
+def _critical_rules(css, tokens):
+    kept, keyframes = [], {}
+    for prelude, body in _blocks(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = _critical_rules(body, tokens)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@keyframes') or prelude.startswith('@-webkit-keyframes'):
+            keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+        elif not prelude.startswith('@'):
+            if any(_selector_matches(selector, tokens) for selector in prelude.split(',')):
+                kept.append(f'{prelude}{{{body}}}')
+    used = ''.join(kept)
+    kept.extend(rule for name, rule in keyframes.items() if re.search(rf'\b{re.escape(name)}\b', used))
+    return ''.join(kept)
+
+
+def critical_css(css, markup, fold_bytes=8000):
+    """Rules of minified ``css`` that can style the first screen of ``markup``."""
+    return _critical_rules(css, _fold_tokens(markup, fold_bytes))
+
+
+def bundle_name(stem, content, extension):
+    digest = hashlib.blake2b(content.encode('utf-8'), digest_size=5).hexdigest()
+    return f'{BUNDLE_DIR}/{stem}.{digest}.{extension}'
+
+
+class PageBuild:
+    """The rewritten source of one template and the bundles it refers to."""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.output = source
+        self.bundles = {}  # bundle path -> minified content
+        self.inline_bytes = 0
+        self.critical_bytes = 0
+
+
+def _stylesheet_tags(path, critical):
+    url = "{% static '" + path + "' %}"
+    tags = f'<style>{critical}</style>' if critical else ''
+    return tags + (
+        f'<link rel="preload" href="{url}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        f'<noscript><link rel="stylesheet" href="{url}"></noscript>'
+    )
+
+
+def build_page(name, source, read_static, bundles=None, fold_bytes=8000):
+    """
+    Rewrite template ``source`` to load bundles instead of inline code.
+
+    ``read_static(path)`` returns a static file's text (or None when it
+    cannot be found, which leaves the tag alone). ``bundles`` maps
+    minified content to the bundle path already assigned to it, so pages
+    with identical blocks share one file.
+    """
+    page = PageBuild(name, source)
+    bundles = {} if bundles is None else bundles
+    stem = name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+
+    def add_bundle(content, extension, bundle_stem):
+        path = bundles.get(content)
+        if path is None:
+            path = bundles[content] = bundle_name(bundle_stem, content, extension)
+        page.bundles[path] = content
+        return path
+
+    def replace_style(match):
+        body = match.group('body')
+        if _TEMPLATE_SYNTAX_RE.search(body) or 'media=' in match.group('attrs'):
+            return match.group(0)
+        css = minify_css(body)
+        page.inline_bytes += len(match.group(0).encode('utf-8'))
+        critical = critical_css(css, source, fold_bytes)
+        page.critical_bytes += len(critical.encode('utf-8'))
+        return _stylesheet_tags(add_bundle(css, 'css', stem), critical)
+
+    def replace_link(match):
+        content = read_static(match.group('path'))
+        if content is None or 'media=' in match.group(0) or _RELATIVE_URL_RE.search(content):
+            return match.group(0)
+        # Already cached separately from the page: only minify it
+        link_stem = match.group('path').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        path = add_bundle(minify_css(content), 'css', link_stem)
+        return match.group(0).replace(match.group('path'), path)
+
+    def replace_script(match):
+        attrs, body = match.group('attrs'), match.group('body')
+        if 'src=' in attrs or _TEMPLATE_SYNTAX_RE.search(body) or not body.strip():
+            return match.group(0)
+        kind = re.search(r'\btype=["\']([^"\']*)["\']', attrs)
+        if kind and kind.group(1).lower() not in ('text/javascript', 'application/javascript'):
+            return match.group(0)
+        page.inline_bytes += len(match.group(0).encode('utf-8'))
+        path = add_bundle(minify_js(body), 'js', stem)
+        return '<script src="{% static \'' + path + '\' %}"></script>'
+
+    def replace_static_script(match):
+        content = read_static(match.group('path'))
+        if content is None or re.search(r'\b(async|defer|type=)', match.group(0)):
+            return match.group(0)
+        script_stem = match.group('path').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+        path = add_bundle(minify_js(content), 'js', script_stem)
+        return '<script src="{% static \'' + path + '\' %}"></script>'
+
+    output = _STYLE_RE.sub(replace_style, source)
+    output = _STATIC_LINK_RE.sub(replace_link, output)
+    output = _STATIC_SCRIPT_RE.sub(replace_static_script, output)
+    output = _SCRIPT_RE.sub(replace_script, output)
+    if output != source and not _LOAD_STATIC_RE.search(output):
+        extends = _EXTENDS_RE.search(output)
+        at = extends.end() if extends else 0
+        output = output[:at] + '{% load static %}\n' + output[at:]
+    page.output = output
+    return page
@@ -0,0 +1,118 @@
+"""
+Batched Students changes (``POST /api/students/batch``).
+
+The body is NDJSON or a JSON array of changes, one per student::
+
+    {"student_id": 6512345678, "name_prefix": "นาย", "first_name": "สมชาย", "last_name": "ใจดี"}
+    {"student_id": 6512345679, "op": "delete"}
+
+``op`` is ``upsert`` (the default) or ``delete``. Records are read and
+validated one at a time (``importers.iter_records``) and applied
+``chunk_size`` at a time, each chunk in one transaction: upserts with
+``importers.upsert_students`` (``bulk_create(update_conflicts=True)`` on
+``student_id``) and deletes with ``bulk.delete_students``. Within a chunk
+the last change of a student wins, as in ``upsert_students``.
+
+``apply_changes`` yields the results of each chunk (one per row) as it
+commits, then a summary, so neither the request nor the response is held
+whole. As NDJSON:
+
+    {"row": 1, "student_id": 6512345678, "status": "created"}
+    {"row": 2, "student_id": 6512345679, "status": "deleted"}
+    {"summary": {"rows": 2, "created": 1, "updated": 0, "deleted": 1, ...}}
+
+Row statuses are ``created``, ``updated``, ``deleted``, ``missing`` (a
+delete of an unknown student), ``superseded`` (a later row of the chunk
+changes the same student), ``invalid`` and ``failed`` (the chunk's
+transaction was rolled back).
+"""
+
+from collections import Counter
+
+from django.db import DatabaseError, transaction
+
+from .bulk import delete_students
+from .importers import decode_record, iter_records, parse_student, parse_student_id, upsert_students
+from .models import Students
+
+OPERATIONS = ('upsert', 'delete')
+STATUSES = ('created', 'updated', 'deleted', 'missing', 'superseded', 'invalid', 'failed')
+
+
+def parse_change(record):
+    """Return ``(op, student_id, student)``; ``student`` is None for deletes."""
+    record = decode_record(record)
+    op = record.get('op', 'upsert')
+    if op not in OPERATIONS:
+        raise ValueError(f'invalid op: {op!r}; choose from {", ".join(OPERATIONS)}')
+    if op == 'upsert':
+        student = parse_student(record)
+        return op, student.student_id, student
+    return op, parse_student_id(record), None
+
+
+def _apply_chunk(changes):
+    """Apply ``(row, op, student_id, student)`` changes; return their results in row order."""
+    latest = {student_id: row for row, _, student_id, _ in changes}
+    upserts = [student for row, op, student_id, student in changes if op == 'upsert' and latest[student_id] == row]
+    deletes = [student_id for row, op, student_id, _ in changes if op == 'delete' and latest[student_id] == row]
+    try:
+        with transaction.atomic():
+            existing = set(Students.objects.filter(student_id__in=latest).values_list('student_id', flat=True))
+            if upserts:
+                upsert_students(upserts)
+            if deletes:
+                delete_students(Students.objects.filter(student_id__in=deletes), chunk_size=len(deletes))
+    except DatabaseError as exc:
+        return [
+            {'row': row, 'student_id': student_id, 'status': 'failed', 'error': str(exc)}
+            for row, _, student_id, _ in changes
+        ]
+
+    results = []
+    for row, op, student_id, _ in changes:
+        result = {'row': row, 'student_id': student_id}
+        if latest[student_id] != row:
+            result.update(status='superseded', by=latest[student_id])
+        elif op == 'upsert':
+            result['status'] = 'updated' if student_id in existing else 'created'
+        else:
+            result['status'] = 'deleted' if student_id in existing else 'missing'
+        results.append(result)
+    return results
+
+
+def apply_changes(stream, fmt, chunk_size=500):
+    """
+    Read changes from the text ``stream`` (``'ndjson'`` or ``'json'``) and
+    yield a list of result dicts per chunk, then ``[{'summary': ...}]``.
+    A JSON array that breaks off adds ``{'error': ...}`` before the
+    summary; the rows read until then are applied.
+    """
+    counts = Counter({status: 0 for status in STATUSES})
+    pending, invalid = [], []
+
+    def flush():
+        results = _apply_chunk(pending) if pending else []
+        results.extend(invalid)
+        results.sort(key=lambda result: result['row'])
+        pending.clear()
+        invalid.clear()
+        for result in results:
+            counts[result['status']] += 1
+        return results
+
+    rows = 0
+    try:
+        for rows, record in iter_records(stream, fmt):
+            try:
+                pending.append((rows, *parse_change(record)))
+            except ValueError as exc:
+                invalid.append({'row': rows, 'status': 'invalid', 'error': str(exc)})
+            if len(pending) + len(invalid) >= chunk_size:
+                yield flush()
+    except ValueError as exc:
+        yield [*flush(), {'error': str(exc)}]
+    else:
+        yield flush()
+    yield [{'summary': {'rows': rows, **counts}}]
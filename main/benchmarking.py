@@ -0,0 +1,108 @@
+"""
+Helpers shared by the benchmark management commands and the route
+budget tests.
+"""
+
+import json
+from urllib.parse import quote
+
+from django.db import connections, transaction
+from django.urls import reverse
+
+from . import urls as main_urls
+from .models import PREFIX_CHOICES
+from .signals import students_changed
+from .stats import student_delta
+
+# Synthetic Students dataset sizes, smallest first
+DATASETS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+_PREFIXES = [value for value, _ in PREFIX_CHOICES]
+
+# Extra query strings per route name; each entry is benchmarked separately
+QUERIES = {
+    'students': ['', 'stream=1'],
+    'students_search': ['q=ชื่อ12'],
+    'students_api': ['', 'limit=10000&fields=student_id,first_name'],
+    'students_export': ['format=csv'],
+    'multiplication_table': ['', 'rows=10000&columns=100&format=csv'],
+}
+POSTS = {
+    'contact': {
+        'name': 'Bench', 'lastname': 'Mark',
+        'email': 'bench@example.com', 'message': 'Benchmark message',
+    },
+    'for_loop': {'skills': ['python', 'django']},
+    # (content type, body) instead of form data
+    'students_batch': ('application/x-ndjson', ''.join(
+        json.dumps({'student_id': 9_000_000_000 + number, 'name_prefix': _PREFIXES[0],
+                    'first_name': f'ชื่อ{number}', 'last_name': f'นามสกุล{number}'}, ensure_ascii=False) + '\n'
+        for number in range(100)
+    ).encode()),
+}
+# Routes that only take POSTs, routes that need a staff session, and
+# routes that read the whole table
+POST_ONLY = {'students_batch'}
+STAFF_ROUTES = {'students_export', 'metrics', 'students_batch'}
+FULL_TABLE = {
+    'students?stream=1', 'students_export?format=csv',
+    'multiplication_table?rows=10000&columns=100&format=csv',
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def fill_students(count, using='default', batch_size=10_000):
+    """
+    Top the Students table up to ``count`` rows with synthetic students
+    and return how many were added. Each batch runs one single-row raw
+    INSERT through ``executemany``, which SQLite prepares once per batch.
+    The search index triggers still fire. Cached student pages and
+    statistics are updated through ``students_changed``.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*), COALESCE(MAX(student_id), 0) FROM main_students')
+        existing, top = cursor.fetchone()
+    missing = count - existing
+    if missing <= 0:
+        return 0
+
+    delta = None
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for start in range(1, missing + 1, batch_size):
+            numbers = range(start, min(start + batch_size, missing + 1))
+            rows = [
+                (top + number, _PREFIXES[number % len(_PREFIXES)], f'ชื่อ{number}', f'นามสกุล{number}')
+                for number in numbers
+            ]
+            cursor.executemany(
+                'INSERT INTO main_students (student_id, name_prefix, first_name, last_name) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+            delta = student_delta((row[:2] for row in rows), delta=delta)
+        students_changed.send(sender=None, delta=delta, using=using)
+    return missing
+
+
+def build_routes(names=None):
+    """Return ``(label, method, path, body, name)`` for every named main.urls route."""
+    routes = []
+    for pattern in main_urls.urlpatterns:
+        name = getattr(pattern, 'name', None)
+        if not name or (names and name not in names) or pattern.pattern.converters:
+            continue
+        path = reverse(f'{main_urls.app_name}:{name}')
+        for query in [] if name in POST_ONLY else QUERIES.get(name, ['']):
+            label = f'{name}?{query}' if query else name
+            routes.append((label, 'GET', path + ('?' + quote(query, safe='=&') if query else ''), None, name))
+        if name in POSTS:
+            routes.append((f'{name} POST', 'POST', path, POSTS[name], name))
+    return routes
@@ -0,0 +1,151 @@
+"""
+Per-route performance budgets.
+
+``route_budgets.json`` maps every route of ``benchmarking.build_routes``
+(``main:<url name>``, plus its query-string variant or `` POST``) to:
+
+- ``queries``: the most database queries one request may run;
+- ``alloc_kib``: the peak of Python allocations during the request
+  (``tracemalloc``), in KiB;
+- ``ms``: the wall time of one warm request, streamed body included.
+
+The budgets are checked by ``RouteBudgetTests`` on the ``1k`` synthetic
+dataset. Query and allocation budgets are tight (a new query or an N+1
+fails them); time budgets only catch order-of-magnitude regressions and
+are multiplied by ``ROUTE_BUDGET_MS_SCALE`` (0 skips them, as shared CI
+runners do).
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .urls import app_name
+
+BUDGET_FILE = Path(__file__).with_name('route_budgets.json')
+BUDGET_KEYS = ('queries', 'alloc_kib', 'ms')
+
+_current = ContextVar('budget_queries', default=None)
+_installed = False
+
+
+@dataclass
+class RouteUsage:
+    status: int
+    queries: list = field(default_factory=list)
+    alloc_kib: float = 0.0
+    ms: float = 0.0
+
+
+def budget_key(label):
+    return f'{app_name}:{label}'
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _record_query(execute, sql, params, many, context):
+    queries = _current.get()
+    if queries is not None:
+        queries.append(sql)
+    return execute(sql, params, many, context)
+
+
+def _add_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Collect the SQL of every query in this block. Unlike
+    ``CaptureQueriesContext`` this follows the context into the threads
+    async views run their ORM calls on.
+    """
+    global _installed
+    if not _installed:
+        _installed = True
+        connection_created.connect(_add_query_recorder, dispatch_uid='main.budgets.query_recorder')
+        for connection in connections.all(initialized_only=True):
+            _add_query_recorder(None, connection)
+    queries = []
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+
+
+def _request(client, method, path, data):
+    if isinstance(data, tuple):
+        content_type, body = data
+        response = client.generic(method, path, body, content_type)
+    else:
+        response = client.generic(method, path) if data is None else client.post(path, data)
+    if response.streaming:
+        # Streamed bodies query and render while iterating; drop the chunks
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response
+
+
+def measure_route(client, method, path, data=None):
+    """
+    Request ``path`` three times: to warm templates and caches, to count
+    queries and time it, and under ``tracemalloc`` for the allocation peak.
+    """
+    _request(client, method, path, data)
+
+    with capture_queries() as queries:
+        started = time.perf_counter()
+        response = _request(client, method, path, data)
+        elapsed = time.perf_counter() - started
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        _request(client, method, path, data)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return RouteUsage(
+        status=response.status_code,
+        queries=queries,
+        alloc_kib=peak / 1024,
+        ms=elapsed * 1000,
+    )
+
+
+def over_budget(usage, budget, ms_scale=1.0):
+    """
+    Describe each way ``usage`` exceeds ``budget`` (empty when within it).
+    The ``ms`` budget is multiplied by ``ms_scale``; 0 leaves it unchecked.
+    """
+    measured = {'queries': len(usage.queries), 'alloc_kib': usage.alloc_kib, 'ms': usage.ms}
+    limits = {key: budget[key] for key in BUDGET_KEYS if key in budget}
+    if 'ms' in limits:
+        if ms_scale:
+            limits['ms'] *= ms_scale
+        else:
+            del limits['ms']
+    return [
+        f'{key} {round(measured[key], 1):,} > {round(limit, 1):,g}'
+        for key, limit in limits.items()
+        if measured[key] > limit
+    ]
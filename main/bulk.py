@@ -0,0 +1,66 @@
+"""
+Chunked bulk writes on Students.
+
+Rows are walked in primary key order with a keyset cursor, ``chunk_size``
+at a time. Each chunk is read and changed with one ``UPDATE``/``DELETE``
+statement in its own transaction, so no model instances are built and
+no lock is held for the whole run. Every chunk sends ``students_changed``
+with its exact statistics delta (see ``main/stats.py``), which also
+invalidates the cached student pages.
+"""
+
+from django.db import connections, transaction
+
+from .models import Students
+from .signals import students_changed
+from .stats import student_delta
+
+
+def _in_chunks(queryset, chunk_size, write):
+    """
+    Call ``write(rows)`` with lists of ``(pk, student_id, name_prefix)``
+    covering ``queryset``, each in a transaction; return the summed results.
+    """
+    using = queryset.db
+    last, total = None, 0
+    while True:
+        with transaction.atomic(using=using):
+            page = queryset if last is None else queryset.filter(pk__gt=last)
+            rows = list(page.order_by('pk').values_list('pk', 'student_id', 'name_prefix')[:chunk_size])
+            if not rows:
+                return total
+            total += write(rows)
+        last = rows[-1][0]
+
+
+def update_prefix(queryset, name_prefix, chunk_size=500):
+    """Set ``name_prefix`` on every student in ``queryset``; return how many changed."""
+    using = queryset.db
+
+    def write(rows):
+        delta = student_delta((row[1:] for row in rows), sign=-1)
+        student_delta(((student_id, name_prefix) for _, student_id, _ in rows), delta=delta)
+        updated = Students.objects.using(using).filter(pk__in=[row[0] for row in rows]).update(
+            name_prefix=name_prefix,
+        )
+        students_changed.send(sender=Students, delta=delta, using=using)
+        return updated
+
+    return _in_chunks(queryset.exclude(name_prefix=name_prefix), chunk_size, write)
+
+
+def delete_students(queryset, chunk_size=500):
+    """Delete every student in ``queryset`` without loading them; return how many."""
+    using = queryset.db
+    connection = connections[using]
+    table = connection.ops.quote_name(Students._meta.db_table)
+
+    def write(rows):
+        placeholders = ', '.join(['%s'] * len(rows))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', [row[0] for row in rows])
+            deleted = cursor.rowcount
+        students_changed.send(sender=Students, delta=student_delta((row[1:] for row in rows), sign=-1), using=using)
+        return deleted
+
+    return _in_chunks(queryset, chunk_size, write)
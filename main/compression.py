@@ -0,0 +1,164 @@
+"""
+Content negotiation and codecs for ``main.middleware.CompressionMiddleware``.
+
+``negotiate`` picks the encoding for a request from ``Accept-Encoding``
+(q-values first, then the order of ``COMPRESSION_ENCODINGS``) among the
+codecs available here: gzip always, Brotli when the ``brotli`` package
+is installed and zstd when ``zstandard`` is.
+
+``compression_level`` returns each codec's normal level, or its fast
+level while the one-minute load average per CPU is above
+``COMPRESSION_PRESSURE_LOAD`` (sampled at most once a second), so
+compression backs off when the machine is busy. Streaming responses
+always use the fast level and flush after every chunk, so the browser
+can render each chunk as soon as it arrives.
+"""
+
+import os
+import time
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the installed extras
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the installed extras
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+)
+
+_load = [0.0, False]  # sampled at, under pressure
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+STREAM_CODECS = {'gzip': _Gzip}
+if brotli is not None:
+    STREAM_CODECS['br'] = _Brotli
+if zstandard is not None:
+    STREAM_CODECS['zstd'] = _Zstd
+
+
+def compress(data, encoding, level):
+    """Compress a whole body in one call."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def available_encodings():
+    return [encoding for encoding in settings.COMPRESSION_ENCODINGS if encoding in STREAM_CODECS]
+
+
+def negotiate(accept_encoding, encodings=None):
+    """
+    Return the encoding to use for ``accept_encoding``, or None. Only
+    ``encodings`` are considered when given (views that compress their
+    own body pass the codecs they can write).
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip()] = quality
+    wildcard = weights.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings() if encodings is None else encodings:
+        quality = weights.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def under_pressure():
+    """True while the load average per CPU exceeds COMPRESSION_PRESSURE_LOAD."""
+    now = time.monotonic()
+    if now - _load[0] >= 1.0:
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):  # not available on this platform
+            load = 0.0
+        _load[:] = [now, load > settings.COMPRESSION_PRESSURE_LOAD]
+    return _load[1]
+
+
+def compression_level(encoding, streaming=False):
+    normal, fast = settings.COMPRESSION_LEVELS[encoding]
+    return fast if streaming or under_pressure() else normal
+
+
+def is_compressible(content_type):
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_stream(chunks, encoding):
+    compressor = STREAM_CODECS[encoding](compression_level(encoding, streaming=True))
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor = STREAM_CODECS[encoding](compression_level(encoding, streaming=True))
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,86 @@
+"""
+Portfolio content (site settings, skills and projects) for the pages.
+
+Every loader runs a fixed number of queries however many rows there are:
+projects come with their technologies through ``prefetch_related`` (one
+query for the projects, one for all their skills).
+
+``get_site_configuration`` keeps the singleton in process memory and
+checks it against the ``'content'`` page-cache tag, which
+``main.signals`` bumps whenever any of these models change. A request
+therefore costs one cache lookup, and the row is only read again from
+the database after it (or other content) was edited, in any worker (tag
+versions are shared between the workers, see ``page_cache``).
+"""
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from .models import SKILL_CATEGORY_CHOICES, Project, SiteConfiguration, Skill
+from .page_cache import tag_versions
+
+CONTENT_TAG = 'content'
+
+CATEGORY_ICONS = {
+    'frontend': 'fas fa-paint-brush',
+    'backend': 'fas fa-server',
+    'database': 'fas fa-database',
+    'devops': 'fas fa-tools',
+}
+
+# (tag version, SiteConfiguration) of the last load in this process
+_site_configuration = (None, None)
+
+
+def _current_configuration():
+    version, configuration = _site_configuration
+    if configuration is not None and version == tag_versions((CONTENT_TAG,)):
+        return configuration
+    return None
+
+
+def _load_configuration():
+    global _site_configuration
+    # Read the version first: an edit racing with the query then only
+    # causes one more reload, never a stale singleton
+    version = tag_versions((CONTENT_TAG,))
+    configuration = SiteConfiguration.objects.filter(pk=1).first() or SiteConfiguration()
+    _site_configuration = (version, configuration)
+    return configuration
+
+
+def get_site_configuration():
+    """Return the site settings (an unsaved default when none are stored)."""
+    return _current_configuration() or _load_configuration()
+
+
+async def aget_site_configuration():
+    return _current_configuration() or await sync_to_async(_load_configuration)()
+
+
+def clear_site_configuration():
+    global _site_configuration
+    _site_configuration = (None, None)
+
+
+def projects_with_technologies():
+    """Projects with their technologies prefetched in a single extra query."""
+    return Project.objects.prefetch_related(
+        Prefetch('technologies', queryset=Skill.objects.only('name', 'icon', 'order'))
+    )
+
+
+async def afeatured_projects():
+    return [project async for project in projects_with_technologies().filter(is_featured=True)]
+
+
+async def askill_groups():
+    """Skills grouped by category, in category order, from one query."""
+    skills = {}
+    async for skill in Skill.objects.all():
+        skills.setdefault(skill.category, []).append(skill)
+    return [
+        {'key': key, 'label': label, 'icon': CATEGORY_ICONS[key], 'skills': skills[key]}
+        for key, label in SKILL_CATEGORY_CHOICES
+        if key in skills
+    ]
@@ -0,0 +1,181 @@
+"""
+Constant-memory Students export encoders.
+
+Rows are read with ``values_list().iterator()`` (never as model instances)
+and encoded chunk by chunk into CSV, NDJSON or a compact columnar binary
+format, optionally gzip-compressed on the fly.
+
+Columnar format (all integers little-endian)::
+
+    b'STUC' u8 version=1 u8 field_count
+    field_count x (u8 name_length, name bytes, u8 type b'i' | b's')
+    blocks: u32 row_count (0 ends the stream), then for each field
+        b'i': row_count x int64
+        b's': row_count x u32 byte lengths, then the UTF-8 bytes
+"""
+
+import csv
+import io
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+from .importers import STUDENT_FIELDS
+from .models import Students
+from .streaming import chunked
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/octet-stream',
+}
+COLUMNAR_MAGIC = b'STUC'
+COLUMNAR_VERSION = 1
+INTEGER_FIELDS = {'student_id'}
+
+
+def parse_fields(value):
+    """Turn a comma separated field list into a validated tuple."""
+    if not value:
+        return STUDENT_FIELDS
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in STUDENT_FIELDS]
+    if unknown or not fields:
+        raise ValueError(
+            f"unknown fields: {', '.join(unknown) or '(none)'}; "
+            f"choose from {', '.join(STUDENT_FIELDS)}"
+        )
+    return fields
+
+
+def export_rows(fields, start=None, end=None, chunk_size=5000):
+    """Iterate ``fields`` tuples ordered by ``student_id`` within [start, end]."""
+    queryset = Students.objects.order_by('student_id')
+    if start is not None:
+        queryset = queryset.filter(student_id__gte=start)
+    if end is not None:
+        queryset = queryset.filter(student_id__lte=end)
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def encode_csv(rows, fields, chunk_size=5000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in chunked(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(rows, fields, chunk_size=5000):
+    # Keys are encoded once; values go through the C string encoder
+    # instead of building a dict and calling json.dumps per row.
+    quote = json.encoder.encode_basestring
+    keys = [
+        ('{' if index == 0 else ',') + quote(field) + ':'
+        for index, field in enumerate(fields)
+    ]
+    encoders = [str if field in INTEGER_FIELDS else quote for field in fields]
+    columns = list(zip(keys, encoders))
+    for chunk in chunked(rows, chunk_size):
+        lines = [
+            ''.join([key + encode(value) for (key, encode), value in zip(columns, row)])
+            for row in chunk
+        ]
+        yield ('}\n'.join(lines) + '}\n').encode('utf-8')
+
+
+def _le(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_columnar(rows, fields, chunk_size=5000):
+    header = [COLUMNAR_MAGIC, struct.pack('<BB', COLUMNAR_VERSION, len(fields))]
+    for field in fields:
+        name = field.encode('ascii')
+        kind = b'i' if field in INTEGER_FIELDS else b's'
+        header.append(struct.pack('<B', len(name)) + name + kind)
+    yield b''.join(header)
+
+    for chunk in chunked(rows, chunk_size):
+        parts = [struct.pack('<I', len(chunk))]
+        for index, field in enumerate(fields):
+            column = [row[index] for row in chunk]
+            if field in INTEGER_FIELDS:
+                parts.append(_le(array('q', column)))
+            else:
+                encoded = [value.encode('utf-8') for value in column]
+                parts.append(_le(array('I', map(len, encoded))))
+                parts.append(b''.join(encoded))
+        yield b''.join(parts)
+    yield struct.pack('<I', 0)
+
+
+def read_columnar(stream):
+    """Decode a columnar export back into row tuples (for consumers and checks)."""
+    if stream.read(4) != COLUMNAR_MAGIC:
+        raise ValueError('not a columnar Students export')
+    version, field_count = struct.unpack('<BB', stream.read(2))
+    if version != COLUMNAR_VERSION:
+        raise ValueError(f'unsupported columnar version {version}')
+    fields = []
+    for _ in range(field_count):
+        (length,) = struct.unpack('<B', stream.read(1))
+        fields.append((stream.read(length).decode('ascii'), stream.read(1)))
+
+    while True:
+        (count,) = struct.unpack('<I', stream.read(4))
+        if not count:
+            return
+        columns = []
+        for _, kind in fields:
+            if kind == b'i':
+                values = array('q')
+                values.frombytes(stream.read(8 * count))
+            else:
+                lengths = array('I')
+                lengths.frombytes(stream.read(4 * count))
+                if sys.byteorder == 'big':
+                    lengths.byteswap()
+                blob = stream.read(sum(lengths))
+                values, offset = [], 0
+                for length in lengths:
+                    values.append(blob[offset:offset + length].decode('utf-8'))
+                    offset += length
+            if kind == b'i' and sys.byteorder == 'big':
+                values.byteswap()
+            columns.append(values)
+        yield from zip(*columns)
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+    'columnar': encode_columnar,
+}
+
+
+def gzip_stream(chunks, level=6):
+    """Compress an iterable of byte chunks into a single gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_students(fmt, fields=STUDENT_FIELDS, start=None, end=None,
+                    compress=False, chunk_size=5000):
+    """Return an iterator of encoded (and optionally gzipped) byte chunks."""
+    rows = export_rows(fields, start=start, end=end, chunk_size=chunk_size)
+    chunks = ENCODERS[fmt](rows, fields, chunk_size=chunk_size)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,212 @@
+"""
+Responsive image derivatives.
+
+Each source image (a static file, or an upload under ``MEDIA_ROOT``) is
+resized to the ``IMAGE_WIDTHS`` narrower than itself plus its own width,
+never larger, and encoded as AVIF, WebP and JPEG (PNG for sources with
+transparency). Derivatives are cached on disk under ``IMAGE_CACHE_ROOT``
+by the content hash of their source::
+
+    <cache root>/<digest[:2]>/<digest>/<width>-q<quality>.<format>
+
+so an edited source gets new files and identical uploads share theirs.
+They are generated ahead of time by ``manage.py build_images`` or on
+first request by ``views.image_derivative``; files are written to a
+temporary name and renamed, so concurrent requests never see a partial
+image.
+
+``{% responsive_image %}`` (``main/templatetags/images.py``) emits a
+``<picture>`` whose ``srcset``/``sizes`` let the browser pick the
+smallest derivative that fills the slot. Derivative URLs carry the
+source digest, so they are cached for a year.
+
+Needs Pillow; without it the tag falls back to a plain lazy ``<img>``.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.urls import reverse
+from django.utils._os import safe_join
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - depends on the installed extras
+    Image = None
+
+SOURCE_KINDS = ('static', 'media')
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# format -> (Pillow format, content type, save options besides quality)
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'speed': 6}),
+    'webp': ('WEBP', 'image/webp', {'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'image/png', {'optimize': True}),
+}
+# Width of the plain <img src> for browsers without srcset support
+FALLBACK_WIDTH = 960
+
+_sources = {}  # (kind, name) -> (mtime_ns, size, SourceImage)
+
+
+class SourceImage:
+    """A source image with its content digest and display dimensions."""
+
+    def __init__(self, kind, name, path, digest, width, height, has_alpha):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self.digest = digest
+        self.width = width
+        self.height = height
+        self.has_alpha = has_alpha
+
+    @property
+    def fallback_format(self):
+        return 'png' if self.has_alpha else 'jpeg'
+
+    def widths(self):
+        """Derivative widths, narrowest first; sources are never upscaled."""
+        widths = [width for width in settings.IMAGE_WIDTHS if width < self.width]
+        if not widths or self.width <= max(settings.IMAGE_WIDTHS):
+            widths.append(self.width)
+        return widths
+
+    def height_for(self, width):
+        return max(1, round(self.height * width / self.width))
+
+
+def available_formats():
+    """The IMAGE_FORMATS this Pillow build can encode, in preference order."""
+    if Image is None:
+        return []
+    return [fmt for fmt in settings.IMAGE_FORMATS if features.check(fmt)]
+
+
+def serves_format(source, fmt):
+    return fmt == source.fallback_format or fmt in available_formats()
+
+
+def _source_path(kind, name):
+    if not name.lower().endswith(SOURCE_EXTENSIONS):
+        return None
+    if kind == 'static':
+        return finders.find(name)
+    if kind == 'media':
+        try:
+            return safe_join(settings.MEDIA_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+    return None
+
+
+def source_image(kind, name):
+    """Return the ``SourceImage`` for a static or media path, or None."""
+    if Image is None:
+        return None
+    path = _source_path(kind, name)
+    try:
+        stat = os.stat(path) if path else None
+    except OSError:
+        stat = None
+    if stat is None:
+        return None
+    cached = _sources.get((kind, name))
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    with open(path, 'rb') as handle:
+        digest = hashlib.blake2b(handle.read(), digest_size=8).hexdigest()
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):  # rotated by 90 degrees
+                width, height = height, width
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    except (OSError, ValueError):  # not an image Pillow can read
+        return None
+    source = SourceImage(kind, name, path, digest, width, height, has_alpha)
+    _sources[(kind, name)] = (stat.st_mtime_ns, stat.st_size, source)
+    return source
+
+
+def derivative_path(source, width, fmt):
+    quality = settings.IMAGE_QUALITY[fmt]
+    return os.path.join(
+        settings.IMAGE_CACHE_ROOT, source.digest[:2], source.digest, f'{width}-q{quality}.{fmt}'
+    )
+
+
+def derivative_url(source, width, fmt):
+    url = reverse('main:image', kwargs={'kind': source.kind, 'width': width, 'fmt': fmt, 'name': source.name})
+    return f'{url}?v={source.digest}'
+
+
+def _encode(source, width, fmt, target):
+    pil_format, _, options = FORMATS[fmt]
+    height = source.height_for(width)
+    with Image.open(source.path) as image:
+        rotated = image.getexif().get(0x0112) in (5, 6, 7, 8)
+        # JPEG sources decode at a reduced scale, still at least this large
+        image.draft('RGB', (height, width) if rotated else (width, height))
+        image = ImageOps.exif_transpose(image)
+        if fmt == 'jpeg' and image.mode != 'RGB':
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', image.size, 'white')
+            image.paste(rgba, mask=rgba)
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if source.has_alpha else 'RGB')
+        if image.width != width:
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        image.save(target, pil_format, quality=settings.IMAGE_QUALITY[fmt], **options)
+
+
+def ensure_derivative(source, width, fmt):
+    """Return the path of a derivative, encoding it on first use."""
+    path = derivative_path(source, width, fmt)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as target:
+            _encode(source, width, fmt, target)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
+
+
+def srcset(source, fmt):
+    return ', '.join(f'{derivative_url(source, width, fmt)} {width}w' for width in source.widths())
+
+
+def iter_sources(kinds=SOURCE_KINDS):
+    """Yield every static and/or media ``SourceImage``."""
+    if 'static' in kinds:
+        seen = set()
+        for finder in finders.get_finders():
+            for name, _ in finder.list([]):
+                name = name.replace(os.sep, '/')
+                if name not in seen and name.lower().endswith(SOURCE_EXTENSIONS):
+                    seen.add(name)
+                    source = source_image('static', name)
+                    if source is not None:
+                        yield source
+    if 'media' in kinds and os.path.isdir(settings.MEDIA_ROOT):
+        cache_root = os.path.abspath(settings.IMAGE_CACHE_ROOT)
+        for root, directories, files in os.walk(settings.MEDIA_ROOT):
+            if os.path.abspath(root) == cache_root:
+                directories[:] = []
+                continue
+            for filename in sorted(files):
+                name = os.path.relpath(os.path.join(root, filename), settings.MEDIA_ROOT).replace(os.sep, '/')
+                source = source_image('media', name)
+                if source is not None:
+                    yield source
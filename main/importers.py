@@ -0,0 +1,223 @@
+"""
+Row parsing and batched upserts for bulk Students loads.
+"""
+
+import csv
+import io
+import json
+import re
+
+from django.db import connection, transaction
+
+from .models import PREFIX_CHOICES, Students
+from .signals import students_changed
+from .stats import student_delta
+
+STUDENT_FIELDS = ('student_id', 'name_prefix', 'first_name', 'last_name')
+MAX_STUDENT_ID = 2 ** 63 - 1
+# Longest JSON array element read before giving up on a malformed body
+MAX_RECORD_SIZE = 64 * 1024
+UPDATE_FIELDS = ['name_prefix', 'first_name', 'last_name']
+VALID_PREFIXES = {value for value, _ in PREFIX_CHOICES}
+MAX_LENGTHS = {
+    field: Students._meta.get_field(field).max_length for field in UPDATE_FIELDS
+}
+
+
+def parse_student_id(row):
+    """
+    ``row['student_id']`` as an int that fits a (64-bit) SQLite integer.
+    Only integers and digit strings are accepted: ``int()`` would also turn
+    ``1.7`` or ``true`` into the id 1.
+    """
+    value = row.get('student_id')
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'invalid student_id: {value!r}')
+    try:
+        student_id = int(value)
+    except ValueError:
+        raise ValueError(f'invalid student_id: {value!r}')
+    if not -MAX_STUDENT_ID <= student_id <= MAX_STUDENT_ID:
+        raise ValueError(f'invalid student_id: {student_id} is out of range')
+    return student_id
+
+
+def parse_student(row):
+    """Validate a mapping of field values and return an unsaved ``Students``."""
+    student_id = parse_student_id(row)
+
+    values = {}
+    for field in UPDATE_FIELDS:
+        value = row.get(field)
+        if value is None:
+            value = ''
+        elif not isinstance(value, str):
+            raise ValueError(f'{field} must be a string, not {value!r}')
+        value = value.strip()
+        max_length = MAX_LENGTHS[field]
+        if not value:
+            raise ValueError(f'{field} is required')
+        if len(value) > max_length:
+            raise ValueError(f'{field} is longer than {max_length} characters')
+        values[field] = value
+
+    if values['name_prefix'] not in VALID_PREFIXES:
+        raise ValueError(f"invalid name_prefix: {values['name_prefix']!r}")
+
+    return Students(student_id=student_id, **values)
+
+
+def upsert_students(students):
+    """
+    Insert or update ``students`` on ``student_id`` in one transaction.
+
+    Later rows win when the same ``student_id`` appears twice in a batch.
+    Existing rows are looked up in chunks that fit SQLite's limit on
+    query parameters, whatever the batch size.
+    """
+    unique = {student.student_id: student for student in students}
+    ids = list(unique)
+    chunk = connection.ops.bulk_batch_size(['student_id'], ids) or len(ids)
+    with transaction.atomic():
+        # Rows being replaced leave their statistics groups
+        delta = None
+        for start in range(0, len(ids), chunk):
+            delta = student_delta(
+                Students.objects.filter(student_id__in=ids[start:start + chunk])
+                .values_list('student_id', 'name_prefix'),
+                sign=-1, delta=delta,
+            )
+        student_delta(((student.student_id, student.name_prefix) for student in unique.values()), delta=delta)
+        Students.objects.bulk_create(
+            unique.values(),
+            update_conflicts=True,
+            unique_fields=['student_id'],
+            update_fields=UPDATE_FIELDS,
+        )
+        students_changed.send(sender=Students, delta=delta)
+    return len(unique)
+
+
+def iter_records(stream, fmt):
+    """
+    Yield ``(row_number, record)`` pairs from a text stream.
+
+    CSV records are dicts keyed by the header line; NDJSON records are the
+    raw lines, decoded later by ``parse_record`` so that one malformed line
+    does not abort the whole stream. JSON arrays are read element by
+    element (``iter_json_array``); a malformed array raises ``ValueError``
+    where it breaks, since the rest cannot be resynchronized.
+    """
+    if fmt == 'csv':
+        yield from enumerate(csv.DictReader(stream), start=1)
+    elif fmt in ('ndjson', 'jsonl'):
+        number = 0
+        for line in stream:
+            if line.strip():
+                number += 1
+                yield number, line
+    elif fmt == 'json':
+        yield from enumerate(iter_json_array(stream), start=1)
+    else:
+        raise ValueError(f'unsupported format: {fmt}')
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class _JsonArrayReader:
+    def __init__(self, stream, block_size):
+        self.stream = stream
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+        self.buffer, self.position, self.eof = '', 0, False
+
+    def _more(self):
+        block = '' if self.eof else self.stream.read(self.block_size)
+        self.eof = not block
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+        return bool(block)
+
+    def peek(self):
+        """The next non-whitespace character, or '' at the end of the stream."""
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._more():
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f'expected {" or ".join(characters)} at {character or "end of input"!r}')
+        self.position += 1
+        return character
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as exc:
+                if len(self.buffer) - self.position > MAX_RECORD_SIZE or not self._more():
+                    raise ValueError(f'invalid JSON array element: {exc.msg}')
+                continue
+            # A number can go on in the next block
+            if _NUMBER_TAIL.fullmatch(self.buffer, end) and self._more():
+                continue
+            self.position = end
+            return value
+
+
+def iter_json_array(stream, block_size=16 * 1024):
+    """Yield the elements of a JSON array read ``block_size`` characters at a time."""
+    reader = _JsonArrayReader(stream, block_size)
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.position += 1
+    else:
+        while True:
+            yield reader.value()
+            if reader.expect(',]') == ']':
+                break
+    if reader.peek():
+        raise ValueError('unexpected data after the JSON array')
+
+
+def decode_record(record):
+    """Decode an NDJSON line if needed; records must be JSON objects."""
+    if isinstance(record, (str, bytes)):
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError('each record must be a JSON object')
+    return record
+
+
+def parse_record(record):
+    """Decode an NDJSON line if needed and validate it with ``parse_student``."""
+    return parse_student(decode_record(record))
+
+
+class _ReadableStream(io.RawIOBase):
+    """A raw stream over anything with ``read(size)``, e.g. an HttpRequest."""
+
+    def __init__(self, source):
+        self._source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_text(binary_stream):
+    """Wrap a binary stream for line-by-line UTF-8 reading (BOM tolerant)."""
+    if not isinstance(binary_stream, io.IOBase):
+        binary_stream = io.BufferedReader(_ReadableStream(binary_stream))
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
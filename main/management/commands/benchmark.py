@@ -0,0 +1,247 @@
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+from main import write_behind
+from main.benchmarking import DATASETS, FULL_TABLE, STAFF_ROUTES, build_routes, fill_students, percentile
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every named route in main.urls in-process through the WSGI handler, '
+            'on synthetic Students datasets, against a temporary database')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--datasets', nargs='+', choices=list(DATASETS), default=['1k'],
+            help='Synthetic Students sizes to run, e.g. 1k 100k 1m (default: 1k)',
+        )
+        parser.add_argument('--requests', type=int, default=100, help='Requests per route (default: 100)')
+        parser.add_argument(
+            '--full-table-requests', type=int, default=5,
+            help='Requests for routes that read every row, e.g. ?stream=1 and the export (default: 5)',
+        )
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads (default: 4)')
+        parser.add_argument('--route', nargs='+', dest='routes', help='Only these URL names')
+        parser.add_argument('--save-baseline', dest='save_path', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', dest='baseline_path', help='Compare against this JSON baseline')
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Allowed p95 slowdown against the baseline, as a fraction (default: 0.25)',
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Ignore p95 slowdowns smaller than this many milliseconds (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline_path']:
+            with open(options['baseline_path']) as handle:
+                baseline = json.load(handle)
+
+        routes = build_routes(options['routes'])
+        if not routes:
+            raise CommandError('No matching routes')
+
+        workdir = tempfile.mkdtemp(prefix='benchmark-')
+        connection = connections['default']
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = {}
+        try:
+            # DEBUG would log and keep every query; measure what production runs
+            for name in ('django.db.backends', 'django.template'):
+                logging.getLogger(name).setLevel(logging.INFO)
+            with override_settings(DEBUG=False):
+                handler = WSGIHandler()
+                cookies = self._cookies()
+                for dataset in sorted(options['datasets'], key=DATASETS.get):
+                    added = fill_students(DATASETS[dataset])
+                    self.stdout.write(f'\n📊 Dataset {dataset}: {DATASETS[dataset]:,} students (+{added:,})')
+                    results[dataset] = self._run_dataset(handler, routes, cookies, options)
+                write_behind.shutdown()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['save_path']:
+            with open(options['save_path'], 'w') as handle:
+                json.dump({'env': os.environ.get('DJANGO_ENV', ''), 'results': results}, handle, indent=2)
+            self.stdout.write(f"💾 Baseline written to {options['save_path']}")
+        if baseline is not None:
+            self._compare(baseline['results'], results, options)
+        self.stdout.write('✅ Benchmark complete')
+
+    def _cookies(self):
+        csrf_secret = get_random_string(32)
+        cookies = {'public': f'{settings.CSRF_COOKIE_NAME}={csrf_secret}'}
+        cookies['csrf'] = csrf_secret
+        cookies['staff'] = cookies['public']
+        if apps.is_installed('django.contrib.auth') and apps.is_installed('django.contrib.sessions'):
+            from django.contrib.auth import get_user_model
+            from django.test import Client
+
+            user = get_user_model().objects.create_user(
+                'benchmark', password=get_random_string(16), is_staff=True, is_superuser=True,
+            )
+            client = Client()
+            client.force_login(user)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            cookies['staff'] += f'; {settings.SESSION_COOKIE_NAME}={session}'
+        return cookies
+
+    def _run_dataset(self, handler, routes, cookies, options):
+        self.stdout.write(
+            f"{'route':<28} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>8} {'bytes':>10} {'errors':>6}"
+        )
+        results = {}
+        for label, method, path, data, name in routes:
+            cookie = cookies['staff'] if name in STAFF_ROUTES else cookies['public']
+            body, content_type = b'', 'application/x-www-form-urlencoded'
+            if isinstance(data, tuple):
+                content_type, body = data
+            elif data is not None:
+                body = urlencode({**data, 'csrfmiddlewaretoken': cookies['csrf']}, doseq=True).encode()
+            count = options['full_table_requests'] if label in FULL_TABLE else options['requests']
+            result = self._run_route(
+                handler, method, path, body, content_type, cookie, cookies['csrf'], count, options['concurrency'],
+            )
+            results[label] = result
+            self.stdout.write(
+                f"{label:<28} {result['rps']:8.1f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                f"{result['p99_ms']:8.2f} {result['queries']:8.1f} {result['bytes']:10,.0f} "
+                f"{result['errors']:6}"
+            )
+        return results
+
+    def _run_route(self, handler, method, path, body, content_type, cookie, csrf, count, concurrency):
+        path, _, query = path.partition('?')
+
+        def environ():
+            return {
+                'REQUEST_METHOD': method,
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': '127.0.0.1',
+                'HTTP_HOST': 'localhost',
+                'HTTP_COOKIE': cookie,
+                'HTTP_X_CSRFTOKEN': csrf,
+                'HTTP_USER_AGENT': 'manage.py benchmark',
+                'HTTP_ACCEPT_ENCODING': 'identity',
+                'CONTENT_TYPE': content_type,
+                'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body),
+                'wsgi.errors': sys.stderr,
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+
+        def call():
+            status = []
+            result = handler(environ(), lambda line, headers, exc_info=None: status.append(line))
+            size = 0
+            try:
+                for chunk in result:
+                    size += len(chunk)
+            finally:
+                result.close()
+            return int(status[0][:3]), size
+
+        call()  # warm up templates, caches and the connection
+        latencies, sizes, errors, queries = [], [], [0], []
+        lock = threading.Lock()
+        remaining = [count]
+
+        def worker():
+            counter = QueryCounter()
+            with connections['default'].execute_wrapper(counter):
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            break
+                        remaining[0] -= 1
+                    started = time.perf_counter()
+                    status, size = call()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        latencies.append(elapsed)
+                        sizes.append(size)
+                        if status >= 400:
+                            errors[0] += 1
+            connections['default'].close()
+            with lock:
+                queries.append(counter.count)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': count,
+            'rps': count / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries': sum(queries) / count,
+            'bytes': sum(sizes) / count,
+            'errors': errors[0],
+        }
+
+    def _compare(self, baseline, results, options):
+        regressions = []
+        for dataset, routes in results.items():
+            for label, current in routes.items():
+                previous = baseline.get(dataset, {}).get(label)
+                if previous is None:
+                    continue
+                slower = current['p95_ms'] - previous['p95_ms']
+                if (slower > options['min_delta_ms']
+                        and current['p95_ms'] > previous['p95_ms'] * (1 + options['threshold'])):
+                    regressions.append(
+                        f"{dataset} {label}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms"
+                    )
+                if current['queries'] > previous['queries'] + 0.01:
+                    regressions.append(
+                        f"{dataset} {label}: queries {previous['queries']:.1f} -> {current['queries']:.1f}"
+                    )
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(f"✅ No regressions against {options['baseline_path']}")
@@ -0,0 +1,129 @@
+import gzip
+import json
+import os
+import shutil
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from main.assets import build_page
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def read_static(path):
+    found = finders.find(path)
+    if not found:
+        return None
+    with open(found, encoding='utf-8') as handle:
+        return handle.read()
+
+
+def compressed_sizes(data):
+    """Return ``(gzip bytes, brotli bytes or None)`` for ``data``."""
+    br = len(brotli.compress(data)) if brotli is not None else None
+    return len(gzip.compress(data, 9)), br
+
+
+class Command(BaseCommand):
+    help = ('Extract inline and local CSS/JS from the page templates into minified bundles, '
+            'inline per-page critical CSS, and report the savings (run before collectstatic)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=settings.ASSET_BUILD_ROOT,
+            help='Directory for the rewritten templates and bundles (default: ASSET_BUILD_ROOT)',
+        )
+        parser.add_argument(
+            '--fold-bytes', type=int, default=8000,
+            help='Markup after <body> treated as the first screen for critical CSS (default: 8000)',
+        )
+        parser.add_argument('--report', dest='report_path', help='Also write the report to this JSON file')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        template_root = os.path.join(apps.get_app_config('main').path, 'templates')
+        if os.path.isdir(output):
+            shutil.rmtree(output)
+
+        self.stdout.write(f'📦 Building page assets into {output}...')
+        bundles, written, pages = {}, {}, []
+        for directory, _, files in sorted(os.walk(template_root)):
+            for filename in sorted(files):
+                if not filename.endswith('.html'):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, template_root).replace(os.sep, '/')
+                with open(path, encoding='utf-8', newline='') as handle:
+                    page = build_page(name, handle.read(), read_static, bundles, options['fold_bytes'])
+                if page.output == page.source:
+                    continue
+
+                target = os.path.join(output, 'templates', name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'w', encoding='utf-8', newline='') as handle:
+                    handle.write(page.output)
+                written.update(page.bundles)
+                pages.append(page)
+
+        if not pages:
+            raise CommandError(f'No template under {template_root} has inline or local CSS/JS to bundle')
+
+        for path, content in written.items():
+            target = os.path.join(output, 'static', path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as handle:
+                handle.write(content)
+
+        report = self._report(pages, written)
+        if options['report_path']:
+            with open(options['report_path'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"💾 Report written to {options['report_path']}")
+        if brotli is None:
+            self.stdout.write('⚠️  Brotli is not installed: collectstatic will only write .gz variants')
+        self.stdout.write(f'✅ {len(pages)} templates and {len(written)} bundles built; run collectstatic next')
+
+    def _report(self, pages, written):
+        self.stdout.write(
+            f"{'template':<24} {'before':>9} {'after':>9} {'saved':>9} {'gzip saved':>11} {'critical':>9}"
+        )
+        report = {'pages': {}, 'bundles': {}}
+        total_before = total_after = 0
+        for page in pages:
+            before, after = page.source.encode('utf-8'), page.output.encode('utf-8')
+            gzip_before, gzip_after = len(gzip.compress(before, 9)), len(gzip.compress(after, 9))
+            total_before += len(before)
+            total_after += len(after)
+            report['pages'][page.name] = {
+                'before': len(before),
+                'after': len(after),
+                'gzip_before': gzip_before,
+                'gzip_after': gzip_after,
+                'inline_moved': page.inline_bytes,
+                'critical': page.critical_bytes,
+                'bundles': sorted(page.bundles),
+            }
+            self.stdout.write(
+                f'{page.name:<24} {len(before):9,} {len(after):9,} {len(before) - len(after):9,} '
+                f'{gzip_before - gzip_after:11,} {page.critical_bytes:9,}'
+            )
+
+        self.stdout.write(f"\n{'bundle':<40} {'bytes':>9} {'gzip':>9} {'brotli':>9}")
+        for path, content in sorted(written.items()):
+            data = content.encode('utf-8')
+            gz, br = compressed_sizes(data)
+            report['bundles'][path] = {'bytes': len(data), 'gzip': gz, 'brotli': br}
+            self.stdout.write(f"{path:<40} {len(data):9,} {gz:9,} {br if br is not None else '-':>9}")
+
+        saved = total_before - total_after
+        self.stdout.write(
+            f'⚡ Page templates: {total_before:,} -> {total_after:,} bytes '
+            f'({saved / total_before:.0%} smaller); bundles are cached long-term once hashed'
+        )
+        return report
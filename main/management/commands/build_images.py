@@ -0,0 +1,63 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.images import SOURCE_KINDS, available_formats, ensure_derivative, iter_sources
+
+
+class Command(BaseCommand):
+    help = ('Generate the responsive AVIF/WebP/JPEG derivatives of every static and uploaded image '
+            'into IMAGE_CACHE_ROOT (they are otherwise made on first request)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=SOURCE_KINDS, help='Only static files or only uploads')
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Delete cached derivatives whose source no longer exists',
+        )
+
+    def handle(self, *args, **options):
+        if options['prune'] and options['kind']:
+            raise CommandError('--prune needs every source, so it cannot be combined with --kind')
+        formats = available_formats()
+        kinds = (options['kind'],) if options['kind'] else SOURCE_KINDS
+        self.stdout.write(f"🖼️  Building image derivatives into {settings.IMAGE_CACHE_ROOT}...")
+        self.stdout.write(f"{'image':<40} {'source':>10} {'widths':>8} {'derivatives':>12}")
+
+        digests, total_source, total_derivatives, count = set(), 0, 0, 0
+        for source in iter_sources(kinds):
+            paths = [
+                ensure_derivative(source, width, fmt)
+                for fmt in [*formats, source.fallback_format]
+                for width in source.widths()
+            ]
+            source_bytes = os.path.getsize(source.path)
+            derivative_bytes = sum(os.path.getsize(path) for path in paths)
+            digests.add(source.digest)
+            total_source += source_bytes
+            total_derivatives += derivative_bytes
+            count += len(paths)
+            label = f'{source.kind}:{source.name}'
+            self.stdout.write(f'{label:<40} {source_bytes:10,} {len(source.widths()):8} {derivative_bytes:12,}')
+
+        if not digests:
+            self.stdout.write('⚠️  No images found (or Pillow is not installed)')
+            return
+        if options['prune']:
+            self._prune(digests)
+        self.stdout.write(
+            f'✅ {len(digests)} images, {count} derivatives in {", ".join([*formats, "jpeg/png"])}: '
+            f'{total_source:,} source bytes -> {total_derivatives:,} across all widths and formats'
+        )
+
+    def _prune(self, digests):
+        root = settings.IMAGE_CACHE_ROOT
+        removed = 0
+        for prefix in os.listdir(root):
+            for digest in os.listdir(os.path.join(root, prefix)):
+                if digest not in digests:
+                    shutil.rmtree(os.path.join(root, prefix, digest))
+                    removed += 1
+        self.stdout.write(f'🧹 Removed derivatives of {removed} images that no longer exist')
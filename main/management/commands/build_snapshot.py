@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the Students table to the read-only snapshot public workers serve it from (run after the last write)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help='Snapshot file (default: STUDENTS_SNAPSHOT_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.STUDENTS_SNAPSHOT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.stdout.write(f'📸 Writing the Students snapshot to {path}...')
+        info = write_snapshot(path)
+        self.stdout.write(
+            f"✅ {info['rows']:,} students, {info['strings']:,} distinct strings, "
+            f"{info['bytes']:,} bytes (version {info['version']})"
+        )
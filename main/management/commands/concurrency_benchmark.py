@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarking import percentile
+
+STACKS = {
+    'wsgi': ['-m', 'gunicorn', 'portfolio.wsgi:application', '--log-level', 'warning'],
+    'asgi': ['-m', 'uvicorn', 'portfolio.asgi:application', '--log-level', 'warning', '--no-access-log'],
+}
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return (status, keep_alive, body_bytes)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    size = 0
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            length = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(length + 2)
+            size += length
+            if length == 0:
+                break
+    elif 'content-length' in headers:
+        size = int(headers['content-length'])
+        await reader.readexactly(size)
+    else:
+        size = len(await reader.read())
+    keep_alive = headers.get('connection') != 'close' and status_line.startswith(b'HTTP/1.1')
+    return status, keep_alive, size
+
+
+async def client(host, port, paths, deadline, latencies, errors, offset):
+    """Keep one connection busy until ``deadline``, reconnecting when closed."""
+    reader = writer = None
+    turn = offset
+    while time.perf_counter() < deadline:
+        path = paths[turn % len(paths)]
+        turn += 1
+        request = f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: text/html\r\n\r\n'.encode()
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            status, keep_alive, _ = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors['connection'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status >= 400:
+            errors['status'] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(host, port, paths, concurrency, duration):
+    latencies = []
+    errors = {'connection': 0, 'status': 0}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(host, port, paths, deadline, latencies, errors, offset)
+        for offset in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'connection_errors': errors['connection'],
+        'status_errors': errors['status'],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Compare the WSGI (gunicorn) and ASGI (uvicorn) stacks under 100-1000 concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stack', nargs='+', choices=sorted(STACKS), default=['wsgi', 'asgi'],
+            help='Server stacks to benchmark (default: wsgi asgi)',
+        )
+        parser.add_argument(
+            '--concurrency', nargs='+', type=int, default=[100, 250, 500, 1000],
+            help='Concurrent connection levels (default: 100 250 500 1000)',
+        )
+        parser.add_argument(
+            '--path', nargs='+', dest='paths', default=['/', '/students/', '/students/search/?q=100'],
+            help='URL paths requested round-robin',
+        )
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per level (default: 10)')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Server worker processes for both stacks (default: CPU count)',
+        )
+        parser.add_argument(
+            '--env', default='production',
+            help='DJANGO_ENV the servers run with (default: production)',
+        )
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        self._raise_file_limit(max(options['concurrency']) * 2 + 256)
+        env = {**os.environ, 'DJANGO_ENV': options['env']}
+        env['DJANGO_SETTINGS_MODULE'] = f"portfolio.settings.{options['env']}"
+        results = []
+
+        for stack in options['stack']:
+            port = free_port()
+            command = [
+                sys.executable, *STACKS[stack],
+                '--workers', str(options['workers']),
+                *(['--bind', f'127.0.0.1:{port}'] if stack == 'wsgi'
+                  else ['--host', '127.0.0.1', '--port', str(port)]),
+            ]
+            self.stdout.write(f"🚀 Starting {stack} server ({options['workers']} workers) on port {port}...")
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+            try:
+                if not wait_for_port(port, process):
+                    raise CommandError(f'{stack} server did not start: {" ".join(command)}')
+                # Warm up imports, templates and caches in every worker
+                asyncio.run(run_level('127.0.0.1', port, options['paths'], options['workers'] * 4, 1))
+                for concurrency in options['concurrency']:
+                    result = asyncio.run(run_level(
+                        '127.0.0.1', port, options['paths'], concurrency, options['duration'],
+                    ))
+                    result['stack'] = stack
+                    results.append(result)
+                    self.stdout.write(
+                        f"  {stack} c={concurrency:<5} {result['rps']:8.0f} req/s  "
+                        f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                        f"p99 {result['p99_ms']:7.1f} ms  errors {result['connection_errors']}"
+                        f"/{result['status_errors']}"
+                    )
+            finally:
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+        self._summary(results, options['concurrency'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump({'paths': options['paths'], 'workers': options['workers'],
+                           'duration': options['duration'], 'results': results}, handle, indent=2)
+            self.stdout.write(f"💾 Results written to {options['json_path']}")
+
+    def _summary(self, results, levels):
+        by_key = {(result['stack'], result['concurrency']): result for result in results}
+        self.stdout.write(f"\n{'conns':>6} {'wsgi req/s':>11} {'asgi req/s':>11} {'wsgi p99':>10} {'asgi p99':>10}")
+        for level in levels:
+            wsgi, asgi = by_key.get(('wsgi', level)), by_key.get(('asgi', level))
+            cells = [
+                f"{stack['rps']:11.0f}" if stack else f"{'-':>11}" for stack in (wsgi, asgi)
+            ] + [
+                f"{stack['p99_ms']:8.1f}ms" if stack else f"{'-':>10}" for stack in (wsgi, asgi)
+            ]
+            self.stdout.write(f'{level:>6} ' + ' '.join(cells))
+        self.stdout.write('✅ Benchmark complete')
+
+    def _raise_file_limit(self, needed):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < needed:
+            target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            if target < needed:
+                self.stderr.write(f'⚠️  Open-file limit {target} may be too low for {needed} sockets')
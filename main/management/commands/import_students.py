@@ -0,0 +1,96 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importers import iter_records, open_text, parse_record, upsert_students
+
+
+class Command(BaseCommand):
+    help = 'Bulk import (upsert on student_id) Students from a CSV, NDJSON or JSON array file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV/NDJSON/JSON file, optionally .gz, or "-" for stdin')
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson', 'json'],
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows written per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--max-errors', type=int, default=100,
+            help='Abort after this many invalid rows (default: 100, 0 = unlimited)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or self.guess_format(path)
+        batch_size = options['batch_size']
+        max_errors = options['max_errors']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        self.stdout.write(f'📥 Importing students from {path} ({fmt}, batch size {batch_size})...')
+
+        started = time.perf_counter()
+        written = errors = 0
+        batch = []
+        with self.open_input(path) as stream:
+            records = iter_records(stream, fmt)
+            while True:
+                try:
+                    number, record = next(records)
+                except StopIteration:
+                    break
+                except ValueError as exc:  # a JSON array that breaks off
+                    raise CommandError(f'Unreadable input after {written:,} imported rows: {exc}')
+                try:
+                    batch.append(parse_record(record))
+                except ValueError as exc:
+                    errors += 1
+                    self.stderr.write(f'⚠️  Row {number}: {exc}')
+                    if max_errors and errors >= max_errors:
+                        raise CommandError(f'Too many invalid rows ({errors}), aborting')
+                    continue
+
+                if len(batch) >= batch_size:
+                    written += upsert_students(batch)
+                    batch = []
+                    self.report_progress(written, started)
+
+            if batch:
+                written += upsert_students(batch)
+
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(
+            f'🎉 Imported {written:,} students in {elapsed:.2f}s '
+            f'({rate:,.0f} rows/sec, {errors} invalid rows skipped)'
+        )
+
+    def guess_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith('.json'):
+            return 'json'
+        raise CommandError('Cannot guess the input format, pass --format')
+
+    def open_input(self, path):
+        if path == '-':
+            return open_text(sys.stdin.buffer)
+        try:
+            raw = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+        return open_text(raw)
+
+    def report_progress(self, written, started):
+        elapsed = time.perf_counter() - started
+        if elapsed:
+            self.stdout.write(f'   ... {written:,} rows ({written / elapsed:,.0f} rows/sec)')
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROBE = '''
+import sys, time
+sys.path.insert(0, {base_dir!r})
+started = time.perf_counter()
+import {entry}
+print('WALL_MS', (time.perf_counter() - started) * 1000)
+'''
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us, depth)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Report a per-module import-time breakdown of a cold start (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry', default='index',
+            help='Module imported as the cold start (default: index, the public entry point)',
+        )
+        parser.add_argument(
+            '--settings-module', dest='settings_module',
+            help='DJANGO_SETTINGS_MODULE for the probe (default: whatever the entry sets)',
+        )
+        parser.add_argument('--top', type=int, default=25, help='Modules to list (default: 25)')
+        parser.add_argument(
+            '--group', action='store_true',
+            help='Aggregate self time by top-level package instead of listing modules',
+        )
+        parser.add_argument(
+            '--budget-ms', type=float,
+            help='Fail when the cold start takes longer than this many milliseconds',
+        )
+        parser.add_argument('--json', dest='json_path', help='Also write the full report to this file')
+
+    def handle(self, *args, **options):
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('DJANGO_SETTINGS_MODULE', 'DJANGO_ENV')
+        }
+        if options['settings_module']:
+            env['DJANGO_SETTINGS_MODULE'] = options['settings_module']
+
+        probe = PROBE.format(base_dir=str(settings.BASE_DIR), entry=options['entry'])
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', probe],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {options['entry']} failed:\n{result.stderr[-2000:]}")
+
+        rows = parse_importtime(result.stderr)
+        total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+        wall_ms = next(
+            (float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith('WALL_MS')),
+            total_ms,
+        )
+
+        self.stdout.write(
+            f"⏱️  Cold start of '{options['entry']}': {wall_ms:.1f} ms wall, "
+            f'{total_ms:.1f} ms in imports, {len(rows)} modules'
+        )
+        if options['group']:
+            groups = defaultdict(int)
+            for name, self_us, _, _ in rows:
+                groups[name.split('.')[0]] += self_us
+            listing = sorted(groups.items(), key=lambda item: item[1], reverse=True)
+            self.stdout.write(f"{'self ms':>10}  package")
+            for name, self_us in listing[:options['top']]:
+                self.stdout.write(f'{self_us / 1000:10.1f}  {name}')
+        else:
+            listing = sorted(rows, key=lambda row: row[2], reverse=True)
+            self.stdout.write(f"{'cumul ms':>10} {'self ms':>9}  module")
+            for name, self_us, cumulative, depth in listing[:options['top']]:
+                self.stdout.write(f'{cumulative / 1000:10.1f} {self_us / 1000:9.1f}  {name}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump({
+                    'entry': options['entry'],
+                    'wall_ms': wall_ms,
+                    'import_ms': total_ms,
+                    'modules': [
+                        {'module': name, 'self_us': self_us, 'cumulative_us': cumulative, 'depth': depth}
+                        for name, self_us, cumulative, depth in rows
+                    ],
+                }, handle, indent=2)
+
+        budget = options['budget_ms']
+        if budget is not None:
+            if wall_ms > budget:
+                raise CommandError(f'Cold start {wall_ms:.1f} ms exceeds the {budget:.0f} ms budget')
+            self.stdout.write(f'✅ Within the {budget:.0f} ms cold-start budget')
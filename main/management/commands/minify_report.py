@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+
+from main.template_minify import minify_html, should_minify
+
+
+def template_files():
+    """Yield ``(name, path)`` for every project template the loaders minify."""
+    seen = set()
+    for directory in [*engines['django'].engine.dirs, *get_app_template_dirs('templates')]:
+        for root, _, files in sorted(os.walk(directory)):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                if name not in seen and should_minify(path):
+                    seen.add(name)
+                    yield name, path
+
+
+class Command(BaseCommand):
+    help = 'Report how much load-time HTML minification saves per template'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', dest='json_path', help='Also write the report to this file')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'template':<40} {'source':>9} {'minified':>9} {'saved':>6} {'gzip':>8} {'gzip min':>8}"
+        )
+        report = {}
+        for name, path in template_files():
+            with open(path, encoding='utf-8') as handle:
+                source = handle.read().encode('utf-8')
+            minified = minify_html(source.decode('utf-8')).encode('utf-8')
+            report[name] = {
+                'source': len(source),
+                'minified': len(minified),
+                'gzip_source': len(gzip.compress(source, 9)),
+                'gzip_minified': len(gzip.compress(minified, 9)),
+            }
+            entry = report[name]
+            self.stdout.write(
+                f"{name:<40} {entry['source']:9,} {entry['minified']:9,} "
+                f"{1 - entry['minified'] / max(entry['source'], 1):6.0%} "
+                f"{entry['gzip_source']:8,} {entry['gzip_minified']:8,}"
+            )
+        if not report:
+            raise CommandError('No project templates found')
+
+        source = sum(entry['source'] for entry in report.values())
+        minified = sum(entry['minified'] for entry in report.values())
+        self.stdout.write(f'⚡ {len(report)} templates: {source:,} -> {minified:,} bytes ({1 - minified / source:.0%} smaller)')
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"💾 Report written to {options['json_path']}")
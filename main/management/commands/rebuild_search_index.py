@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.search import install_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = 'Recreate the Students full-text search index and its sync triggers'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The Students search index requires SQLite (FTS5)')
+
+        self.stdout.write('🔎 Rebuilding Students search index...')
+        with connection.schema_editor() as schema_editor:
+            install_search_index(schema_editor)
+
+        if search_index_available():
+            self.stdout.write('✅ Search index rebuilt')
+        else:
+            raise CommandError('Search index was not created')
@@ -0,0 +1,157 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import ConnectionHandler
+from django.test.utils import override_settings
+
+from portfolio.sqlite import sqlite_database
+
+COLUMNS = 'student_id, name_prefix, first_name, last_name'
+
+# One simulated request: the queries behind a students page and a lookup
+REQUEST = (
+    ('SELECT COUNT(*) FROM main_students', lambda top: ()),
+    (f'SELECT {COLUMNS} FROM main_students WHERE student_id > %s ORDER BY student_id LIMIT 51',
+     lambda top: (random.randint(0, top),)),
+    (f'SELECT {COLUMNS} FROM main_students WHERE student_id = %s',
+     lambda top: (random.randint(0, top),)),
+)
+
+
+def baseline_profile(path):
+    """Django's defaults: rollback journal, no PRAGMAs, a connection per request."""
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'CONN_MAX_AGE': 0}
+
+
+PROFILES = {
+    'baseline': baseline_profile,
+    'tuned': lambda path: sqlite_database(path),
+    'immutable': lambda path: sqlite_database(path, read_only=True),
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure read QPS of the Students queries under the default and tuned SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=str(settings.BASE_DIR / 'db.sqlite3'),
+            help='SQLite file to copy for the runs (default: db.sqlite3); it is never modified',
+        )
+        parser.add_argument(
+            '--rows', type=int, default=100_000,
+            help='Pad the copy with synthetic students up to this many rows (default: 100000)',
+        )
+        parser.add_argument(
+            '--profile', nargs='+', choices=list(PROFILES), default=list(PROFILES),
+            help='Profiles to run (default: all)',
+        )
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per profile (default: 5)')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent readers (default: 4)')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['database']):
+            raise CommandError(f"No database at {options['database']}")
+
+        workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+        try:
+            seed = os.path.join(workdir, 'seed.sqlite3')
+            top = self._prepare_seed(options['database'], seed, options['rows'])
+            results = []
+            for name in options['profile']:
+                path = os.path.join(workdir, f'{name}.sqlite3')
+                shutil.copyfile(seed, path)
+                # DEBUG would wrap every cursor in query logging
+                with override_settings(DEBUG=False):
+                    result = self._run(name, PROFILES[name](path), top, options['duration'], options['threads'])
+                results.append(result)
+                self.stdout.write(
+                    f"  {name:<10} {result['requests_per_second']:9.0f} req/s "
+                    f"{result['queries_per_second']:9.0f} queries/s  "
+                    f"p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        base = next((result for result in results if result['profile'] == 'baseline'), None)
+        if base:
+            for result in results:
+                if result is not base:
+                    speedup = result['requests_per_second'] / base['requests_per_second']
+                    self.stdout.write(f"⚡ {result['profile']}: {speedup:.2f}x baseline read throughput")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump({'rows': top, 'threads': options['threads'], 'results': results}, handle, indent=2)
+            self.stdout.write(f"💾 Results written to {options['json_path']}")
+
+    def _prepare_seed(self, source, seed, rows):
+        """Copy ``source`` (in rollback-journal mode) and pad it to ``rows`` students."""
+        original, connection = sqlite3.connect(source), sqlite3.connect(seed)
+        original.backup(connection)
+        original.close()
+        try:
+            existing, top = connection.execute(
+                'SELECT COUNT(*), COALESCE(MAX(student_id), 0) FROM main_students'
+            ).fetchone()
+            if existing < rows:
+                self.stdout.write(f'🧪 Adding {rows - existing:,} synthetic students to the copy...')
+                connection.executemany(
+                    f'INSERT INTO main_students ({COLUMNS}) VALUES (?, ?, ?, ?)',
+                    ((top + number, 'นาย', f'ชื่อ{number}', f'นามสกุล{number}')
+                     for number in range(1, rows - existing + 1)),
+                )
+                connection.commit()
+                top += rows - existing
+            connection.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            connection.close()
+        self.stdout.write(f'📊 Benchmarking against {max(existing, rows):,} students')
+        return top
+
+    def _run(self, name, profile, top, duration, threads):
+        handler = ConnectionHandler({'default': profile})
+        persistent = profile.get('CONN_MAX_AGE') != 0
+        latencies = [[] for _ in range(threads)]
+        deadline = time.perf_counter() + duration
+
+        def reader(samples):
+            connection = handler['default']
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                with connection.cursor() as cursor:
+                    for sql, params in REQUEST:
+                        cursor.execute(sql, params(top))
+                        cursor.fetchall()
+                if not persistent:
+                    # What Django does at request_finished with CONN_MAX_AGE = 0
+                    connection.close()
+                samples.append(time.perf_counter() - started)
+            connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=reader, args=(samples,)) for samples in latencies]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        samples = sorted(sample for thread_samples in latencies for sample in thread_samples)
+        requests = len(samples)
+        return {
+            'profile': name,
+            'requests': requests,
+            'requests_per_second': requests / elapsed,
+            'queries_per_second': requests * len(REQUEST) / elapsed,
+            'p50_ms': samples[requests // 2] * 1000 if samples else 0.0,
+            'p99_ms': samples[min(requests - 1, int(requests * 0.99))] * 1000 if samples else 0.0,
+        }
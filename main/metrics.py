@@ -0,0 +1,179 @@
+"""
+In-process request metrics.
+
+``main.middleware.MetricsMiddleware`` times every request and records it
+here, keyed by URL route (the pattern, not the path, so the label set
+stays small), method and status code. Each key keeps a latency histogram
+plus totals for database queries, database time, template render time
+and response bytes. ``render_prometheus`` returns the text exposition
+format served at ``/metrics``.
+
+Database time is collected by an execute wrapper added to every new
+connection; template time by ``main.metrics.DjangoTemplates``, the template
+backend configured in settings.TEMPLATES, whose templates time their own
+``render``. Both report into the ``RequestTimings`` of the current request
+through a context variable, which follows the request into the threads
+``sync_to_async`` uses for the async ORM. Counters live in process
+memory, so every worker process exposes its own set.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+# Latency histogram upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_timings', default=None)
+_lock = threading.Lock()
+_series = {}
+_installed = False
+
+
+class RequestTimings:
+    """Database and template time accumulated while serving one request."""
+
+    __slots__ = ('queries', 'db', 'template', '_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self._depth = 0
+
+
+def start_request():
+    """Begin collecting timings for the current context; returns a reset token."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record(route, method, status, duration, timings, size):
+    """Add one finished request to the series for ``(route, method, status)``."""
+    index = bisect_left(BUCKETS, duration)
+    key = (route, method, status)
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0, 0.0, 0.0, 0]
+        series[index] += 1
+        # sum, db queries, db seconds, template seconds, bytes
+        series[-5] += duration
+        series[-4] += timings.queries
+        series[-3] += timings.db
+        series[-2] += timings.template
+        series[-1] += size
+
+
+def record_bytes(route, method, status, size):
+    """Add bytes sent after the fact (streaming responses)."""
+    with _lock:
+        series = _series.get((route, method, status))
+        if series is not None:
+            series[-1] += size
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+def _labels(route, method, status):
+    route = route.replace('\\', '\\\\').replace('"', '\\"')
+    return f'route="{route}",method="{method}",status="{status}"'
+
+
+def render_prometheus():
+    """Return every series in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = [(key, list(series)) for key, series in sorted(_series.items())]
+
+    lines = [
+        '# HELP portfolio_request_duration_seconds Time spent serving requests.',
+        '# TYPE portfolio_request_duration_seconds histogram',
+    ]
+    for key, series in snapshot:
+        labels = _labels(*key)
+        cumulative = 0
+        for bound, count in zip(BUCKETS, series):
+            cumulative += count
+            lines.append(f'portfolio_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += series[len(BUCKETS)]
+        lines.append(f'portfolio_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f'portfolio_request_duration_seconds_sum{{{labels}}} {series[-5]:.6f}')
+        lines.append(f'portfolio_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+    for name, position, kind, help_text in (
+        ('portfolio_db_queries_total', -4, 'd', 'Database queries executed.'),
+        ('portfolio_db_duration_seconds_total', -3, '.6f', 'Time spent in database queries.'),
+        ('portfolio_template_duration_seconds_total', -2, '.6f', 'Time spent rendering templates.'),
+        ('portfolio_response_bytes_total', -1, 'd', 'Response body bytes sent.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, series in snapshot:
+            lines.append(f'{name}{{{_labels(*key)}}} {series[position]:{kind}}')
+    return '\n'.join(lines) + '\n'
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - started
+        timings.queries += 1
+
+
+def _add_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def install():
+    """Hook query timing into every database connection (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_query_timer, dispatch_uid='main.metrics.query_timer')
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(None, connection)
+
+
+class Template(django_backend.Template):
+    """A Django template that adds its render time to the current request."""
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None or timings._depth:
+            return super().render(context, request)
+        timings._depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += time.perf_counter() - started
+            timings._depth -= 1
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The ``DjangoTemplates`` backend with timed templates (use it as BACKEND)."""
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
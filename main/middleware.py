@@ -0,0 +1,253 @@
+"""
+Project middleware.
+"""
+
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, query_plans
+from .compression import (
+    acompress_stream, compress, compress_stream, compression_level, is_compressible, negotiate,
+)
+from .page_cache import encoded_content
+
+# Anything else is recorded as 'other' to keep the metric label set bounded
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, which makes Django run the whole
+    chain below it (and every async view) through a thread under ASGI.
+    This variant looks static files up in the in-memory table on the event
+    loop and only moves the file open/stat work to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Time each request, add a ``Server-Timing`` header (total, db, tpl) and
+    record per-route metrics in ``main.metrics``. Put it first in
+    MIDDLEWARE so the total covers the rest of the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        metrics.install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = perf_counter()
+        timings, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._finish(request, response, perf_counter() - started, timings)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        timings, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._finish(request, response, perf_counter() - started, timings)
+
+    def _finish(self, request, response, duration, timings):
+        match = request.resolver_match
+        route = '/' + match.route if match is not None else '<unresolved>'
+        method = request.method if request.method in METHODS else 'other'
+        status = response.status_code
+
+        if response.streaming:
+            size = 0
+            response.streaming_content = (
+                _acount_bytes(response.streaming_content, route, method, status)
+                if response.is_async else
+                _count_bytes(response.streaming_content, route, method, status)
+            )
+        else:
+            size = len(response.content)
+        metrics.record(route, method, status, duration, timings, size)
+
+        response['Server-Timing'] = (
+            f'total;dur={duration * 1000:.2f}, '
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries", '
+            f'tpl;dur={timings.template * 1000:.2f}'
+        )
+        return response
+
+
+
+class CompressionMiddleware:
+    """
+    Compress text responses with br, zstd or gzip as negotiated from
+    ``Accept-Encoding`` (see ``main.compression``). Regular bodies under
+    ``COMPRESSION_MIN_SIZE`` are sent as they are; streaming bodies are
+    compressed chunk by chunk. Place it after WhiteNoise, which serves
+    its own precompressed files.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        if (
+            response.has_header('Content-Encoding')
+            or response.status_code == 304
+            or not is_compressible(response.get('Content-Type', ''))
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = (
+                acompress_stream(response.streaming_content, encoding)
+                if response.is_async else
+                compress_stream(response.streaming_content, encoding)
+            )
+            del response['Content-Length']
+        else:
+            body = encoded_content(
+                response, encoding,
+                lambda content: compress(content, encoding, compression_level(encoding)),
+            )
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        # The ETag names the uncompressed body (RFC 9110 8.8.3)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+def _count_bytes(content, route, method, status):
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        metrics.record_bytes(route, method, status, size)
+
+
+async def _acount_bytes(content, route, method, status):
+    size = 0
+    try:
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        metrics.record_bytes(route, method, status, size)
+
+
+class QueryPlanMiddleware:
+    """
+    Debug mode of ``main.query_plans``: with ``QUERY_PLAN_CHECK = 'warn'``
+    every query of a ``main`` or admin view is explained and a full scan
+    or temp B-tree sort of a large table is logged; ``'raise'`` fails the
+    request instead. Removed from the chain when the setting is empty.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.QUERY_PLAN_CHECK not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.on_problem = self._raise if settings.QUERY_PLAN_CHECK == 'raise' else self._warn
+        query_plans.install()
+
+    @staticmethod
+    def _warn(report):
+        query_plans.logger.warning('Query plan: %s', report)
+
+    @staticmethod
+    def _raise(report):
+        raise query_plans.QueryPlanError(report)
+
+    def _checked(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.app_name == 'main' or 'admin' in match.namespaces
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._checked(request):
+            return self.get_response(request)
+        with query_plans.check_query_plans(on_problem=self.on_problem):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self._checked(request):
+            return await self.get_response(request)
+        with query_plans.check_query_plans(on_problem=self.on_problem):
+            return await self.get_response(request)
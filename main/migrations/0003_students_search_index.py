@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from main.search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_alter_students_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
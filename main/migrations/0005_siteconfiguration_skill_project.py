@@ -0,0 +1,73 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:29
+
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_contactmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteConfiguration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_title', models.CharField(blank=True, max_length=100)),
+                ('site_subtitle', models.CharField(blank=True, max_length=200)),
+                ('about_text', models.TextField(blank=True)),
+                ('contact_email', models.EmailField(blank=True, max_length=254)),
+                ('contact_phone', models.CharField(blank=True, max_length=30)),
+                ('github_url', models.URLField(blank=True)),
+                ('linkedin_url', models.URLField(blank=True)),
+                ('facebook_url', models.URLField(blank=True)),
+                ('twitter_url', models.URLField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'ตั้งค่าเว็บไซต์',
+                'verbose_name_plural': 'ตั้งค่าเว็บไซต์',
+            },
+        ),
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('proficiency', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100)])),
+                ('category', models.CharField(choices=[('frontend', 'Frontend'), ('backend', 'Backend'), ('database', 'Database'), ('devops', 'DevOps')], max_length=20)),
+                ('icon', models.CharField(blank=True, max_length=50)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'ทักษะ',
+                'verbose_name_plural': 'ทักษะ',
+                'ordering': ['order', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('short_description', models.CharField(max_length=300)),
+                ('description', models.TextField(blank=True)),
+                ('github_url', models.URLField(blank=True)),
+                ('demo_url', models.URLField(blank=True)),
+                ('status', models.CharField(choices=[('completed', 'เสร็จสมบูรณ์'), ('in_progress', 'กำลังพัฒนา'), ('pending', 'รอดำเนินการ')], default='completed', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=100, validators=[django.core.validators.MaxValueValidator(100)])),
+                ('created_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('technologies', models.ManyToManyField(blank=True, related_name='projects', to='main.skill')),
+            ],
+            options={
+                'verbose_name': 'ผลงาน',
+                'verbose_name_plural': 'ผลงาน',
+                'ordering': ['order', '-created_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_siteconfiguration_skill_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='projects/'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+from main.stats import count_statistics
+
+
+def count_existing_students(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Students = apps.get_model('main', 'Students')
+    StudentStatistic = apps.get_model('main', 'StudentStatistic')
+    StudentStatistic.objects.using(alias).bulk_create(
+        StudentStatistic(dimension=dimension, key=key, count=count)
+        for dimension, key, count in count_statistics(Students.objects.using(alias))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_project_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('prefix', 'คำนำหน้า'), ('range', 'ช่วงรหัสนักเรียน')], max_length=10)),
+                ('key', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'สถิตินักเรียน',
+                'verbose_name_plural': 'สถิตินักเรียน',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='unique_student_statistic')],
+            },
+        ),
+        migrations.RunPython(count_existing_students, migrations.RunPython.noop),
+    ]
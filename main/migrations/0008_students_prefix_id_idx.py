@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_studentstatistic'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='students',
+            index=models.Index(fields=['name_prefix', 'student_id'], name='students_prefix_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_students_prefix_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-created_at'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='students',
+            index=models.Index(fields=['first_name', 'last_name'], name='students_first_last_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='students',
+            index=models.Index(fields=['last_name', 'first_name'], name='students_last_first_idx'),
+        ),
+    ]
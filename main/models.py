@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator
 from django.db import models
 from django.utils import timezone
 
@@ -17,6 +18,135 @@ class Students(models.Model):
     class Meta:
         verbose_name = "นักเรียน"
         verbose_name_plural = "นักเรียน"
+        indexes = [
+            # Prefix filter with keyset pages on student_id (admin changelist)
+            models.Index(fields=['name_prefix', 'student_id'], name='students_prefix_id_idx'),
+            # Short search terms are matched as name prefixes (main/search.py)
+            models.Index(fields=['first_name', 'last_name'], name='students_first_last_idx'),
+            models.Index(fields=['last_name', 'first_name'], name='students_last_first_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the statistics move a count when the prefix or id is edited
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self):
         return f"{self.name_prefix}{self.first_name} {self.last_name}"
+
+STATISTIC_DIMENSIONS = [
+    ('prefix', 'คำนำหน้า'),
+    ('range', 'ช่วงรหัสนักเรียน'),
+]
+
+class StudentStatistic(models.Model):
+    """Materialized student count per prefix or student_id range (see main/stats.py)."""
+    dimension = models.CharField(choices=STATISTIC_DIMENSIONS, max_length=10)
+    key = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "สถิตินักเรียน"
+        verbose_name_plural = "สถิตินักเรียน"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_student_statistic'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} = {self.count}"
+
+class ContactMessage(models.Model):
+    name = models.CharField(max_length=100)
+    lastname = models.CharField(max_length=100)
+    email = models.EmailField()
+    message = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "ข้อความติดต่อ"
+        verbose_name_plural = "ข้อความติดต่อ"
+        ordering = ['-created_at']
+        indexes = [
+            # Newest-first admin list without sorting the table
+            models.Index(fields=['-created_at'], name='contact_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} {self.lastname} <{self.email}>"
+
+SKILL_CATEGORY_CHOICES = [
+    ('frontend', 'Frontend'),
+    ('backend', 'Backend'),
+    ('database', 'Database'),
+    ('devops', 'DevOps'),
+]
+
+PROJECT_STATUS_CHOICES = [
+    ('completed', 'เสร็จสมบูรณ์'),
+    ('in_progress', 'กำลังพัฒนา'),
+    ('pending', 'รอดำเนินการ'),
+]
+
+class Skill(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    proficiency = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
+    category = models.CharField(choices=SKILL_CATEGORY_CHOICES, max_length=20)
+    icon = models.CharField(max_length=50, blank=True)
+    is_featured = models.BooleanField(default=False)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "ทักษะ"
+        verbose_name_plural = "ทักษะ"
+        ordering = ['order', 'name']
+
+    def __str__(self):
+        return self.name
+
+class Project(models.Model):
+    title = models.CharField(max_length=200)
+    short_description = models.CharField(max_length=300)
+    description = models.TextField(blank=True)
+    # Rendered through {% responsive_image %} as resized AVIF/WebP/JPEG
+    image = models.ImageField(upload_to='projects/', blank=True)
+    technologies = models.ManyToManyField(Skill, blank=True, related_name='projects')
+    github_url = models.URLField(blank=True)
+    demo_url = models.URLField(blank=True)
+    status = models.CharField(choices=PROJECT_STATUS_CHOICES, max_length=20, default='completed')
+    progress = models.PositiveSmallIntegerField(default=100, validators=[MaxValueValidator(100)])
+    created_date = models.DateField(default=timezone.localdate)
+    is_featured = models.BooleanField(default=False)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "ผลงาน"
+        verbose_name_plural = "ผลงาน"
+        ordering = ['order', '-created_date']
+
+    def __str__(self):
+        return self.title
+
+class SiteConfiguration(models.Model):
+    """Site-wide texts and links; a singleton stored with pk=1."""
+    site_title = models.CharField(max_length=100, blank=True)
+    site_subtitle = models.CharField(max_length=200, blank=True)
+    about_text = models.TextField(blank=True)
+    contact_email = models.EmailField(blank=True)
+    contact_phone = models.CharField(max_length=30, blank=True)
+    github_url = models.URLField(blank=True)
+    linkedin_url = models.URLField(blank=True)
+    facebook_url = models.URLField(blank=True)
+    twitter_url = models.URLField(blank=True)
+
+    class Meta:
+        verbose_name = "ตั้งค่าเว็บไซต์"
+        verbose_name_plural = "ตั้งค่าเว็บไซต์"
+
+    def save(self, *args, **kwargs):
+        self.pk = 1
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.site_title or "ตั้งค่าเว็บไซต์"
@@ -0,0 +1,98 @@
+"""
+Multiplication tables computed a block at a time.
+
+``multiplication_table`` builds every cell of an N x M table in one
+vectorized outer product when NumPy is installed, and with one list
+comprehension per row otherwise; NumPy is optional and only used when
+importable, and only for products that fit its int64 (Python ints
+never overflow). ``stream_table`` encodes large tables as CSV or JSON in
+blocks of about ``BLOCK_CELLS`` cells, so memory use does not grow with
+the table size.
+"""
+
+import json
+
+from .exports import gzip_stream
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised where NumPy is missing
+    np = None
+
+INT64_MAX = 2 ** 63 - 1
+
+TABLE_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+BLOCK_CELLS = 50_000
+
+
+def _largest(values):
+    if isinstance(values, range):
+        return max(abs(values.start), abs(values[-1])) if values else 0
+    return max(map(abs, values), default=0)
+
+
+def _int64_array(values):
+    if isinstance(values, range):
+        return np.arange(values.start, values.stop, values.step, dtype=np.int64)
+    return np.asarray(values, dtype=np.int64)
+
+
+def multiplication_table(multiplicands, multipliers):
+    """Return ``rows[i][j] = multiplicands[i] * multipliers[j]`` as lists of ints."""
+    if not isinstance(multiplicands, range):
+        multiplicands = list(multiplicands)
+    if not isinstance(multipliers, range):
+        multipliers = list(multipliers)
+    if np is not None and _largest(multiplicands) * _largest(multipliers) <= INT64_MAX:
+        return np.multiply.outer(_int64_array(multiplicands), _int64_array(multipliers)).tolist()
+    multipliers = list(multipliers)
+    return [[value * multiplier for multiplier in multipliers] for value in multiplicands]
+
+
+def multiplication_rows(number, multipliers):
+    """``(multiplier, number * multiplier)`` pairs, ready for a template loop."""
+    multipliers = list(multipliers)
+    return list(zip(multipliers, multiplication_table((number,), multipliers)[0]))
+
+
+def table_blocks(rows, columns, block_cells=BLOCK_CELLS):
+    """Yield ``(first_row, block)`` for the 1..rows x 1..columns table."""
+    step = max(1, block_cells // columns)
+    multipliers = range(1, columns + 1)
+    for start in range(1, rows + 1, step):
+        yield start, multiplication_table(range(start, min(start + step, rows + 1)), multipliers)
+
+
+def encode_table_csv(rows, columns, block_cells=BLOCK_CELLS):
+    yield (','.join(['x', *map(str, range(1, columns + 1))]) + '\n').encode('ascii')
+    for start, block in table_blocks(rows, columns, block_cells):
+        lines = [
+            f'{number},' + ','.join(map(str, cells))
+            for number, cells in enumerate(block, start)
+        ]
+        yield ('\n'.join(lines) + '\n').encode('ascii')
+
+
+def encode_table_json(rows, columns, block_cells=BLOCK_CELLS):
+    yield f'{{"rows":{rows},"columns":{columns},"table":['.encode('ascii')
+    separator = ''
+    for _, block in table_blocks(rows, columns, block_cells):
+        # Each block is one JSON array; drop its brackets to splice it in
+        yield (separator + json.dumps(block, separators=(',', ':'))[1:-1]).encode('ascii')
+        separator = ','
+    yield b']}'
+
+
+TABLE_ENCODERS = {
+    'csv': encode_table_csv,
+    'json': encode_table_json,
+}
+
+
+def stream_table(fmt, rows, columns, compress=False):
+    """Return an iterator of encoded (and optionally gzipped) byte chunks."""
+    chunks = TABLE_ENCODERS[fmt](rows, columns)
+    return gzip_stream(chunks) if compress else chunks
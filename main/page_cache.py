@@ -0,0 +1,218 @@
+"""
+Full-page response cache with conditional GET support.
+
+``page_cache`` stores the rendered body of GET/HEAD responses together
+with a strong ETag and a Last-Modified stamp. A request whose
+``If-None-Match``/``If-Modified-Since`` matches the cached entry gets a 304
+without the view running; any other hit is served from the cache.
+
+Entries can depend on tags (e.g. ``'students'``). Each tag has a version
+stored in the ``PAGE_CACHE_TAG_ALIAS`` cache; ``invalidate`` bumps it,
+which makes every key built with the old version unreachable.
+``main.signals`` bumps ``'students'`` whenever Students rows change.
+Entries stay in each worker's own memory (``PAGE_CACHE_ALIAS``), but the
+versions must be shared by all workers (the ``'tags'`` alias is a
+file-based cache), or a change would only reach the worker that made it.
+
+Responses built from an entry remember its ETag, so the compression
+middleware can keep their encoded bodies under the same content address
+(``encoded_content``) instead of recompressing every hit.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+KEY_PREFIX = 'pagecache'
+
+
+def get_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def get_tag_cache():
+    return caches[settings.PAGE_CACHE_TAG_ALIAS]
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def tag_versions(tags):
+    """Return the current version of each tag, creating missing ones."""
+    if not tags:
+        return ()
+    cache = get_tag_cache()
+    keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            found[key] = time.time_ns()
+            if not cache.add(key, found[key], None):
+                found[key] = cache.get(key, found[key])
+        versions.append(found[key])
+    return tuple(versions)
+
+
+def invalidate(*tags):
+    """Make every page cached under ``tags`` stale."""
+    get_tag_cache().set_many({_tag_key(tag): time.time_ns() for tag in tags}, None)
+
+
+def make_etag(content):
+    return '"%s"' % hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _cache_key(request, vary_on, vary_on_csrf, depends_on):
+    parts = [
+        request.get_full_path(),
+        translation.get_language() or settings.LANGUAGE_CODE,
+    ]
+    parts.extend(request.META.get(name, '') for name in vary_on)
+    if vary_on_csrf:
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    parts.extend(str(version) for version in tag_versions(depends_on))
+    digest = hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=16)
+    return f'{KEY_PREFIX}:page:{digest.hexdigest()}'
+
+
+def _csrf_cookie_matches(request):
+    # A token rendered for a freshly generated secret must not be cached
+    # under the visitor's (missing or replaced) cookie value.
+    cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    return bool(cookie) and request.META.get('CSRF_COOKIE') == cookie
+
+
+def _build_response(entry):
+    content, content_type, etag, last_modified = entry
+    response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response.page_cache_etag = etag
+    return response
+
+
+def encoded_content(response, encoding, encode):
+    """
+    Return ``encode(response.content)`` for ``encoding``. Bodies of page
+    cache entries are encoded once and cached under their ETag.
+    """
+    etag = getattr(response, 'page_cache_etag', None)
+    if etag is None:
+        return encode(response.content)
+    key = f'{KEY_PREFIX}:encoded:{encoding}:{etag.strip(chr(34))}'
+    cache = get_cache()
+    body = cache.get(key)
+    if body is None:
+        body = encode(response.content)
+        cache.set(key, body, getattr(response, 'page_cache_timeout', settings.PAGE_CACHE_TIMEOUT))
+    return body
+
+
+def _lookup(request, vary_on, vary_on_csrf, depends_on):
+    """Return ``(key, response)``; ``response`` is None on a cache miss."""
+    key = _cache_key(request, vary_on, vary_on_csrf, depends_on)
+    entry = get_cache().get(key)
+    if entry is None:
+        return key, None
+    _, _, etag, last_modified = entry
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _build_response(entry)
+        response['X-Page-Cache'] = 'hit'
+    return key, response
+
+
+def _store(request, key, response, timeout, vary_on_csrf):
+    """Cache a freshly rendered ``response`` if it is safe to share."""
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or response.has_header('Cache-Control')
+        or (vary_on_csrf and not _csrf_cookie_matches(request))
+    ):
+        return response
+
+    etag = make_etag(response.content)
+    last_modified = int(time.time())
+    timeout = settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout
+    get_cache().set(
+        key,
+        (response.content, response['Content-Type'], etag, last_modified),
+        timeout,
+    )
+    response['ETag'] = etag
+    response.page_cache_etag = etag
+    response.page_cache_timeout = timeout
+    response['Last-Modified'] = http_date(last_modified)
+    response['X-Page-Cache'] = 'miss'
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response,
+    )
+
+
+def _cacheable(request):
+    return request.method in ('GET', 'HEAD') and settings.PAGE_CACHE_ENABLED
+
+
+def page_cache(timeout=None, vary_on=(), vary_on_csrf=False, depends_on=()):
+    """
+    Cache a view's GET/HEAD responses and answer conditional requests.
+
+    ``vary_on`` lists ``request.META`` keys the page renders (for example
+    ``'HTTP_USER_AGENT'``); ``vary_on_csrf`` keys the entry on the CSRF
+    cookie for pages that embed ``{% csrf_token %}``; ``depends_on`` lists
+    invalidation tags. Works on sync and async views alike; the caches are
+    in process memory and small local files, so async views call them
+    directly instead of hopping to a thread through the ``a*`` methods.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return await view_func(request, *args, **kwargs)
+                key, response = _lookup(request, vary_on, vary_on_csrf, depends_on)
+                if response is None:
+                    response = _store(
+                        request, key, await view_func(request, *args, **kwargs),
+                        timeout, vary_on_csrf,
+                    )
+                return _patch_vary(response, vary_on, vary_on_csrf)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return view_func(request, *args, **kwargs)
+                key, response = _lookup(request, vary_on, vary_on_csrf, depends_on)
+                if response is None:
+                    response = _store(
+                        request, key, view_func(request, *args, **kwargs),
+                        timeout, vary_on_csrf,
+                    )
+                return _patch_vary(response, vary_on, vary_on_csrf)
+
+        return wrapper
+    return decorator
+
+
+def _patch_vary(response, vary_on, vary_on_csrf):
+    headers = [
+        name[5:].replace('_', '-').title()
+        for name in vary_on if name.startswith('HTTP_')
+    ]
+    if vary_on_csrf:
+        headers.append('Cookie')
+    if headers:
+        patch_vary_headers(response, headers)
+    return response
@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by the last/first key seen instead of an OFFSET, so
+fetching page N costs the same index seek as fetching page 1.
+"""
+
+from django.db.models import Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _key_of(row, key):
+    if isinstance(row, dict):
+        return row[key]
+    return getattr(row, key)
+
+
+class KeysetPage:
+    """One page of rows plus the cursors needed to reach its neighbours."""
+
+    def __init__(self, object_list, key, has_next, has_previous):
+        self.object_list = object_list
+        self.key = key
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return _key_of(self.object_list[-1], self.key)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return _key_of(self.object_list[0], self.key)
+        return None
+
+
+def _window(queryset, key, cursor, forward, page_size):
+    # The page in reading order plus one lookahead row on each side: the row
+    # nearest the cursor on the far side (if any) comes first, and the
+    # ``page_size + 1``-th row after it shows there is more ahead. The
+    # lookbehind row is found by an uncorrelated scalar subquery, so this is
+    # still one index seek: key >= COALESCE((SELECT key <= cursor ...), cursor).
+    ascending, descending = key, f'-{key}'
+    if cursor is None:
+        return queryset.order_by(ascending)[:page_size + 1]
+    field = queryset.model._meta.get_field(key)
+    behind = queryset.filter(**{f'{key}__{"lte" if forward else "gte"}': cursor})
+    behind = behind.order_by(descending if forward else ascending).values(key)[:1]
+    edge = Coalesce(Subquery(behind), Value(cursor), output_field=field)
+    return (
+        queryset.filter(**{f'{key}__{"gte" if forward else "lte"}': edge})
+        .order_by(ascending if forward else descending)[:page_size + 2]
+    )
+
+
+def _page(rows, key, cursor, forward, page_size):
+    # Split the lookahead rows of ``_window`` off into the page's flags
+    behind = bool(rows) and cursor is not None and (
+        _key_of(rows[0], key) <= cursor if forward else _key_of(rows[0], key) >= cursor
+    )
+    if behind:
+        rows = rows[1:]
+    ahead = len(rows) > page_size
+    rows = rows[:page_size]
+    if forward:
+        return KeysetPage(rows, key, has_next=ahead, has_previous=behind)
+    rows.reverse()
+    return KeysetPage(rows, key, has_next=behind, has_previous=ahead)
+
+
+def keyset_paginate(queryset, key, after=None, before=None, page_size=50):
+    """
+    Return a ``KeysetPage`` of ``queryset`` ordered by the unique ``key``.
+
+    ``after`` returns the rows following that key, ``before`` the rows
+    preceding it; with neither, the first page is returned. One query
+    reads at most ``page_size + 2`` rows: the page and a lookahead row on
+    either side of it, so both ``has_next`` and ``has_previous`` are real.
+    """
+    cursor, forward = (before, False) if before is not None else (after, True)
+    rows = list(_window(queryset, key, cursor, forward, page_size))
+    return _page(rows, key, cursor, forward, page_size)
+
+
+async def akeyset_paginate(queryset, key, after=None, before=None, page_size=50):
+    """Async ``keyset_paginate`` for async views (rows read with ``async for``)."""
+    cursor, forward = (before, False) if before is not None else (after, True)
+    rows = [row async for row in _window(queryset, key, cursor, forward, page_size)]
+    return _page(rows, key, cursor, forward, page_size)
@@ -0,0 +1,153 @@
+"""
+EXPLAIN QUERY PLAN guard for SQLite.
+
+Every SELECT/UPDATE/DELETE run while a check is active is explained
+first, and its plan is reported when, on a table with at least
+``min_rows`` rows (estimated from ``MAX(rowid)``), it:
+
+- scans the whole table (``SCAN t``), or walks a whole index without a
+  ``LIMIT`` to stop it (``SCAN t USING INDEX i``);
+- sorts or groups such a scan through a temporary B-tree
+  (``USE TEMP B-TREE``), i.e. the whole table rather than the rows an
+  index search (``SEARCH t USING INDEX``) found.
+
+Index searches, full-text lookups included, are never reported: without
+``sqlite_stat1`` EXPLAIN has no idea how many rows they match, so a very
+broad search term is still a slow query this check cannot see.
+
+``assert_indexed_queries`` is the test utility: it fails with every
+offending query and plan when the block exits. ``QueryPlanMiddleware``
+is the runtime mode: with ``QUERY_PLAN_CHECK = 'warn'`` (or ``'raise'``)
+it checks the queries of every ``main`` and admin view and logs (or
+raises) as soon as one is reported. The plan check runs through a raw
+cursor, so it adds nothing to query counts or metrics.
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+CHECKED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+_current = ContextVar('query_plan_check', default=None)
+_installed = False
+_ALIAS_RE = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)\b"?')
+_LIMIT_RE = re.compile(r'\bLIMIT\b', re.I)
+_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+
+
+class QueryPlanError(AssertionError):
+    """A query's plan scans or sorts a large table."""
+
+
+class PlanCheck:
+    """Explains queries and collects the problems of one request or test."""
+
+    def __init__(self, min_rows=None, on_problem=None):
+        self.min_rows = settings.QUERY_PLAN_MIN_ROWS if min_rows is None else min_rows
+        self.on_problem = on_problem
+        self.problems = []
+        self._sizes = {}
+
+    def _size(self, cursor, table):
+        if table not in self._sizes:
+            try:
+                cursor.execute(f'SELECT MAX(rowid) FROM "{table}"')
+                self._sizes[table] = cursor.fetchone()[0] or 0
+            except Exception:  # a subquery, CTE or virtual table, not a stored table
+                self._sizes[table] = 0
+        return self._sizes[table]
+
+    def check(self, connection, sql, params):
+        """Explain ``sql`` and return the list of problems found in its plan."""
+        if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            return []
+        aliases = {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+        cursor = connection.create_cursor()  # unwrapped: not counted or re-checked
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[3] for row in cursor.fetchall()]
+            problems, scanned = [], []
+            for detail in plan:
+                scan = _SCAN_RE.match(detail)
+                if scan is None or 'VIRTUAL TABLE' in detail:
+                    continue
+                table = aliases.get(scan.group(1), scan.group(1))
+                if self._size(cursor, table) < self.min_rows:
+                    continue
+                scanned.append(table)
+                if not scan.group(2) or not _LIMIT_RE.search(sql):
+                    problems.append(f'{detail} ({table}: ~{self._sizes[table]:,} rows)')
+            if scanned:
+                problems.extend(
+                    f'{detail} over {", ".join(sorted(set(scanned)))}'
+                    for detail in plan if 'USE TEMP B-TREE' in detail
+                )
+        finally:
+            cursor.close()
+
+        for problem in problems:
+            report = f'{problem}\n    {sql}\n    params={params!r}'
+            self.problems.append(report)
+            if self.on_problem is not None:
+                self.on_problem(report)
+        return problems
+
+
+def _explain_query(execute, sql, params, many, context):
+    check = _current.get()
+    if check is not None and not many:
+        check.check(context['connection'], sql, params)
+    return execute(sql, params, many, context)
+
+
+def _add_plan_check(sender, connection, **kwargs):
+    if _explain_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_explain_query)
+
+
+def install():
+    """Hook the plan check into every database connection (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_plan_check, dispatch_uid='main.query_plans.plan_check')
+    for connection in connections.all(initialized_only=True):
+        _add_plan_check(None, connection)
+
+
+@contextmanager
+def check_query_plans(min_rows=None, on_problem=None):
+    """Check the plan of every query run in this block (and its async ORM calls)."""
+    install()
+    check = PlanCheck(min_rows, on_problem)
+    token = _current.set(check)
+    try:
+        yield check
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_indexed_queries(min_rows=None):
+    """
+    Fail when a query in the block scans or sorts a table of ``min_rows``
+    rows or more (default ``QUERY_PLAN_MIN_ROWS``)::
+
+        with assert_indexed_queries(min_rows=1000):
+            self.client.get('/students/')
+    """
+    with check_query_plans(min_rows) as check:
+        yield check
+    if check.problems:
+        raise QueryPlanError(
+            f'{len(check.problems)} queries scan or sort a large table:\n' + '\n'.join(check.problems)
+        )
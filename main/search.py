@@ -0,0 +1,149 @@
+"""
+Indexed search over Students names.
+
+Thai is written without spaces between words, so instead of a word
+tokenizer the SQLite FTS5 ``trigram`` tokenizer indexes every 3-character
+sequence of ``student_id``, ``name_prefix``, ``first_name`` and
+``last_name``. Any search term of three or more characters becomes an
+index lookup; shorter terms (which trigrams cannot answer) fall back to
+``icontains`` on the rows the index has already narrowed down. A query
+made only of short terms matches them as the start of ``first_name`` or
+``last_name`` (a range on their indexes), an exact ``name_prefix`` or an
+exact ``student_id``, so it never scans the table either.
+
+The index is an external-content FTS5 table kept in sync by triggers on
+``main_students`` (see migration 0003), so bulk_create/upserts and raw
+UPDATEs are covered as well as ``save()``. SQLite rebuilds a table when a
+column is altered and drops its triggers in the process; any migration
+that alters ``main_students`` columns must call ``install_search_index``
+again.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'main_students_fts'
+MIN_TRIGRAM_LENGTH = 3
+SEARCH_COLUMNS = ('student_id', 'name_prefix', 'first_name', 'last_name')
+PREFIX_COLUMNS = ('first_name', 'last_name')
+
+_COLUMNS = ', '.join(SEARCH_COLUMNS)
+_NEW = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_OLD = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+INSTALL_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_COLUMNS}, content='main_students', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON main_students BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON main_students BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON main_students BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def install_search_index(schema_editor):
+    """Create (or repair) the FTS table and its triggers, then rebuild it."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in INSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in UNINSTALL_SQL:
+        schema_editor.execute(statement)
+
+
+_available = set()
+
+
+def search_index_available(using='default'):
+    """Return True when the FTS table exists on the ``using`` database."""
+    if using in _available:
+        return True
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        if cursor.fetchone() is None:
+            return False
+    _available.add(using)
+    return True
+
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_students(queryset, query):
+    """
+    Filter ``queryset`` to rows matching every whitespace separated term of
+    ``query`` in any of the indexed columns.
+    """
+    terms = query.split()
+    if not terms:
+        return queryset
+
+    indexed = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    if indexed and search_index_available(queryset.db):
+        match = ' AND '.join(_phrase(term) for term in indexed)
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        ))
+        terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+
+    for term in terms:
+        condition = Q()
+        if indexed:
+            for column in SEARCH_COLUMNS:
+                condition |= Q(**{f'{column}__icontains': term})
+        else:
+            condition = _prefix_condition(term)
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def _prefix_condition(term):
+    """Indexed lookups for a short term: name starts, exact prefix or id."""
+    condition = Q(name_prefix=term)
+    for column in PREFIX_COLUMNS:
+        # A range rather than LIKE 'term%', which SQLite only indexes under NOCASE
+        condition |= Q(**{f'{column}__gte': term, f'{column}__lt': term + '\U0010ffff'})
+    if term.isdigit():
+        condition |= Q(student_id=int(term))
+    return condition
+
+
+async def asearch_students(queryset, query):
+    """
+    ``search_students`` for async views. Until the index has been seen on
+    ``queryset.db`` the check queries the database, so it runs in a thread.
+    """
+    if queryset.db not in _available:
+        return await sync_to_async(search_students)(queryset, query)
+    return search_students(queryset, query)
@@ -0,0 +1,82 @@
+"""
+Signal receivers for the main app.
+
+``students_changed`` is sent by bulk helpers (``bulk_create`` upserts,
+queryset updates and deletes) that bypass ``post_save``/``post_delete``.
+Send it inside the transaction that made the change, with
+``delta=stats.student_delta(...)`` when the added and removed rows are
+known; without a delta the student statistics are recounted.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .content import CONTENT_TAG, clear_site_configuration
+from .models import Project, SiteConfiguration, Skill, Students
+from .page_cache import invalidate
+from .stats import STUDENTS_TAG, apply_delta, rebuild_statistics, student_delta
+
+students_changed = Signal()
+
+COUNTED_FIELDS = ('student_id', 'name_prefix')
+
+
+@receiver(post_save, sender=Students)
+@receiver(post_delete, sender=Students)
+@receiver(students_changed)
+def invalidate_student_pages(sender, using='default', **kwargs):
+    # After commit, so no other worker caches what the transaction replaces
+    transaction.on_commit(lambda: invalidate(STUDENTS_TAG), using=using)
+
+
+@receiver(pre_save, sender=Students)
+def remember_counted_values(sender, instance, using, raw=False, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if instance.pk is not None and not all(field in loaded for field in COUNTED_FIELDS):
+        # Saved without being loaded (or with deferred fields): one lookup
+        instance._loaded_values = (
+            Students.objects.using(using).filter(pk=instance.pk).values(*COUNTED_FIELDS).first() or {}
+        )
+
+
+@receiver(post_save, sender=Students)
+def count_saved_student(sender, instance, created, using, **kwargs):
+    delta = student_delta([(instance.student_id, instance.name_prefix)])
+    loaded = getattr(instance, '_loaded_values', {})
+    if not created and all(field in loaded for field in COUNTED_FIELDS):
+        student_delta([(loaded['student_id'], loaded['name_prefix'])], sign=-1, delta=delta)
+    apply_delta(delta, using)
+    instance._loaded_values = {field: getattr(instance, field) for field in COUNTED_FIELDS}
+
+
+@receiver(pre_delete, sender=Students)
+def load_counted_values(sender, instance, using, **kwargs):
+    deferred = instance.get_deferred_fields().intersection(COUNTED_FIELDS)
+    if deferred:
+        instance.refresh_from_db(using=using, fields=deferred)
+
+
+@receiver(post_delete, sender=Students)
+def count_deleted_student(sender, instance, using, **kwargs):
+    apply_delta(student_delta([(instance.student_id, instance.name_prefix)], sign=-1), using)
+
+
+@receiver(students_changed)
+def count_bulk_students(sender, delta=None, using='default', **kwargs):
+    if delta is None:
+        rebuild_statistics(using)
+    else:
+        apply_delta(delta, using)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(m2m_changed, sender=Project.technologies.through)
+@receiver(post_save, sender=SiteConfiguration)
+@receiver(post_delete, sender=SiteConfiguration)
+def invalidate_content_pages(sender, **kwargs):
+    clear_site_configuration()
+    invalidate(CONTENT_TAG)
@@ -0,0 +1,320 @@
+"""
+Precompiled read-only Students snapshot.
+
+``manage.py build_snapshot`` (the last step of ``build.sh``) writes the
+Students table and its statistics to one binary file. Workers with
+``STUDENTS_SNAPSHOT`` enabled map it at startup (``MainConfig.ready``)
+and serve ``students_list``, its statistics and ``/api/students/`` pages
+from it without opening the database: a page is a binary search on the
+``student_id`` column and a few string slices.
+
+Layout (integers little-endian, sections 8-byte aligned)::
+
+    b'STSN' u8 version=2, 3 pad bytes, u32 meta_length, u64 rows, u64 strings
+    meta: UTF-8 JSON {"version", "source", "built_at", "stats"}
+    student_id: rows x int64, ascending (the lookup index)
+    name_prefix, first_name, last_name: rows x u32 string numbers each
+    string table: (strings + 1) x u32 offsets, then the UTF-8 bytes
+
+Every distinct string is stored once (prefixes and common names repeat
+across thousands of rows) and only decoded when its row is read.
+``version`` is a digest of the sections, used in ETags. ``source`` is
+a fingerprint of the Students rows the snapshot holds (count, smallest,
+largest and sum of ``student_id``, all read from the ``student_id``
+index): a snapshot that does not match the deployed database is ignored
+and the views read the database, so a redeploy with added or removed
+students never serves the old snapshot. Edits that keep every
+``student_id`` (a renamed student) are not detected; run
+``build_snapshot`` again after them. Writes are not reflected in a loaded
+snapshot, which is why only the public settings, whose database is
+read-only, enable it.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+
+from .importers import STUDENT_FIELDS
+from .models import Students
+from .pagination import KeysetPage
+from .stats import get_student_stats
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'STSN'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sB3xIQQ')
+KEY = 'student_id'
+STRING_FIELDS = STUDENT_FIELDS[1:]
+MAX_STRING_BYTES = 2 ** 32 - 1
+
+# (path, snapshot or None) of the last load in this process
+_snapshot = (None, None)
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot this code can read."""
+
+
+def _align(offset):
+    return -offset % 8
+
+
+def _native(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _fingerprint(count, low, high, total):
+    return f'{count}:{low or 0}:{high or 0}:{total or 0}'
+
+
+def database_source(using='default'):
+    """Fingerprint the Students rows of the database ``using`` (see the module docstring)."""
+    ids = Students.objects.using(using).aggregate(
+        count=Count(KEY), low=Min(KEY), high=Max(KEY), total=Sum(KEY),
+    )
+    return _fingerprint(ids['count'], ids['low'], ids['high'], ids['total'])
+
+
+def write_snapshot(path, chunk_size=5000):
+    """
+    Write the Students table to a snapshot at ``path`` (replaced
+    atomically) and return its meta, row, string and byte counts.
+    """
+    ids = array('q')
+    columns = {field: array('I') for field in STRING_FIELDS}
+    numbers = {}
+    rows = (
+        Students.objects.order_by(KEY)
+        .values_list(*STUDENT_FIELDS).iterator(chunk_size=chunk_size)
+    )
+    for student_id, *values in rows:
+        ids.append(student_id)
+        for field, value in zip(STRING_FIELDS, values):
+            columns[field].append(numbers.setdefault(value, len(numbers)))
+
+    encoded = [value.encode() for value in numbers]
+    offsets = array('I', [0])
+    total = 0
+    for value in encoded:
+        total += len(value)
+        if total > MAX_STRING_BYTES:
+            raise SnapshotError('the string table is over 4 GiB')
+        offsets.append(total)
+    sections = [_native(ids).tobytes()]
+    sections.extend(_native(columns[field]).tobytes() for field in STRING_FIELDS)
+    sections.append(_native(offsets).tobytes())
+    sections.append(b''.join(encoded))
+
+    digest = hashlib.blake2b(digest_size=8)
+    for section in sections:
+        digest.update(section)
+    meta = {
+        'version': digest.hexdigest(),
+        'source': _fingerprint(len(ids), ids[0] if ids else 0, ids[-1] if ids else 0, sum(ids)),
+        'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'stats': get_student_stats(),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode()
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_bytes), len(ids), len(encoded)))
+        handle.write(meta_bytes + b'\0' * _align(HEADER.size + len(meta_bytes)))
+        for section in sections:
+            handle.write(section + b'\0' * _align(len(section)))
+        size = handle.tell()
+    os.replace(temporary, path)
+    return {**meta, 'rows': len(ids), 'strings': len(encoded), 'bytes': size}
+
+
+class StudentsSnapshot:
+    """The Students columns of a snapshot, read in place from its buffer."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._views = [memoryview(buffer)]
+        try:
+            self._read(self._views[0])
+        except Exception:
+            self._release()
+            raise
+
+    def _read(self, view):
+        if len(view) < HEADER.size:
+            raise SnapshotError('truncated header')
+        magic, version, meta_length, rows, strings = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError(f'not a version {FORMAT_VERSION} Students snapshot')
+        offset = HEADER.size + meta_length
+        self.meta = json.loads(bytes(view[HEADER.size:offset]))
+        self._offset = offset + _align(offset)
+        self.ids = self._section('q', rows)
+        self.columns = {field: self._section('I', rows) for field in STRING_FIELDS}
+        self._string_offsets = self._section('I', strings + 1)
+        self._strings = self._slice(self._string_offsets[-1])
+
+    @classmethod
+    def open(cls, path):
+        """Map the snapshot file at ``path`` (read-only, shared between workers by the OS)."""
+        with open(path, 'rb') as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(buffer)
+        except (SnapshotError, ValueError):
+            buffer.close()
+            raise
+
+    def _slice(self, length):
+        start, self._offset = self._offset, self._offset + length
+        if self._offset > len(self._views[0]):
+            raise SnapshotError('truncated snapshot')
+        view = self._views[0][start:self._offset]
+        self._views.append(view)
+        self._offset += _align(self._offset)
+        return view
+
+    def _section(self, typecode, count):
+        view = self._slice(count * array(typecode).itemsize)
+        if sys.byteorder == 'big':
+            values = array(typecode, bytes(view))
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _release(self):
+        for view in reversed(self._views):
+            view.release()
+
+    def close(self):
+        self._release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    @property
+    def version(self):
+        return self.meta['version']
+
+    @property
+    def source(self):
+        return self.meta['source']
+
+    @property
+    def stats(self):
+        """The statistics of ``stats.get_student_stats`` when the snapshot was built."""
+        return self.meta['stats']
+
+    def __len__(self):
+        return len(self.ids)
+
+    def string(self, number):
+        offsets = self._string_offsets
+        return str(self._strings[offsets[number]:offsets[number + 1]], 'utf-8')
+
+    def row(self, index):
+        """The student at ``index`` (in ``student_id`` order) as a ``values()`` dict."""
+        row = {KEY: self.ids[index]}
+        for field in STRING_FIELDS:
+            row[field] = self.string(self.columns[field][index])
+        return row
+
+    def rows(self, fields, start, stop):
+        """``fields`` tuples of the students ``start:stop``, as ``values_list()``."""
+        # Column by column: one slice and one decode loop per field
+        string = self.string
+        values = [
+            self.ids[start:stop].tolist() if field == KEY
+            else [string(number) for number in self.columns[field][start:stop].tolist()]
+            for field in fields
+        ]
+        return list(zip(*values))
+
+    def get(self, student_id):
+        """The student ``student_id`` as a dict, or None."""
+        index = bisect_left(self.ids, student_id)
+        if index < len(self.ids) and self.ids[index] == student_id:
+            return self.row(index)
+        return None
+
+    def _span(self, after, before, page_size):
+        # The rows keyset_paginate would return, as (start, stop, has_next, has_previous)
+        if before is not None:
+            stop = bisect_left(self.ids, before)
+            start = max(0, stop - page_size)
+        else:
+            start = 0 if after is None else bisect_right(self.ids, after)
+            stop = min(len(self.ids), start + page_size)
+        return start, stop, stop < len(self.ids), start > 0
+
+    def page(self, after=None, before=None, page_size=50):
+        """A ``KeysetPage`` of row dicts, as ``keyset_paginate`` on ``student_id``."""
+        start, stop, has_next, has_previous = self._span(after, before, page_size)
+        rows = [self.row(index) for index in range(start, stop)]
+        return KeysetPage(rows, KEY, has_next=has_next, has_previous=has_previous)
+
+    def page_rows(self, fields, after=None, before=None, page_size=1000):
+        """``(rows, next_cursor, previous_cursor)`` with rows as ``fields`` tuples."""
+        start, stop, has_next, has_previous = self._span(after, before, page_size)
+        rows = self.rows(fields, start, stop)
+        next_cursor = self.ids[stop - 1] if has_next and stop > start else None
+        previous_cursor = self.ids[start] if has_previous and stop > start else None
+        return rows, next_cursor, previous_cursor
+
+    def iter_rows(self):
+        for index in range(len(self.ids)):
+            yield self.row(index)
+
+
+def load_snapshot(path, using='default'):
+    """
+    Open the snapshot at ``path`` if it was built from the database
+    ``using`` is now; None (and a warning) when it is missing, unreadable
+    or stale.
+    """
+    try:
+        snapshot = StudentsSnapshot.open(path)
+    except FileNotFoundError:
+        logger.warning('Students snapshot %s not found; reading the database', path)
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning('Students snapshot %s is unreadable (%s); reading the database', path, exc)
+        return None
+    if snapshot.source != database_source(using):
+        logger.warning('Students snapshot %s was built from another database; reading the database', path)
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def get_snapshot():
+    """The ``STUDENTS_SNAPSHOT_PATH`` snapshot of this process, or None when disabled or unusable."""
+    global _snapshot
+    if not settings.STUDENTS_SNAPSHOT:
+        return None
+    path = settings.STUDENTS_SNAPSHOT_PATH
+    if _snapshot[0] != path:
+        _snapshot = (path, load_snapshot(path))
+    return _snapshot[1]
+
+
+def clear_snapshot():
+    global _snapshot
+    _, snapshot = _snapshot
+    _snapshot = (None, None)
+    if snapshot is not None:
+        snapshot.close()
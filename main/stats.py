@@ -0,0 +1,147 @@
+"""
+Materialized Students statistics.
+
+``StudentStatistic`` rows hold how many students there are per
+``name_prefix`` and per ``student_id`` range (``STUDENT_STATS_RANGE_SIZE``
+ids wide), so the students page and ``/students/stats/`` read a handful
+of rows instead of counting the table. ``main.signals`` keeps the rows
+current inside the transaction that changed the students:
+
+- ``post_save``/``post_delete`` of one student apply a +1/-1 delta; an
+  edit that changes the prefix or moves the id to another range moves
+  one count (the loaded values are remembered by ``Students.from_db``);
+- bulk helpers send ``students_changed`` with ``delta=student_delta(...)``,
+  or without a delta to have the statistics recounted once.
+
+Reads go through a process-local copy checked against the ``'students'``
+page-cache tag (like ``content.get_site_configuration``), so a request
+costs one cache lookup and the rows are only read again after a change.
+"""
+
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, When
+
+from .models import PREFIX_CHOICES, StudentStatistic, Students
+from .page_cache import tag_versions
+
+STUDENTS_TAG = 'students'
+
+# (tag version, statistics) of the last load in this process
+_student_stats = (None, None)
+
+
+def range_key(student_id):
+    size = settings.STUDENT_STATS_RANGE_SIZE
+    return str(student_id // size * size)
+
+
+def student_delta(rows, sign=1, delta=None):
+    """
+    Count ``(student_id, name_prefix)`` rows into a delta for
+    ``apply_delta``; ``sign=-1`` for removed rows.
+    """
+    delta = Counter() if delta is None else delta
+    for student_id, name_prefix in rows:
+        delta['prefix', name_prefix] += sign
+        delta['range', range_key(student_id)] += sign
+    return delta
+
+
+def apply_delta(delta, using='default'):
+    """Add a ``student_delta`` to the stored statistics."""
+    statistics = StudentStatistic.objects.using(using)
+    with transaction.atomic(using=using):
+        for (dimension, key), change in delta.items():
+            if not change:
+                continue
+            if not statistics.filter(dimension=dimension, key=key).update(count=F('count') + change):
+                statistics.create(dimension=dimension, key=key, count=change)
+
+
+def count_statistics(students):
+    """``(dimension, key, count)`` for every group of a Students queryset, by GROUP BY."""
+    size = settings.STUDENT_STATS_RANGE_SIZE
+    rows = [
+        ('prefix', prefix, count)
+        for prefix, count in students.order_by().values_list('name_prefix').annotate(Count('pk'))
+    ]
+    # SQL integer division truncates towards zero; floor it like range_key
+    # so negative ids land in the same range as their deltas
+    bucket = Case(
+        When(student_id__lt=0, then=(F('student_id') + 1) / size - 1),
+        default=F('student_id') / size,
+    )
+    rows.extend(
+        ('range', str(bucket * size), count)
+        for bucket, count in (
+            students.order_by().annotate(bucket=bucket)
+            .values_list('bucket').annotate(Count('pk'))
+        )
+    )
+    return rows
+
+
+def rebuild_statistics(using='default'):
+    """Recount the statistics from the Students table."""
+    rows = count_statistics(Students.objects.using(using))
+    with transaction.atomic(using=using):
+        StudentStatistic.objects.using(using).all().delete()
+        StudentStatistic.objects.using(using).bulk_create(
+            StudentStatistic(dimension=dimension, key=key, count=count) for dimension, key, count in rows
+        )
+
+
+def _summarize(rows):
+    counts = {dimension: {} for dimension in ('prefix', 'range')}
+    for dimension, key, count in rows:
+        if count > 0:
+            counts[dimension][key] = count
+    size = settings.STUDENT_STATS_RANGE_SIZE
+    prefixes = counts['prefix']
+    ordered = [value for value, _ in PREFIX_CHOICES if value in prefixes]
+    ordered += sorted(set(prefixes) - set(ordered))
+    return {
+        'total': sum(prefixes.values()),
+        'by_prefix': [{'name_prefix': prefix, 'count': prefixes[prefix]} for prefix in ordered],
+        'by_range': [
+            {'start': start, 'end': start + size - 1, 'count': counts['range'][str(start)]}
+            for start in sorted(int(key) for key in counts['range'])
+        ],
+    }
+
+
+def _current_stats():
+    version, stats = _student_stats
+    if stats is not None and version == tag_versions((STUDENTS_TAG,)):
+        return stats
+    return None
+
+
+def _load_stats():
+    global _student_stats
+    # Version first, as in content._load_configuration
+    version = tag_versions((STUDENTS_TAG,))
+    stats = _summarize(StudentStatistic.objects.values_list('dimension', 'key', 'count'))
+    _student_stats = (version, stats)
+    return stats
+
+
+def get_student_stats():
+    """
+    ``{'total', 'by_prefix': [{'name_prefix', 'count'}], 'by_range':
+    [{'start', 'end', 'count'}]}`` from the materialized statistics.
+    """
+    return _current_stats() or _load_stats()
+
+
+async def aget_student_stats():
+    return _current_stats() or await sync_to_async(_load_stats)()
+
+
+def clear_student_stats():
+    global _student_stats
+    _student_stats = (None, None)
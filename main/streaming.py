@@ -0,0 +1,72 @@
+"""
+Helpers for streaming large template-rendered pages.
+
+The page template is rendered once with ``STREAM_MARKER`` where the row
+list belongs; everything before the marker is sent immediately, the rows
+follow in rendered chunks, and the rest of the page closes the response.
+"""
+
+from itertools import islice
+
+from django.template.loader import get_template, render_to_string
+
+STREAM_MARKER = '<!--stream-rows-->'
+
+
+def chunked(iterable, size):
+    """Yield lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_template(request, template_name, context, rows, row_template_name,
+                    rows_context_name, chunk_size=500):
+    """
+    Yield ``template_name`` in pieces, rendering ``rows`` through
+    ``row_template_name`` ``chunk_size`` rows at a time.
+    """
+    page = render_to_string(template_name, context, request)
+    head, _, tail = page.partition(STREAM_MARKER)
+    yield head
+
+    row_template = get_template(row_template_name)
+    for chunk in chunked(rows, chunk_size):
+        yield row_template.render({rows_context_name: chunk}, request)
+
+    yield tail
+
+
+async def achunked(aiterable, size):
+    """Async ``chunked``: yield lists of at most ``size`` items."""
+    chunk = []
+    async for item in aiterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def aiterate(iterable):
+    """Async iterator over a sync ``iterable`` that never blocks (rows already in memory)."""
+    for item in iterable:
+        yield item
+
+
+async def astream_template(request, template_name, context, rows, row_template_name,
+                           rows_context_name, chunk_size=500):
+    """Async ``stream_template`` over the async iterator ``rows``."""
+    page = render_to_string(template_name, context, request)
+    head, _, tail = page.partition(STREAM_MARKER)
+    yield head
+
+    row_template = get_template(row_template_name)
+    async for chunk in achunked(rows, chunk_size):
+        yield row_template.render({rows_context_name: chunk}, request)
+
+    yield tail
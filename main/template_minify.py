@@ -0,0 +1,90 @@
+"""
+HTML minification at template load time.
+
+The loaders below return minified template source to Django's cached
+loader, so the work happens once per template and process when it is
+compiled; rendering costs nothing extra. Only the literal HTML between
+template tags is rewritten:
+
+- runs of whitespace collapse to one newline (or one space when the run
+  has no newline), which renders identically outside ``<pre>``;
+- HTML comments are dropped, except conditional comments and
+  ``main.streaming.STREAM_MARKER``;
+- the contents of ``<pre>``, ``<textarea>``, ``<script>`` and ``<style>``
+  are left exactly as written.
+
+Only ``.html`` templates of this project are minified; templates shipped
+by installed packages (the admin, plain-text emails) are served as is.
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.template.base import tag_re
+from django.template.loaders import app_directories, filesystem
+
+from .streaming import STREAM_MARKER
+
+_RAW_ELEMENTS_RE = re.compile(r'<(pre|textarea|script|style)\b', re.I)
+_COMMENT_RE = re.compile(r'<!--(?!\[if|<!|\s*\[endif)(.*?)-->', re.S)
+_WHITESPACE_RE = re.compile(r'\s{2,}')
+
+
+def _collapse(match):
+    return '\n' if '\n' in match.group(0) else ' '
+
+
+def _minify_markup(text):
+    text = _COMMENT_RE.sub(lambda match: match.group(0) if match.group(0) == STREAM_MARKER else '', text)
+    return _WHITESPACE_RE.sub(_collapse, text)
+
+
+def minify_html(source):
+    """Minify the literal HTML of template ``source``; template tags are kept verbatim."""
+    out = []
+    raw = None  # closing tag of the raw element we are inside, if any
+    for index, part in enumerate(tag_re.split(source)):
+        if index % 2:
+            out.append(part)
+            continue
+        while part:
+            if raw is not None:
+                end = part.lower().find(raw)
+                if end < 0:
+                    out.append(part)
+                    break
+                end += len(raw)
+                out.append(part[:end])
+                part, raw = part[end:], None
+            else:
+                match = _RAW_ELEMENTS_RE.search(part)
+                if match is None:
+                    out.append(_minify_markup(part))
+                    break
+                out.append(_minify_markup(part[:match.start()]))
+                part, raw = part[match.start():], f'</{match.group(1).lower()}'
+    return ''.join(out)
+
+
+def should_minify(path):
+    path = os.path.abspath(path)
+    return (
+        path.endswith('.html')
+        and path.startswith(os.path.abspath(settings.BASE_DIR) + os.sep)
+        and f'{os.sep}site-packages{os.sep}' not in path
+    )
+
+
+class MinifyingMixin:
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        return minify_html(contents) if should_minify(origin.name) else contents
+
+
+class FilesystemLoader(MinifyingMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(MinifyingMixin, app_directories.Loader):
+    pass
@@ -0,0 +1,49 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from main.images import FALLBACK_WIDTH, FORMATS, available_formats, derivative_url, source_image, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(src, alt='', sizes='100vw', loading='lazy', **attrs):
+    """
+    Render a <picture> with AVIF/WebP/JPEG srcsets for a static path or an
+    uploaded file (an ImageField value).
+
+    {% responsive_image 'img/photo.jpg' alt='Photo' sizes='(min-width: 992px) 33vw, 100vw' class='img-fluid' %}
+    """
+    if hasattr(src, 'storage'):
+        kind, name = 'media', src.name
+    else:
+        kind, name = 'static', str(src)
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    source = source_image(kind, name) if name else None
+    if source is None:
+        # No Pillow or not a resizable image: still lazy, at its own size
+        url = src.url if kind == 'media' else static(name)
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async"{}>', url, alt, loading, extra
+        )
+
+    widths = source.widths()
+    fallback_width = max((width for width in widths if width <= FALLBACK_WIDTH), default=widths[0])
+    modern = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][1], srcset(source, fmt), sizes) for fmt in available_formats()),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        modern,
+        derivative_url(source, fallback_width, source.fallback_format),
+        srcset(source, source.fallback_format),
+        sizes,
+        widths[-1],
+        source.height_for(widths[-1]),
+        alt,
+        loading,
+        extra,
+    )
@@ -1,3 +1,1209 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import EmailMessage
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.template import Context, Template
+from django.template.backends import django as django_backend
+from django.template.loader import get_template
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import metrics
+from .batch import apply_changes
+from .benchmarking import DATASETS, STAFF_ROUTES, build_routes, fill_students
+from .budgets import RouteUsage, budget_key, load_budgets, measure_route, over_budget
+from .bulk import delete_students, update_prefix
+from .compression import STREAM_CODECS, negotiate
+from .exports import export_students, read_columnar
+from .images import available_formats
+from .importers import STUDENT_FIELDS, iter_records, parse_record, upsert_students
+from .models import ContactMessage, StudentStatistic, Students
+from .multiplication import multiplication_table
+from .pagination import akeyset_paginate, keyset_paginate
+from .query_plans import QueryPlanError, assert_indexed_queries
+from .search import search_students
+from .snapshot import clear_snapshot, get_snapshot, write_snapshot
+from .stats import get_student_stats, rebuild_statistics
+from .streaming import STREAM_MARKER
+from .template_minify import minify_html, should_minify
+from .write_behind import MailWorker, WriteBehindBuffer
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the installed extras
+    Image = None
+
+PLAN_MIN_ROWS = 1000
+
+
+class ImportTests(TestCase):
+    """CSV/NDJSON/JSON records are validated row by row and upserted on student_id."""
+
+    def parse(self, text, fmt):
+        return [parse_record(record) for _, record in iter_records(io.StringIO(text), fmt)]
+
+    def test_parses_csv_and_ndjson(self):
+        csv_rows = self.parse(
+            'student_id,name_prefix,first_name,last_name\r\n6512345678,นาย, สมชาย ,ใจดี\r\n', 'csv',
+        )
+        ndjson_rows = self.parse(
+            '{"student_id": 6512345678, "name_prefix": "นาย", "first_name": "สมชาย", "last_name": "ใจดี"}\n\n',
+            'ndjson',
+        )
+        for students in (csv_rows, ndjson_rows):
+            self.assertEqual(
+                [(s.student_id, s.name_prefix, s.first_name, s.last_name) for s in students],
+                [(6512345678, 'นาย', 'สมชาย', 'ใจดี')],
+            )
+
+    def test_rejects_invalid_values(self):
+        valid = {'student_id': 1, 'name_prefix': 'นาย', 'first_name': 'ก', 'last_name': 'ข'}
+        for changes in (
+            {'student_id': 1.7},
+            {'student_id': True},
+            {'student_id': '1.7'},
+            {'student_id': None},
+            {'student_id': 2 ** 63},
+            {'first_name': 5},
+            {'last_name': ['ข']},
+            {'first_name': '  '},
+            {'name_prefix': 'Mr'},
+        ):
+            with self.subTest(changes=changes), self.assertRaises(ValueError):
+                parse_record({**valid, **changes})
+
+    def test_upsert_inserts_then_updates(self):
+        self.assertEqual(upsert_students(self.parse(
+            '{"student_id": 1, "name_prefix": "นาย", "first_name": "ก", "last_name": "ข"}\n'
+            '{"student_id": 2, "name_prefix": "นาง", "first_name": "ค", "last_name": "ง"}\n'
+            '{"student_id": 1, "name_prefix": "นาง", "first_name": "จ", "last_name": "ฉ"}\n',
+            'ndjson',
+        )), 2)
+        upsert_students(self.parse('{"student_id": 2, "name_prefix": "นาย", "first_name": "ช", "last_name": "ซ"}', 'ndjson'))
+        self.assertEqual(
+            list(Students.objects.order_by('student_id').values_list('student_id', 'name_prefix', 'first_name')),
+            [(1, 'นาง', 'จ'), (2, 'นาย', 'ช')],
+        )
+        self.assertEqual(
+            {row['name_prefix']: row['count'] for row in get_student_stats()['by_prefix']},
+            {'นาย': 1, 'นาง': 1},
+        )
+
+    def test_upsert_batches_past_the_parameter_limit(self):
+        # SQLite caps the variables of one statement, so existing rows are looked up in chunks
+        students = [
+            Students(student_id=number, name_prefix='นาย', first_name=f'ก{number}', last_name='ข')
+            for number in range(1, 8)
+        ]
+        upsert_students(students[:5])
+        with mock.patch.object(connection.ops, 'bulk_batch_size', return_value=3), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(upsert_students(students), 7)
+        lookups = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and '"student_id" IN' in query['sql']]
+        self.assertEqual(len(lookups), 3)
+        self.assertEqual(get_student_stats()['total'], 7)
+        self.assertEqual({row['name_prefix']: row['count'] for row in get_student_stats()['by_prefix']}, {'นาย': 7})
+
+    def test_command_reports_invalid_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8', delete=False) as handle:
+            handle.write(
+                '{"student_id": 1, "name_prefix": "นาย", "first_name": "ก", "last_name": "ข"}\n'
+                '{"student_id": 2, "name_prefix": "นาย", "first_name": 5, "last_name": "ข"}\n'
+                'not json\n'
+            )
+        self.addCleanup(os.remove, handle.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_students', handle.name, stdout=stdout, stderr=stderr)
+        self.assertEqual(list(Students.objects.values_list('student_id', flat=True)), [1])
+        self.assertIn('Row 2: first_name must be a string', stderr.getvalue())
+        self.assertIn('Row 3:', stderr.getvalue())
+
+    def test_batch_reports_each_row(self):
+        body = (
+            '{"student_id": 1, "name_prefix": "นาย", "first_name": "ก", "last_name": "ข"}\n'
+            '{"student_id": 2, "name_prefix": "นาย", "first_name": 5, "last_name": "ข"}\n'
+            '{"student_id": 1.5, "op": "delete"}\n'
+            '{"student_id": 3, "op": "delete"}\n'
+        )
+        results = [result for chunk in apply_changes(io.StringIO(body), 'ndjson', chunk_size=2) for result in chunk]
+        self.assertEqual(
+            [result.get('status') for result in results[:-1]], ['created', 'invalid', 'invalid', 'missing'],
+        )
+        self.assertIn('first_name must be a string', results[1]['error'])
+        self.assertEqual(results[-1]['summary']['rows'], 4)
+        self.assertEqual(results[-1]['summary']['created'], 1)
+        self.assertEqual(results[-1]['summary']['invalid'], 2)
+
+
+class QueryPlanTests(TestCase):
+    """The main views and the admin reach the Students table through indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(PLAN_MIN_ROWS * 2)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.middle = Students.objects.order_by('student_id').values_list('student_id', flat=True)[PLAN_MIN_ROWS]
+
+    def assertIndexedPages(self, urls):
+        for url in urls:
+            with self.subTest(url=url), assert_indexed_queries(min_rows=PLAN_MIN_ROWS):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                if response.streaming:
+                    response.getvalue()  # streamed pages query while rendering
+
+    def test_detects_full_scan(self):
+        with self.assertRaisesMessage(QueryPlanError, 'SCAN main_students'):
+            with assert_indexed_queries(min_rows=PLAN_MIN_ROWS):
+                Students.objects.filter(first_name__icontains='1').count()
+
+    def test_detects_temp_btree_sort(self):
+        with self.assertRaisesMessage(QueryPlanError, 'USE TEMP B-TREE'):
+            with assert_indexed_queries(min_rows=PLAN_MIN_ROWS):
+                list(Students.objects.order_by('name_prefix', 'last_name')[:10])
+
+    def test_small_tables_are_not_reported(self):
+        with assert_indexed_queries(min_rows=PLAN_MIN_ROWS * 10):
+            Students.objects.filter(first_name__icontains='1').count()
+
+    def test_main_views(self):
+        self.assertIndexedPages([
+            '/',
+            '/about/',
+            '/contact/',
+            '/students/',
+            f'/students/?after={self.middle}',
+            f'/students/?before={self.middle}',
+            '/students/search/?q=ชื่อ12',
+            '/students/search/?q=ชื',
+            '/students/stats/',
+            '/api/students/?limit=100',
+            f'/api/students/?after={self.middle}&fields=first_name',
+            f'/api/students/?before={self.middle}',
+            '/for-loop/',
+        ])
+
+    def test_admin(self):
+        self.client.force_login(self.admin)
+        self.assertIndexedPages([
+            '/admin/',
+            '/admin/main/students/',
+            f'/admin/main/students/?after={self.middle}',
+            f'/admin/main/students/?before={self.middle}',
+            '/admin/main/students/?q=ชื่อ12',
+            '/admin/main/students/?q=ชื',
+            '/admin/main/students/?q=12',
+            '/admin/main/students/?name_prefix__exact=นาย',
+            f'/admin/main/students/?name_prefix__exact=นาย&after={self.middle}',
+            '/admin/main/students/1/change/',
+            '/admin/main/contactmessage/',
+        ])
+
+
+# The contact POST saves inline: a write-behind thread would outlive the test database
+@override_settings(CONTACT_WRITE_BEHIND=False)
+class RouteBudgetTests(TestCase):
+    """Every main route stays within its route_budgets.json budget on the 1k dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(DATASETS['1k'])
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+
+    def setUp(self):
+        # /metrics grows with every route earlier tests recorded in this process
+        metrics.reset()
+
+    def test_every_route_has_a_budget(self):
+        budgets = load_budgets()
+        routes = {budget_key(label) for label, *_ in build_routes()}
+        self.assertEqual(sorted(routes - set(budgets)), [], 'routes without a budget')
+        self.assertEqual(sorted(set(budgets) - routes), [], 'budgets for unknown routes')
+
+    def test_time_budget_scale(self):
+        usage = RouteUsage(status=200, queries=['SELECT 1'], alloc_kib=10, ms=150)
+        budget = {'queries': 1, 'alloc_kib': 16, 'ms': 100}
+        self.assertEqual(over_budget(usage, budget), ['ms 150 > 100'])
+        self.assertEqual(over_budget(usage, budget, ms_scale=2), [])
+        self.assertEqual(over_budget(usage, budget, ms_scale=0), [])
+        self.assertEqual(over_budget(usage, {**budget, 'queries': 0}, ms_scale=0), ['queries 1 > 0'])
+
+    def test_routes_within_budget(self):
+        budgets = load_budgets()
+        staff = Client()
+        staff.force_login(self.staff)
+        for label, method, path, data, name in build_routes():
+            key = budget_key(label)
+            if key not in budgets:
+                continue
+            with self.subTest(route=key):
+                usage = measure_route(staff if name in STAFF_ROUTES else self.client, method, path, data)
+                self.assertLess(usage.status, 400)
+                overages = over_budget(usage, budgets[key], settings.ROUTE_BUDGET_MS_SCALE)
+                if overages:
+                    self.fail(
+                        f'{key} over budget: {", ".join(overages)}\n'
+                        + '\n'.join(f'  {index}. {sql}' for index, sql in enumerate(usage.queries, 1))
+                    )
+
+
+class SnapshotTests(TestCase):
+    """The students pages served from a build_snapshot file match the database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(500)
+        ids = list(Students.objects.order_by('student_id').values_list('student_id', flat=True))
+        cls.first, cls.middle, cls.last = ids[0], ids[250], ids[-1]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'students.snapshot')
+        self.addCleanup(clear_snapshot)
+
+    def content(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.getvalue()
+
+    def test_pages_match_the_database(self):
+        write_snapshot(self.path)
+        urls = [
+            '/students/',
+            f'/students/?after={self.middle}&page_size=20',
+            f'/students/?before={self.middle}',
+            f'/students/?before={self.last + 1}',
+            '/students/?stream=1',
+            '/students/stats/',
+            f'/api/students/?after={self.middle}&limit=30&fields=last_name,student_id',
+            f'/api/students/?after={self.first - 1}&limit=30&fields=student_id',
+        ]
+        expected = {url: self.content(url) for url in urls}
+        with override_settings(STUDENTS_SNAPSHOT=True, STUDENTS_SNAPSHOT_PATH=self.path):
+            self.assertEqual(len(get_snapshot()), 500)
+            for url in urls:
+                with self.subTest(url=url), self.assertNumQueries(0):
+                    self.assertEqual(self.content(url), expected[url])
+
+    def test_stale_snapshot_falls_back_to_the_database(self):
+        write_snapshot(self.path)
+        first = Students.objects.order_by('student_id').first()
+        changes = {
+            'insert': lambda: Students.objects.create(
+                student_id=first.student_id - 1, name_prefix='นาย', first_name='ใหม่', last_name='ล่าสุด',
+            ),
+            'delete': lambda: Students.objects.filter(pk=first.pk).delete(),
+            'new id': lambda: Students.objects.filter(pk=first.pk).update(student_id=first.student_id - 1),
+        }
+        for label, change in changes.items():
+            with self.subTest(change=label), transaction.atomic():
+                change()
+                clear_snapshot()
+                with override_settings(STUDENTS_SNAPSHOT=True, STUDENTS_SNAPSHOT_PATH=self.path), \
+                        self.assertLogs('main.snapshot', 'WARNING'):
+                    self.assertIsNone(get_snapshot())
+                transaction.set_rollback(True)
+        clear_snapshot()
+        with override_settings(STUDENTS_SNAPSHOT=True, STUDENTS_SNAPSHOT_PATH=self.path):
+            self.assertIsNotNone(get_snapshot())
+
+    def test_unreadable_snapshot_falls_back_to_the_database(self):
+        with open(self.path, 'wb') as handle:
+            handle.write(b'not a snapshot')
+        with override_settings(STUDENTS_SNAPSHOT=True, STUDENTS_SNAPSHOT_PATH=self.path), \
+                self.assertLogs('main.snapshot', 'WARNING'):
+            self.assertIsNone(get_snapshot())
+            self.assertIn('ชื่อ1'.encode(), self.content('/students/'))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out waiting for the background thread')
+        time.sleep(0.01)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """locmem backend whose next ``failures`` connections fail to open, like an SMTP server that is down."""
+
+    failures = 0
+
+    def open(self):
+        if FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise ConnectionRefusedError('SMTP server unavailable')
+        return super().open()
+
+    def send_messages(self, messages):
+        # As the SMTP backend, which opens its connection when needed
+        self.open()
+        return super().send_messages(messages)
+
+
+class WriteBehindTests(TransactionTestCase):
+    """Queued contact messages and emails survive database and SMTP failures."""
+
+    def message(self, number):
+        return ContactMessage(name=f'ชื่อ{number}', lastname='ทดสอบ', email='a@example.com', message='สวัสดี')
+
+    def flaky_bulk_create(self, failures):
+        bulk_create = ContactMessage.objects.bulk_create
+        calls = []
+
+        def flaky(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) <= failures:
+                raise OperationalError('database is locked')
+            return bulk_create(objs, *args, **kwargs)
+
+        return mock.patch.object(ContactMessage.objects, 'bulk_create', side_effect=flaky)
+
+    def test_locked_database_keeps_the_batch(self):
+        flushed = []
+        buffer = WriteBehindBuffer(
+            ContactMessage, max_size=10, flush_size=50, flush_interval=0.01,
+            on_flush=flushed.extend, retry_delays=(0,),
+        )
+        with self.flaky_bulk_create(failures=3), self.assertLogs('main.write_behind', 'WARNING'):
+            buffer.submit(self.message(1))
+            buffer.submit(self.message(2))
+            wait_for(lambda: flushed)
+            buffer.shutdown()
+        self.assertEqual(ContactMessage.objects.count(), 2)
+        self.assertEqual(len(flushed), 2)
+
+    def test_on_flush_error_does_not_stop_the_writer(self):
+        def on_flush(batch):
+            if batch[0].name == 'ชื่อ1':
+                raise RuntimeError('notification failed')
+
+        buffer = WriteBehindBuffer(ContactMessage, max_size=10, flush_size=1, flush_interval=0.01, on_flush=on_flush)
+        with self.assertLogs('main.write_behind', 'ERROR'):
+            buffer.submit(self.message(1))
+            wait_for(lambda: ContactMessage.objects.exists())
+        buffer.submit(self.message(2))
+        buffer.shutdown()
+        self.assertEqual(ContactMessage.objects.count(), 2)
+
+    @override_settings(EMAIL_BACKEND='main.tests.FlakyEmailBackend')
+    def test_mail_worker_reconnects(self):
+        FlakyEmailBackend.failures = 1
+        worker = MailWorker(retry_delays=(0,))
+        with self.assertLogs('main.write_behind', 'WARNING'):
+            worker.send([EmailMessage('a', 'body', to=['admin@example.com'])])
+            worker.shutdown()
+        self.assertEqual([email.subject for email in mail.outbox], ['a'])
+
+    @override_settings(EMAIL_BACKEND='main.tests.FlakyEmailBackend')
+    def test_mail_worker_survives_a_failed_connect(self):
+        FlakyEmailBackend.failures = 1
+        worker = MailWorker(retry_delays=())
+        with self.assertLogs('main.write_behind', 'ERROR') as logs:
+            worker.send([EmailMessage('a', 'body', to=['admin@example.com'])])
+            wait_for(lambda: logs.records)
+        worker.send([EmailMessage('b', 'body', to=['admin@example.com'])])
+        worker.shutdown()
+        self.assertEqual([email.subject for email in mail.outbox], ['b'])
+
+
+
+@override_settings(CONTACT_WRITE_BEHIND=False)
+class ContactSubmitTests(TestCase):
+    """Without write-behind, the visitor only sees success if the message was stored or mailed."""
+
+    form = {'name': 'สมชาย', 'lastname': 'ใจดี', 'email': 'a@example.com', 'message': 'สวัสดี'}
+
+    def post(self, save_fails=False, smtp_fails=False):
+        FlakyEmailBackend.failures = 1 if smtp_fails else 0
+        self.addCleanup(setattr, FlakyEmailBackend, 'failures', 0)
+        if not save_fails:
+            return self.client.post('/contact/', self.form)
+        error = OperationalError('attempt to write a readonly database')
+        with mock.patch.object(ContactMessage, 'save', side_effect=error):
+            return self.client.post('/contact/', self.form)
+
+    def test_outcomes(self):
+        backend = f'{__name__}.FlakyEmailBackend'
+        for recipients, save_fails, smtp_fails, status, stored, sent in (
+            ([], False, False, 200, 1, 0),
+            ([], True, False, 503, 0, 0),
+            (['me@example.com'], True, False, 200, 0, 1),
+            (['me@example.com'], False, True, 200, 1, 0),
+            (['me@example.com'], True, True, 503, 0, 0),
+        ):
+            with self.subTest(recipients=recipients, save_fails=save_fails, smtp_fails=smtp_fails):
+                ContactMessage.objects.all().delete()
+                mail.outbox = []
+                with override_settings(CONTACT_NOTIFY_EMAILS=recipients, EMAIL_BACKEND=backend):
+                    if save_fails or smtp_fails:
+                        with self.assertLogs('main.write_behind', 'ERROR'):
+                            response = self.post(save_fails, smtp_fails)
+                    else:
+                        response = self.post()
+                self.assertEqual(response.status_code, status)
+                self.assertEqual('message_sent' in response.context, status == 200)
+                if status == 503:
+                    self.assertContains(response, 'กรุณาลองใหม่อีกครั้งภายหลัง', status_code=503)
+                self.assertEqual(ContactMessage.objects.count(), stored)
+                self.assertEqual(len(mail.outbox), sent)
+
+
+def worker_caches(*workers):
+    """CACHES with one page cache per simulated worker process and the shared tag cache."""
+    config = {
+        name: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': name}
+        for name in ('default', *workers)
+    }
+    config['tags'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tags'}
+    return config
+
+
+@override_settings(CACHES=worker_caches('worker-2'), PAGE_CACHE_ENABLED=True)
+class PageCacheTests(TestCase):
+    """Cached pages answer conditional requests and follow invalidations in every worker."""
+
+    def setUp(self):
+        # LocMem caches outlive the test's rolled back transaction
+        for cache in caches.all():
+            cache.clear()
+
+    def add_student(self, student_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            Students.objects.create(student_id=student_id, name_prefix='นาย', first_name='ก', last_name='ข')
+
+    def test_conditional_get(self):
+        first = self.client.get('/students/stats/')
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/students/stats/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        second = self.client.get('/students/stats/')
+        self.assertEqual((second['X-Page-Cache'], second['ETag']), ('hit', first['ETag']))
+
+        self.add_student(1)
+        fresh = self.client.get('/students/stats/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()['total'], 1)
+
+    def test_api_etag(self):
+        first = self.client.get('/api/students/')
+        self.assertEqual(self.client.get('/api/students/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.add_student(1)
+        fresh = self.client.get('/api/students/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], first['ETag'])
+
+    def test_invalidation_reaches_other_workers(self):
+        self.client.get('/students/stats/')
+        with override_settings(PAGE_CACHE_ALIAS='worker-2'):
+            stale = self.client.get('/students/stats/')
+            self.assertEqual(stale.json()['total'], 0)
+        self.add_student(1)  # handled by the first worker
+        with override_settings(PAGE_CACHE_ALIAS='worker-2'):
+            fresh = self.client.get('/students/stats/', HTTP_IF_NONE_MATCH=stale['ETag'])
+            self.assertEqual(fresh.status_code, 200)
+            self.assertEqual(fresh.json()['total'], 1)
+
+
+def stored_statistics():
+    """The non-zero statistics rows as a set of ``(dimension, key, count)``."""
+    return set(StudentStatistic.objects.exclude(count=0).values_list('dimension', 'key', 'count'))
+
+
+class StatisticsMixin:
+    def assertStatisticsMatchRebuild(self):
+        incremental = stored_statistics()
+        rebuild_statistics()
+        self.assertEqual(incremental, stored_statistics())
+
+
+class StatisticsTests(StatisticsMixin, TestCase):
+    """Incrementally maintained statistics equal a full recount."""
+
+    def test_incremental_matches_rebuild(self):
+        size = 100_000_000
+        for student_id in (-size - 1, -size, -5, 0, 5, size - 1, size):
+            Students.objects.create(student_id=student_id, name_prefix='นาย', first_name='ก', last_name='ข')
+        self.assertStatisticsMatchRebuild()
+        self.assertIn(('range', str(-size), 2), stored_statistics())
+
+        student = Students.objects.get(student_id=-5)
+        student.student_id, student.name_prefix = 7, 'นาง'
+        student.save()
+        upsert_students(parse_record(row) for row in (
+            {'student_id': -6, 'name_prefix': 'นางสาว', 'first_name': 'ค', 'last_name': 'ง'},
+            {'student_id': 0, 'name_prefix': 'นาง', 'first_name': 'ค', 'last_name': 'ง'},
+        ))
+        self.assertStatisticsMatchRebuild()
+
+        Students.objects.get(student_id=-6).delete()
+        Students.objects.get(student_id=-size - 1).delete()
+        self.assertStatisticsMatchRebuild()
+
+
+class ContentPageTests(TestCase):
+    """Template pages with per-visitor output render without touching the database."""
+
+    def test_for_loop_page_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.post('/for-loop/', {'number': 7})
+        self.assertContains(response, '<strong class="text-primary">84</strong>', html=False)
+
+
+class MultiplicationTests(TestCase):
+    """Table sizes and the form's number are limited on the server."""
+
+    def test_number_out_of_range_is_rejected(self):
+        for number in ('0', '101', str(2 ** 64), 'x'):
+            with self.subTest(number=number):
+                response = self.client.post('/for-loop/', {'number': number})
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'กรุณาใส่ตัวเลขระหว่าง 1-100', count=2)
+                self.assertIsNone(response.context['table_rows'])
+
+    def test_products_beyond_int64_are_exact(self):
+        self.assertEqual(multiplication_table((2 ** 62,), range(1, 4)), [[2 ** 62, 2 ** 63, 3 * 2 ** 62]])
+
+    def test_table_size_is_capped(self):
+        self.assertEqual(self.client.get('/for-loop/table/?rows=10000&columns=100').status_code, 200)
+        self.assertEqual(self.client.get('/for-loop/table/?rows=10001&columns=100').status_code, 400)
+        self.assertEqual(self.client.get('/for-loop/table/?rows=12&columns=101').status_code, 400)
+
+
+class ExportTests(TestCase):
+    """Students exports round-trip and gzip only when Accept-Encoding allows it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(30)
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def expected(self, fields, start=None, end=None):
+        queryset = Students.objects.order_by('student_id')
+        if start is not None:
+            queryset = queryset.filter(student_id__gte=start)
+        if end is not None:
+            queryset = queryset.filter(student_id__lte=end)
+        return list(queryset.values_list(*fields))
+
+    def test_columnar_round_trip(self):
+        ids = self.expected(('student_id',))
+        cases = (
+            (STUDENT_FIELDS, None, None, 7),
+            (STUDENT_FIELDS, None, None, 30),
+            (('last_name', 'student_id'), ids[3][0], ids[17][0], 5),
+            (('first_name',), ids[-1][0] + 1, None, 5),
+        )
+        for fields, start, end, chunk_size in cases:
+            with self.subTest(fields=fields, start=start, end=end, chunk_size=chunk_size):
+                body = b''.join(export_students('columnar', fields, start, end, chunk_size=chunk_size))
+                self.assertEqual(list(read_columnar(io.BytesIO(body))), self.expected(fields, start, end))
+
+    def test_text_formats_match_the_table(self):
+        rows = self.expected(STUDENT_FIELDS)
+        body = b''.join(export_students('csv', chunk_size=7)).decode('utf-8')
+        header, *lines = csv.reader(io.StringIO(body))
+        self.assertEqual(header, list(STUDENT_FIELDS))
+        self.assertEqual(lines, [[str(value) for value in row] for row in rows])
+
+        body = b''.join(export_students('ndjson', chunk_size=7)).decode('utf-8')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], [dict(zip(STUDENT_FIELDS, row)) for row in rows])
+
+    def test_gzip_follows_accept_encoding(self):
+        for path in ('/students/export/?format=csv', '/for-loop/table/?format=csv'):
+            plain = b''.join(self.client.get(path).streaming_content)
+            for accept_encoding, encoded in (
+                ('gzip', True), ('gzip;q=0.5, identity', True), ('*', True),
+                ('gzip;q=0', False), ('gzip;q=0, identity', False), ('*;q=0', False), ('', False),
+            ):
+                with self.subTest(path=path, accept_encoding=accept_encoding):
+                    response = self.client.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+                    body = b''.join(response.streaming_content)
+                    if encoded:
+                        self.assertEqual(response['Content-Encoding'], 'gzip')
+                        body = zlib.decompress(body, 31)
+                    else:
+                        self.assertFalse(response.has_header('Content-Encoding'))
+                    self.assertEqual(body, plain)
+
+
+class DeploymentTests(TestCase):
+    """vercel.json sends the routes the slim public settings do not serve to index_admin.py."""
+
+    def test_staff_routes_go_to_the_admin_function(self):
+        with open(settings.BASE_DIR / 'vercel.json', encoding='utf-8') as handle:
+            routes = json.load(handle)['routes']
+
+        def destination(path):
+            return next(route['dest'] for route in routes if re.fullmatch(route['src'], path))
+
+        for path in ('/admin/', '/admin/main/students/', '/students/export/', '/metrics', '/api/students/batch'):
+            with self.subTest(path=path):
+                self.assertEqual(destination(path), '/index_admin.py')
+        for path in ('/', '/students/', '/api/students/'):
+            with self.subTest(path=path):
+                self.assertEqual(destination(path), '/index.py')
+
+    def run_function(self, entry, database, script):
+        """Run ``script`` in a fresh interpreter after the Vercel function ``entry`` started."""
+        with open(settings.BASE_DIR / 'vercel.json', encoding='utf-8') as handle:
+            deployed = json.load(handle).get('env', {})
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('DJANGO_SETTINGS_MODULE', 'DJANGO_ENV', 'SQLITE_READ_ONLY')
+        }
+        env.update(deployed, SQLITE_PATH=database, STUDENTS_API_TOKEN='batch-token')
+        result = subprocess.run(
+            [sys.executable, '-c', f'import runpy; runpy.run_path({entry!r})\n{script}'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_batch_writes_under_the_deployed_settings(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database = os.path.join(directory.name, 'db.sqlite3')
+        self.run_function('index_admin.py', database, "from django.core.management import call_command; call_command('migrate', verbosity=0)")
+
+        output = self.run_function('index_admin.py', database, '''
+from django.test import Client
+from main.models import Students
+body = '{"student_id": 6599, "name_prefix": "นาย", "first_name": "ทดสอบ", "last_name": "ระบบ"}\\n'
+response = Client().post(
+    '/api/students/batch', body, content_type='application/x-ndjson', HTTP_AUTHORIZATION='Bearer batch-token',
+)
+print(response.status_code)
+print(b''.join(response.streaming_content).decode())
+print(Students.objects.filter(student_id=6599).count())
+''')
+        status, *lines, count = output.strip().splitlines()
+        self.assertEqual(status, '200')
+        self.assertEqual(json.loads(lines[0])['status'], 'created', output)
+        self.assertEqual(count, '1')
+
+        # The public function stays on the immutable profile
+        output = self.run_function('index.py', database, '''
+from django.db import connection
+print(connection.settings_dict['NAME'])
+''')
+        self.assertIn('immutable=1', output)
+
+
+class BulkWriteTests(StatisticsMixin, TestCase):
+    """Chunked admin writes change every selected row and keep the statistics exact."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(30)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def prefix_counts(self):
+        return {group['name_prefix']: group['count'] for group in get_student_stats()['by_prefix']}
+
+    def test_update_prefix_in_chunks(self):
+        # Partial last chunk, exact multiples, one chunk and a chunk larger than the rows
+        for prefix, chunk_size in (('นาง', 7), ('นาย', 10), ('นางสาว', 30), ('นาง', 31)):
+            with self.subTest(prefix=prefix, chunk_size=chunk_size):
+                changing = Students.objects.exclude(name_prefix=prefix).count()
+                self.assertEqual(update_prefix(Students.objects.all(), prefix, chunk_size=chunk_size), changing)
+                self.assertFalse(Students.objects.exclude(name_prefix=prefix).exists())
+                self.assertEqual(self.prefix_counts(), {prefix: 30})
+                self.assertStatisticsMatchRebuild()
+
+    def test_delete_in_chunks(self):
+        ids = list(Students.objects.order_by('student_id').values_list('student_id', flat=True))
+        self.assertEqual(delete_students(Students.objects.filter(student_id__lte=ids[19]), chunk_size=10), 20)
+        self.assertEqual(get_student_stats()['total'], 10)
+        self.assertStatisticsMatchRebuild()
+
+        odd = Students.objects.filter(student_id__in=ids[21::2])
+        self.assertEqual(delete_students(odd, chunk_size=3), 5)
+        self.assertEqual(list(Students.objects.order_by('student_id').values_list('student_id', flat=True)), ids[20::2])
+        self.assertEqual(get_student_stats()['total'], 5)
+        self.assertStatisticsMatchRebuild()
+
+    @override_settings(ADMIN_BULK_CHUNK_SIZE=4)
+    def test_admin_actions(self):
+        self.client.force_login(self.admin)
+        url = '/admin/main/students/'
+        selected = list(Students.objects.order_by('student_id').values_list('pk', flat=True)[:9])
+        response = self.client.post(url, {
+            'action': 'set_prefix_1', '_selected_action': selected,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Students.objects.filter(pk__in=selected).exclude(name_prefix='นาง').count(), 0)
+        self.assertStatisticsMatchRebuild()
+
+        response = self.client.post(url, {
+            'action': 'delete_in_chunks', 'select_across': '1', 'index': '0', 'post': 'yes',
+            '_selected_action': selected[:1],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Students.objects.exists())
+        self.assertEqual(get_student_stats()['total'], 0)
+        self.assertStatisticsMatchRebuild()
+
+
+class AdminKeysetTests(TestCase):
+    """The Students changelist pages on student_id cursors and counts from the statistics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(250)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def page(self, query=''):
+        response = self.client.get(f'/admin/main/students/{query}')
+        self.assertEqual(response.status_code, 200)
+        changelist = response.context['cl']
+        return changelist, [student.student_id for student in changelist.result_list]
+
+    def test_pages_cover_every_row_both_ways(self):
+        self.client.force_login(self.admin)
+        ids = list(Students.objects.order_by('student_id').values_list('student_id', flat=True))
+
+        changelist, seen = self.page()
+        self.assertEqual(changelist.result_count, 250)
+        pages = [seen]
+        while changelist.keyset_page.next_cursor is not None:
+            changelist, seen = self.page(f'?after={changelist.keyset_page.next_cursor}')
+            pages.append(seen)
+        self.assertEqual([student_id for page in pages for student_id in page], ids)
+        self.assertEqual([len(page) for page in pages], [100, 100, 50])
+
+        backwards = []
+        while changelist.keyset_page.previous_cursor is not None:
+            changelist, seen = self.page(f'?before={changelist.keyset_page.previous_cursor}')
+            backwards.append(seen)
+        self.assertEqual(backwards, pages[-2::-1])
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursors walk every row once in either direction, and the async helper agrees."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(23)
+        cls.ids = list(Students.objects.order_by('student_id').values_list('student_id', flat=True))
+
+    def walk(self, page_size):
+        queryset = Students.objects.values('student_id')
+        page = keyset_paginate(queryset, 'student_id', page_size=page_size)
+        self.assertIsNone(page.previous_cursor)
+        pages = [[row['student_id'] for row in page]]
+        while page.next_cursor is not None:
+            page = keyset_paginate(queryset, 'student_id', after=page.next_cursor, page_size=page_size)
+            pages.append([row['student_id'] for row in page])
+        backwards = [pages[-1]]
+        while page.previous_cursor is not None:
+            page = keyset_paginate(queryset, 'student_id', before=page.previous_cursor, page_size=page_size)
+            backwards.append([row['student_id'] for row in page])
+        return pages, backwards
+
+    def test_walk_forwards_and_back(self):
+        # A partial last page, pages that divide the rows exactly, and one page
+        for page_size in (5, 23, 1, 50):
+            with self.subTest(page_size=page_size):
+                pages, backwards = self.walk(page_size)
+                self.assertEqual([student_id for page in pages for student_id in page], self.ids)
+                self.assertTrue(all(pages[:-1]) and all(len(page) == page_size for page in pages[:-1]))
+                self.assertEqual(backwards, pages[::-1])
+
+    def test_cursors_past_either_end(self):
+        queryset = Students.objects.all()
+        page = keyset_paginate(queryset, 'student_id', after=self.ids[-1], page_size=5)
+        self.assertEqual((len(page), page.next_cursor, page.previous_cursor), (0, None, None))
+        page = keyset_paginate(queryset, 'student_id', before=self.ids[0], page_size=5)
+        self.assertEqual((len(page), page.next_cursor, page.previous_cursor), (0, None, None))
+        page = keyset_paginate(queryset, 'student_id', before=self.ids[5], page_size=5)
+        self.assertEqual([student.student_id for student in page], self.ids[:5])
+        self.assertIsNone(page.previous_cursor)
+        self.assertEqual(page.next_cursor, self.ids[4])
+
+    def test_flags_come_from_the_rows(self):
+        # Cursors that are not (or no longer) rows: nothing lies past either end
+        queryset = Students.objects.values('student_id')
+        page = keyset_paginate(queryset, 'student_id', before=self.ids[-1] + 1, page_size=5)
+        self.assertEqual([row['student_id'] for row in page], self.ids[-5:])
+        self.assertEqual((page.has_next, page.has_previous), (False, True))
+        page = keyset_paginate(queryset, 'student_id', after=self.ids[0] - 1, page_size=5)
+        self.assertEqual([row['student_id'] for row in page], self.ids[:5])
+        self.assertEqual((page.has_next, page.has_previous), (True, False))
+        # The lookbehind row honours the queryset's own filters
+        queryset = queryset.filter(student_id__gt=self.ids[9], student_id__lt=self.ids[15])
+        for after, before in ((self.ids[5], None), (None, self.ids[20])):
+            with self.subTest(after=after, before=before):
+                page = keyset_paginate(queryset, 'student_id', after=after, before=before, page_size=3)
+                self.assertEqual(page.has_previous, before is not None)
+                self.assertEqual(page.has_next, after is not None)
+
+    async def test_async_pages_match(self):
+        queryset = Students.objects.values('student_id')
+        for after, before in ((None, None), (self.ids[3], None), (None, self.ids[12]), (self.ids[20], None), (None, self.ids[-1] + 1)):
+            with self.subTest(after=after, before=before):
+                expected = await sync_to_async(keyset_paginate)(queryset, 'student_id', after, before, 5)
+                page = await akeyset_paginate(queryset, 'student_id', after, before, 5)
+                self.assertEqual(page.object_list, expected.object_list)
+                self.assertEqual((page.next_cursor, page.previous_cursor), (expected.next_cursor, expected.previous_cursor))
+
+    def test_students_page_reads_one_page(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/students/?after={self.ids[9]}&page_size=5')
+        self.assertEqual([student.student_id for student in response.context['students']], self.ids[10:15])
+        self.assertContains(response, f'?after={self.ids[14]}')
+        self.assertContains(response, f'?before={self.ids[10]}')
+
+
+class SearchTests(TestCase):
+    """The FTS index follows every kind of write and answers long, short and mixed terms."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Students.objects.create(student_id=6501, name_prefix='นาย', first_name='สมชาย', last_name='ใจดี')
+        Students.objects.bulk_create([
+            Students(student_id=6502, name_prefix='นางสาว', first_name='สมหญิง', last_name='รักเรียน'),
+            Students(student_id=6503, name_prefix='นาย', first_name='วิชัย', last_name='ใจงาม'),
+        ])
+
+    def search(self, query):
+        return sorted(search_students(Students.objects.all(), query).values_list('student_id', flat=True))
+
+    def test_terms(self):
+        for query, expected in (
+            ('สมช', [6501]),
+            ('ใจ', [6501, 6503]),             # short: start of a name
+            ('นาย', [6501, 6503]),
+            ('สมชาย ดี', [6501]),              # short terms narrow the indexed ones
+            ('สม ใจ', [6501]),
+            ('สม ดี', []),                     # short terms alone match name starts
+            ('สมหญิง รักเรียน', [6502]),
+            ('หญิง', [6502]),                  # inside a name
+            ('650', [6501, 6502, 6503]),
+            ('6503', [6503]),
+            ('65', []),                        # short digits match whole ids only
+            ('ไม่มี', []),
+            ('"สมช', []),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+
+    def test_index_follows_writes(self):
+        student = Students.objects.get(student_id=6501)
+        student.first_name = 'ประเสริฐ'
+        student.save()
+        self.assertEqual(self.search('สมชาย'), [])
+        self.assertEqual(self.search('ประเสริฐ'), [6501])
+
+        Students.objects.filter(student_id=6502).update(last_name='ขยันดี')
+        self.assertEqual(self.search('รักเรียน'), [])
+        self.assertEqual(self.search('ขยันดี'), [6502])
+
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE main_students SET first_name = 'มานะ' WHERE student_id = 6503")
+        self.assertEqual(self.search('มานะ'), [6503])
+
+        upsert_students([Students(student_id=6503, name_prefix='นาย', first_name='ปิติ', last_name='ใจงาม')])
+        self.assertEqual(self.search('มานะ'), [])
+        self.assertEqual(self.search('ปิติ'), [6503])
+
+        Students.objects.filter(student_id__in=[6501, 6503]).delete()
+        self.assertEqual(self.search('ประเสริฐ'), [])
+        self.assertEqual(self.search('ใจงาม'), [])
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO main_students_fts(main_students_fts) VALUES ('integrity-check')")
+
+    def test_search_view(self):
+        response = self.client.get('/students/search/', {'q': 'ใจ', 'limit': 1})
+        self.assertEqual(response.json(), {
+            'query': 'ใจ', 'count': 1,
+            'results': [{'student_id': 6501, 'name_prefix': 'นาย', 'first_name': 'สมชาย', 'last_name': 'ใจดี'}],
+        })
+        self.assertEqual(self.client.get('/students/search/', {'q': ' '}).json()['count'], 0)
+
+
+class MetricsTests(TestCase):
+    """Requests get a Server-Timing header and add up in /metrics per route."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(20)
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'password')
+
+    def setUp(self):
+        metrics.reset()
+
+    def series(self, name, route, method='GET', status=200):
+        pattern = rf'^{name}\{{route="{re.escape(route)}",method="{method}",status="{status}"\}} (\S+)$'
+        text = metrics.render_prometheus()
+        found = re.search(pattern, text, re.MULTILINE)
+        self.assertIsNotNone(found, f'{name} {route} missing from\n{text}')
+        return float(found.group(1))
+
+    def test_server_timing(self):
+        response = self.client.get('/students/?page_size=5')
+        found = re.fullmatch(
+            r'total;dur=([\d.]+), db;dur=([\d.]+);desc="(\d+) queries", tpl;dur=([\d.]+)',
+            response['Server-Timing'],
+        )
+        self.assertIsNotNone(found, response['Server-Timing'])
+        total, db, queries, template = found.groups()
+        self.assertEqual(int(queries), 2)
+        self.assertGreater(float(total), 0)
+        self.assertGreater(float(template), 0)
+        self.assertLessEqual(float(db) + float(template), float(total))
+
+    def test_series_per_route(self):
+        for student_id in Students.objects.values_list('student_id', flat=True)[:3]:
+            self.client.get(f'/students/?after={student_id}&page_size=5')
+        self.client.get('/no-such-page/')
+        self.client.force_login(self.staff)
+        export = self.client.get('/students/export/?format=ndjson')
+        body = b''.join(export.streaming_content)
+
+        self.assertEqual(self.series('portfolio_request_duration_seconds_count', '/students/'), 3)
+        self.assertEqual(self.series('portfolio_db_queries_total', '/students/'), 6)
+        self.assertGreater(self.series('portfolio_template_duration_seconds_total', '/students/'), 0)
+        self.assertEqual(self.series('portfolio_request_duration_seconds_count', '<unresolved>', status=404), 1)
+        # Streaming bodies are counted as they are sent
+        self.assertEqual(self.series('portfolio_response_bytes_total', '/students/export/'), len(body))
+
+    def test_template_backend_times_renders(self):
+        # The configured backend does the timing; Django's own Template class is left alone
+        self.client.get('/students/?page_size=5')
+        template = get_template('main/students.html')
+        self.assertIsInstance(template, metrics.Template)
+        self.assertEqual(django_backend.Template.render.__module__, 'django.template.backends.django')
+        timings, token = metrics.start_request()
+        try:
+            template.render({'students': [], 'page_size': 5})
+        finally:
+            metrics.finish_request(token)
+        self.assertGreater(timings.template, 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_access(self):
+        self.client.get('/students/')
+        self.assertEqual(self.client.get('/metrics').status_code, 302)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 302)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'portfolio_request_duration_seconds_count{route="/students/",method="GET",status="200"} 1')
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+@override_settings(CACHES=worker_caches(), COMPRESSION_ENCODINGS=('gzip',))
+class CompressionTests(TestCase):
+    """Accept-Encoding is negotiated on q-values and compressed bodies get weak ETags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        fill_students(40)
+
+    def setUp(self):
+        # The API ETags follow the tag cache version
+        for cache in caches.all():
+            cache.clear()
+
+    def test_negotiate(self):
+        # Only membership is checked, so the optional codecs need not be installed
+        encodings = override_settings(COMPRESSION_ENCODINGS=('br', 'zstd', 'gzip'))
+        with encodings, mock.patch.dict(STREAM_CODECS, {'br': object, 'zstd': object}):
+            for accept_encoding, expected in (
+                ('', None),
+                ('identity', None),
+                ('gzip', 'gzip'),
+                ('GZIP, deflate', 'gzip'),
+                ('gzip, br, zstd', 'br'),                  # ties follow COMPRESSION_ENCODINGS
+                ('br;q=0.5, gzip;q=0.8', 'gzip'),
+                ('gzip;q=0', None),
+                ('gzip;q=0, br;q=0.1', 'br'),
+                ('*', 'br'),
+                ('*;q=0.5, br;q=0', 'zstd'),
+                ('*;q=0', None),
+                ('gzip;q=abc', None),
+            ):
+                with self.subTest(accept_encoding=accept_encoding):
+                    self.assertEqual(negotiate(accept_encoding), expected)
+            self.assertEqual(negotiate('br, gzip;q=0.5', encodings=('gzip',)), 'gzip')
+
+    def get(self, path, accept_encoding, **extra):
+        return self.client.get(path, HTTP_ACCEPT_ENCODING=accept_encoding, **extra)
+
+    def test_weak_etag_and_304(self):
+        plain = self.get('/api/students/', 'gzip;q=0')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        etag = plain['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        encoded = self.get('/api/students/', 'gzip')
+        self.assertEqual(encoded['Content-Encoding'], 'gzip')
+        self.assertEqual(encoded['ETag'], 'W/' + etag)
+        self.assertEqual(zlib.decompress(encoded.content, 31), plain.content)
+        self.assertEqual(encoded['Content-Length'], str(len(encoded.content)))
+
+        # Either form revalidates, with or without compression
+        for accept_encoding, if_none_match in (('gzip', 'W/' + etag), ('gzip', etag), ('', 'W/' + etag)):
+            with self.subTest(accept_encoding=accept_encoding, if_none_match=if_none_match):
+                response = self.get('/api/students/', accept_encoding, HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_what_is_left_alone(self):
+        # Under COMPRESSION_MIN_SIZE
+        response = self.get('/api/students/?limit=1&fields=student_id', 'gzip')
+        self.assertLess(len(response.content), settings.COMPRESSION_MIN_SIZE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # Not a text type
+        self.client.force_login(User.objects.create_superuser('staff', 'staff@example.com', 'password'))
+        response = self.get('/students/export/?format=columnar', 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_pages(self):
+        plain = b''.join(self.get('/students/?stream=1', '').streaming_content)
+        response = self.get('/students/?stream=1', 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        # Every chunk is flushed, so the page header decodes before the rest arrives
+        self.assertIn(b'<html', zlib.decompressobj(31).decompress(chunks[0]))
+        self.assertEqual(zlib.decompress(b''.join(chunks), 31), plain)
+
+
+class MinifyTests(TestCase):
+    """The template minifier collapses markup but never touches raw elements or template tags."""
+
+    def test_markup(self):
+        self.assertEqual(
+            minify_html('<ul>\n    <li>a</li>   <li>b</li>\n\n</ul>  <!-- note -->\t<p>x</p>'),
+            '<ul>\n<li>a</li> <li>b</li>\n</ul> <p>x</p>',
+        )
+        kept = f'<!--[if IE]><p>old</p><![endif]-->{STREAM_MARKER}'
+        self.assertEqual(minify_html(kept), kept)
+
+    def test_raw_elements_are_verbatim(self):
+        for raw in (
+            '<pre class="code">  a\n\n    b  <!-- kept --></pre>',
+            '<textarea name="t">\n  two  spaces\n</textarea>',
+            '<SCRIPT>\n  if (a  <  b) { x = "  "; }  // <!-- no -->\n</SCRIPT>',
+            '<style>\n  p  >  a { color: red; }\n</style>',
+        ):
+            with self.subTest(raw=raw):
+                self.assertEqual(minify_html(f'<div>  {raw}  </div>'), f'<div> {raw} </div>')
+
+    def test_template_tags(self):
+        # Tags are kept as written and do not end a raw element
+        source = '{%  if a  %}\n   <pre>  {{ code }}\n   {% if b %}  x  {% endif %}  </pre>   {%  endif  %}'
+        self.assertEqual(
+            minify_html(source),
+            '{%  if a  %}\n<pre>  {{ code }}\n   {% if b %}  x  {% endif %}  </pre> {%  endif  %}',
+        )
+        # Only whole element names start a raw run
+        self.assertEqual(minify_html('<prefix>  a  </prefix>'), '<prefix> a </prefix>')
+        # An unclosed raw element keeps the rest of the template
+        self.assertEqual(minify_html('<pre>  a\n\n{{ b }}  c  '), '<pre>  a\n\n{{ b }}  c  ')
+
+    def test_only_project_templates(self):
+        self.assertTrue(should_minify(settings.BASE_DIR / 'main' / 'templates' / 'main' / 'for.html'))
+        self.assertFalse(should_minify(settings.BASE_DIR / 'main' / 'templates' / 'main' / 'contact.txt'))
+        self.assertFalse(should_minify(os.path.join(os.path.dirname(mail.__file__), 'x.html')))
+
+        source = get_template('main/for.html').template.source
+        with open(settings.BASE_DIR / 'main' / 'templates' / 'main' / 'for.html', encoding='utf-8') as handle:
+            original = handle.read()
+        self.assertEqual(source, minify_html(original))
+        self.assertLess(len(source), len(original))
+
+
+@skipIf(Image is None, 'needs Pillow')
+class ResponsiveImageTests(TestCase):
+    """{% responsive_image %} offers every derivative width once and never upscales."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = os.path.join(directory.name, 'media')
+        os.makedirs(self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, IMAGE_CACHE_ROOT=os.path.join(directory.name, 'images'),
+            IMAGE_WIDTHS=(320, 640, 960, 1280, 1920),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, size, mode='RGB'):
+        Image.new(mode, size).save(os.path.join(self.media_root, name))
+        return SimpleNamespace(name=name, url=f'/media/{name}', storage=None)
+
+    def render(self, image):
+        template = Template(
+            "{% load images %}{% responsive_image image alt=title sizes='50vw' class='img-fluid' %}"
+        )
+        return template.render(Context({'image': image, 'title': 'รูป <1>'}))
+
+    def widths(self, html, fmt):
+        found = re.findall(rf'/w(\d+)/{fmt}/[^ "]+ (\d+)w', html)
+        for url_width, descriptor in found:
+            self.assertEqual(url_width, descriptor)
+        return [int(width) for width, _ in found]
+
+    def test_srcset_per_format(self):
+        html = self.render(self.upload('photo.jpg', (1500, 1000)))
+        self.assertTrue(html.startswith('<picture>') and html.endswith('</picture>'))
+        for fmt in available_formats():
+            with self.subTest(fmt=fmt):
+                self.assertIn(f'<source type="image/{fmt}" srcset="', html)
+                self.assertEqual(self.widths(html, fmt), [320, 640, 960, 1280, 1500])
+        self.assertEqual(self.widths(html, 'jpeg'), [320, 640, 960, 1280, 1500])
+        self.assertEqual(html.count('sizes="50vw"'), len(available_formats()) + 1)
+        self.assertIn('src="/images/media/w960/jpeg/photo.jpg?v=', html)
+        self.assertIn('width="1500" height="1000" alt="รูป &lt;1&gt;" loading="lazy" decoding="async" class="img-fluid">', html)
+
+    def test_never_upscaled(self):
+        html = self.render(self.upload('wide.jpg', (3000, 2000)))
+        self.assertEqual(self.widths(html, 'jpeg'), [320, 640, 960, 1280, 1920])
+        self.assertIn('width="1920" height="1280"', html)
+
+        html = self.render(self.upload('icon.png', (200, 100), 'RGBA'))
+        self.assertEqual(self.widths(html, 'png'), [200])
+        self.assertEqual(self.widths(html, 'jpeg'), [])
+        self.assertIn('src="/images/media/w200/png/icon.png?v=', html)
+
+    def test_unreadable_source_falls_back(self):
+        html = self.render(SimpleNamespace(name='missing.jpg', url='/media/missing.jpg', storage=None))
+        self.assertEqual(
+            html, '<img src="/media/missing.jpg" alt="รูป &lt;1&gt;" loading="lazy" decoding="async" class="img-fluid">'
+        )
+
+    def test_srcset_urls_serve_their_width(self):
+        html = self.render(self.upload('photo.jpg', (1500, 1000)))
+        url = re.search(r'(/images/media/w640/jpeg/photo\.jpg\?v=\w+) 640w', html).group(1)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (640, 427))
+        self.assertEqual(self.client.get('/images/media/w1920/jpeg/photo.jpg').status_code, 404)
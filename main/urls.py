@@ -1,3 +1,4 @@
+from django.apps import apps
 from django.urls import path
 from . import views
 
@@ -9,5 +10,18 @@ urlpatterns = [
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
     path('students/', views.students_list, name='students'),
+    path('students/search/', views.students_search, name='students_search'),
+    path('students/stats/', views.students_stats, name='students_stats'),
+    path('api/students/', views.students_api, name='students_api'),
     path('for-loop/', views.for_loop_example, name='for_loop'),
+    path('for-loop/table/', views.multiplication_table, name='multiplication_table'),
+    path('images/<str:kind>/w<int:width>/<str:fmt>/<path:name>', views.image_derivative, name='image'),
 ]
+
+# Staff-only views need the auth stack, which the slim public settings omit
+if apps.is_installed('django.contrib.auth'):
+    urlpatterns += [
+        path('students/export/', views.students_export, name='students_export'),
+        path('api/students/batch', views.students_batch, name='students_batch'),
+        path('metrics', views.metrics, name='metrics'),
+    ]
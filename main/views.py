@@ -1,145 +1,368 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import user_passes_test
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from datetime import date
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+import hmac
 import json
-from .models import Students
+from .api import astudents_page_body, page_etag
+from .batch import apply_changes
+from .compression import negotiate
+from .content import (
+    CONTENT_TAG, afeatured_projects, aget_site_configuration, askill_groups,
+)
+from .exports import EXPORT_FORMATS, export_students, parse_fields
+from .importers import open_text
+from .images import FORMATS, ensure_derivative, serves_format, source_image
+from .metrics import render_prometheus
+from .multiplication import TABLE_FORMATS, multiplication_rows, stream_table
+from .models import ContactMessage, Students
+from .page_cache import page_cache, tag_versions
+from .pagination import akeyset_paginate
+from .search import asearch_students
+from .snapshot import get_snapshot
+from .stats import STUDENTS_TAG, aget_student_stats
+from .streaming import STREAM_MARKER, aiterate, astream_template, stream_template
+from .write_behind import submit_contact_message
 
-def index(request):
+@page_cache(depends_on=(CONTENT_TAG,))
+async def index(request):
     """Main portfolio page - Home section"""
-    return render(request, 'main/home.html')
+    context = {
+        'site': await aget_site_configuration(),
+        'featured_projects': await afeatured_projects(),
+    }
+    return render(request, 'main/home.html', context)
 
-def about(request):
+@page_cache(depends_on=(CONTENT_TAG,))
+async def about(request):
     """About page with personal information"""
-    return render(request, 'main/about.html')
+    context = {
+        'site': await aget_site_configuration(),
+        'skill_groups': await askill_groups(),
+    }
+    return render(request, 'main/about.html', context)
 
-def contact(request):
+@page_cache(vary_on_csrf=True)
+async def contact(request):
     """Contact page with form"""
     if request.method == 'POST':
         # Handle contact form submission
-        name = request.POST.get('name')
-        lastname = request.POST.get('lastname')
-        email = request.POST.get('email')
-        message = request.POST.get('message')
-        
-        # Here you can add logic to save to database or send email
-        # For now, we'll just return success
+        contact_message = ContactMessage(
+            name=request.POST.get('name', '').strip(),
+            lastname=request.POST.get('lastname', '').strip(),
+            email=request.POST.get('email', '').strip(),
+            message=request.POST.get('message', '').strip(),
+        )
         context = {
-            'message_sent': True,
             'form_data': {
-                'name': name,
-                'lastname': lastname,
-                'email': email,
-                'message': message
+                'name': contact_message.name,
+                'lastname': contact_message.lastname,
+                'email': contact_message.email,
+                'message': contact_message.message
             }
         }
+        try:
+            contact_message.full_clean()
+        except ValidationError as error:
+            context['form_errors'] = error.messages
+            return render(request, 'main/contact.html', context, status=400)
+
+        # Saved and mailed in batches by the write-behind worker
+        if not await sync_to_async(submit_contact_message)(contact_message):
+            context['form_errors'] = ['ระบบไม่สามารถรับข้อความได้ในขณะนี้ กรุณาลองใหม่อีกครั้งภายหลัง']
+            return render(request, 'main/contact.html', context, status=503)
+        context['message_sent'] = True
         return render(request, 'main/contact.html', context)
     
     return render(request, 'main/contact.html')
 
-def for_loop_example(request):
+@page_cache(vary_on=('HTTP_USER_AGENT', 'REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT'),
+            vary_on_csrf=True)
+async def for_loop_example(request):
     """For loop example page with tables and data"""
-    
-    # Sample data for demonstration
-    items = [
-        'HTML & CSS',
-        'JavaScript & React',
-        'Python & Django',
-        'Bootstrap Framework',
-        'Git & GitHub',
-        'Database Design'
-    ]
-    
-    students = [
-        {
-            'first_name': 'สมชาย',
-            'last_name': 'ใจดี',
-            'email': 'somchai@email.com',
-            'score': 85
-        },
-        {
-            'first_name': 'สมหญิง',
-            'last_name': 'รักเรียน',
-            'email': 'somying@email.com',
-            'score': 92
-        },
-        {
-            'first_name': 'กิตติ',
-            'last_name': 'ขยันเรียน',
-            'email': 'kitti@email.com',
-            'score': 78
-        },
-        {
-            'first_name': 'อนุชา',
-            'last_name': 'ปรีชา',
-            'email': 'anucha@email.com',
-            'score': 95
-        },
-        {
-            'first_name': 'มาลี',
-            'last_name': 'สวยงาม',
-            'email': 'mali@email.com',
-            'score': 67
-        }
-    ]
-    
-    projects = [
-        {
-            'name': 'E-Commerce Website',
-            'description': 'ระบบขายของออนไลน์',
-            'technologies': ['Django', 'PostgreSQL', 'Bootstrap'],
-            'status': 'completed',
-            'progress': 100,
-            'created_date': date(2024, 1, 15)
-        },
-        {
-            'name': 'Portfolio Website',
-            'description': 'เว็บไซต์แสดงผลงาน',
-            'technologies': ['HTML', 'CSS', 'JavaScript'],
-            'status': 'completed',
-            'progress': 100,
-            'created_date': date(2024, 2, 10)
-        },
-        {
-            'name': 'Mobile App',
-            'description': 'แอพพลิเคชันมือถือ',
-            'technologies': ['React Native', 'Firebase'],
-            'status': 'in_progress',
-            'progress': 75,
-            'created_date': date(2024, 3, 5)
-        },
-        {
-            'name': 'Data Dashboard',
-            'description': 'แดชบอร์ดแสดงข้อมูล',
-            'technologies': ['Python', 'Streamlit', 'Pandas'],
-            'status': 'pending',
-            'progress': 25,
-            'created_date': date(2024, 4, 1)
-        }
-    ]
-    
-    # Handle skills data for checkboxes
-    selected_skills = []
+    number = number_error = None
+    number_max = settings.MULTIPLICATION_NUMBER_MAX
     if request.method == 'POST':
-        selected_skills = request.POST.getlist('skills')
-    
+        number = _int_value(request.POST.get('number'))
+        if number is None or not 1 <= number <= number_max:
+            number, number_error = None, f'กรุณาใส่ตัวเลขระหว่าง 1-{number_max}'
+
     context = {
-        'items': items,
-        'students': students,
-        'projects': projects,
-        'count': range(1, 13),  # Creates a range from 1 to 12 for multiplication table
-        'selected_skills': selected_skills,
+        'number': number,
+        'number_max': number_max,
+        'number_error': number_error,
+        # (i, number * i) pairs for 1..12, computed in one pass, not a filter per cell
+        'table_rows': multiplication_rows(number, range(1, 13)) if number is not None else None,
     }
     
     return render(request, 'main/for.html', context)
 
-def students_list(request):
-    """Students page displaying all student records"""
-    students = Students.objects.all().order_by('student_id')
-    
+# Like admin's staff_member_required, without importing django.contrib.admin
+staff_member_required = user_passes_test(
+    lambda user: user.is_active and user.is_staff,
+    login_url='admin:login',
+)
+
+def _int_value(value, default=None):
+    """Parse ``value`` as an integer, falling back to ``default``."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _int_param(request, name, default=None):
+    """Read an integer query parameter, falling back to ``default``."""
+    return _int_value(request.GET.get(name), default)
+
+@page_cache(depends_on=(STUDENTS_TAG,))
+async def students_list(request):
+    """Students page with keyset pagination (?after=/?before=) or ?stream=1"""
+    students = Students.objects.all()
+    # The build's snapshot when this worker has one (main/snapshot.py)
+    snapshot = get_snapshot()
+    # Materialized counts (main/stats.py): no COUNT(*) per request
+    student_stats = snapshot.stats if snapshot is not None else await aget_student_stats()
+    total_students = student_stats['total']
+
+    if request.GET.get('stream'):
+        # Send the page header first, then the cards in chunks
+        context = {
+            'streaming': True,
+            'stream_marker': STREAM_MARKER,
+            'total_students': total_students,
+            'shown_students': total_students,
+            'student_stats': student_stats,
+        }
+        rows = (
+            students.order_by('student_id')
+            .values('student_id', 'name_prefix', 'first_name', 'last_name')
+        )
+        # A WSGI server can only stream a sync iterator; Django would
+        # buffer an async one whole
+        if isinstance(request, ASGIRequest):
+            render_stream = astream_template
+            if snapshot is not None:
+                rows = aiterate(snapshot.iter_rows())
+            else:
+                rows = rows.aiterator(chunk_size=settings.STUDENTS_STREAM_CHUNK_SIZE)
+        else:
+            render_stream = stream_template
+            if snapshot is not None:
+                rows = snapshot.iter_rows()
+            else:
+                rows = rows.iterator(chunk_size=settings.STUDENTS_STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(
+            render_stream(
+                request, 'main/students.html', context, rows,
+                'main/includes/student_cards.html', 'students',
+                chunk_size=settings.STUDENTS_STREAM_CHUNK_SIZE,
+            ),
+            content_type='text/html; charset=utf-8',
+        )
+
+    page_size = _int_param(request, 'page_size', settings.STUDENTS_PAGE_SIZE)
+    page_size = max(1, min(page_size, settings.STUDENTS_MAX_PAGE_SIZE))
+    after, before = _int_param(request, 'after'), _int_param(request, 'before')
+    if snapshot is not None:
+        page = snapshot.page(after=after, before=before, page_size=page_size)
+    else:
+        page = await akeyset_paginate(
+            students, 'student_id', after=after, before=before, page_size=page_size,
+        )
+
     context = {
-        'students': students,
-        'total_students': students.count(),
+        'students': page.object_list,
+        'page': page,
+        'page_size': page_size,
+        'total_students': total_students,
+        'shown_students': len(page),
+        'student_stats': student_stats,
     }
-    
+
     return render(request, 'main/students.html', context)
+
+@page_cache(depends_on=(STUDENTS_TAG,))
+async def students_stats(request):
+    """Student counts in total, per name prefix and per student_id range, as JSON"""
+    snapshot = get_snapshot()
+    stats = snapshot.stats if snapshot is not None else await aget_student_stats()
+    return JsonResponse(stats, json_dumps_params={'ensure_ascii': False})
+
+async def students_search(request):
+    """JSON search over student ids and names (?q=, ?limit=)"""
+    query = request.GET.get('q', '').strip()
+    limit = max(1, min(_int_param(request, 'limit', 20), 100))
+    results = []
+    if query:
+        matches = await asearch_students(Students.objects.all(), query)
+        results = [
+            row async for row in
+            matches.order_by('student_id')
+            .values('student_id', 'name_prefix', 'first_name', 'last_name')[:limit]
+        ]
+    return JsonResponse({
+        'query': query,
+        'count': len(results),
+        'results': results,
+    }, json_dumps_params={'ensure_ascii': False})
+
+async def students_api(request):
+    """Students as JSON straight from values_list (?fields=, ?after=/?before=, ?limit=)"""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    limit = max(1, min(_int_param(request, 'limit', settings.STUDENTS_API_PAGE_SIZE),
+                       settings.STUDENTS_API_MAX_PAGE_SIZE))
+    after, before = _int_param(request, 'after'), _int_param(request, 'before')
+
+    # Version first, as in stats._load_stats: a change during the read makes it stale
+    snapshot = get_snapshot()
+    version = f'snapshot.{snapshot.version}' if snapshot is not None else tag_versions((STUDENTS_TAG,))[0]
+    etag = page_etag(version, fields, after, before, limit)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            await astudents_page_body(request.path, etag, fields, after, before, limit),
+            content_type='application/json',
+        )
+        response['ETag'] = etag
+        # The compression middleware encodes each page once per table version
+        response.page_cache_etag = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+BATCH_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json': 'json',
+}
+
+def _batch_response(request):
+    fmt = BATCH_FORMATS.get(request.content_type)
+    if fmt is None:
+        return HttpResponse(
+            f'Send {" or ".join(BATCH_FORMATS)}', status=415, content_type='text/plain; charset=utf-8',
+        )
+    chunks = apply_changes(open_text(request), fmt, settings.STUDENTS_BATCH_CHUNK_SIZE)
+    return StreamingHttpResponse(
+        (
+            ''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results).encode()
+            for results in chunks
+        ),
+        content_type='application/x-ndjson',
+    )
+
+_staff_batch = csrf_protect(user_passes_test(
+    lambda user: user.is_active and user.is_staff
+    and user.has_perms(['main.add_students', 'main.change_students', 'main.delete_students']),
+    login_url='admin:login',
+)(_batch_response))
+
+# Stays sync, like the export: the body is read and the rows written
+# while the response streams
+@csrf_exempt
+@require_POST
+def students_batch(request):
+    """Upsert/delete students from an NDJSON or JSON array body (STUDENTS_API_TOKEN bearer or staff)"""
+    token = settings.STUDENTS_API_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return _batch_response(request)
+    return _staff_batch(request)
+
+# Stays sync: the exporters are blocking generators over .iterator()
+@staff_member_required
+def students_export(request):
+    """Stream the Students table as CSV, NDJSON or columnar binary"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f'Unsupported format: {fmt}')
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    compress = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), encodings=('gzip',)) is not None
+    response = StreamingHttpResponse(
+        export_students(
+            fmt, fields,
+            start=_int_param(request, 'start'),
+            end=_int_param(request, 'end'),
+            compress=compress,
+        ),
+        content_type=EXPORT_FORMATS[fmt],
+    )
+    extension = 'bin' if fmt == 'columnar' else fmt
+    response['Content-Disposition'] = f'attachment; filename="students.{extension}"'
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+def multiplication_table(request):
+    """Stream a ?rows= x ?columns= multiplication table as JSON or CSV"""
+    fmt = request.GET.get('format', 'json')
+    if fmt not in TABLE_FORMATS:
+        return HttpResponseBadRequest(f'Unsupported format: {fmt}')
+    rows = _int_param(request, 'rows', 12)
+    columns = _int_param(request, 'columns', 12)
+    if not (1 <= rows <= settings.MULTIPLICATION_TABLE_MAX_ROWS
+            and 1 <= columns <= settings.MULTIPLICATION_TABLE_MAX_COLUMNS):
+        return HttpResponseBadRequest(
+            f'rows must be 1-{settings.MULTIPLICATION_TABLE_MAX_ROWS} and '
+            f'columns 1-{settings.MULTIPLICATION_TABLE_MAX_COLUMNS}'
+        )
+
+    compress = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), encodings=('gzip',)) is not None
+    response = StreamingHttpResponse(
+        stream_table(fmt, rows, columns, compress=compress),
+        content_type=TABLE_FORMATS[fmt],
+    )
+    if fmt == 'csv':
+        response['Content-Disposition'] = f'attachment; filename="multiplication-{rows}x{columns}.csv"'
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    # The same parameters always produce the same table
+    patch_cache_control(response, public=True, max_age=settings.MULTIPLICATION_TABLE_MAX_AGE)
+    return response
+
+def image_derivative(request, kind, width, fmt, name):
+    """Serve a resized image, encoding and caching it on first request"""
+    source = source_image(kind, name)
+    if source is None or width not in source.widths() or not serves_format(source, fmt):
+        raise Http404('No such image derivative')
+
+    etag = f'"{source.digest}-{width}.{fmt}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(open(ensure_derivative(source, width, fmt), 'rb'), content_type=FORMATS[fmt][1])
+        response['ETag'] = etag
+    if request.GET.get('v') == source.digest:
+        # The URL changes whenever the source does
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.IMAGE_MAX_AGE)
+    return response
+
+def _metrics_response():
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+_staff_metrics = staff_member_required(lambda request: _metrics_response())
+
+def metrics(request):
+    """Prometheus metrics for this process (staff session or METRICS_TOKEN bearer)"""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return _metrics_response()
+    return _staff_metrics(request)
@@ -0,0 +1,354 @@
+"""
+Write-behind persistence for contact form submissions.
+
+``submit_contact_message`` hands an unsaved ``ContactMessage`` to an
+in-process bounded queue and returns immediately. A background writer
+thread saves queued messages with ``bulk_create`` whenever
+``CONTACT_FLUSH_SIZE`` messages are waiting or ``CONTACT_FLUSH_INTERVAL``
+seconds have passed, then passes them to a mail worker that sends the
+notifications over one SMTP connection kept open while there is work.
+
+When the queue is full the message is saved synchronously instead of
+being dropped. A failed flush is retried with backoff and, if the
+database is still unavailable (``OperationalError``, e.g. "database is
+locked"), kept for the next flush; other errors save the batch row by
+row so only the offending rows are dropped (and logged). Email delivery
+is retried on a new SMTP connection, and a worker thread that died is
+started again on the next submission. ``shutdown`` (registered with
+``atexit``) drains both queues, so a recycled worker process does not
+lose submissions. Set
+``CONTACT_WRITE_BEHIND = False`` where background threads cannot run
+after the response (serverless functions) to save and notify inline; a
+message that could be neither saved nor mailed is then reported to the
+visitor instead of being dropped.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import DatabaseError, OperationalError, close_old_connections
+
+from .models import ContactMessage
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """Batch ``model`` instances from any thread into ``bulk_create`` calls."""
+
+    def __init__(self, model, max_size, flush_size, flush_interval, on_flush=None,
+                 retry_delays=(0.1, 0.5, 2.0)):
+        self.model = model
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.retry_delays = retry_delays
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, instance):
+        """
+        Queue ``instance``; return False if it had to be saved inline. An
+        inline save that still fails after the retries raises its
+        ``DatabaseError`` to the caller.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(instance)
+            return True
+        except queue.Full:
+            self._save([instance])
+            self._flushed([instance])
+            return False
+
+    def shutdown(self, timeout=10):
+        """Flush everything queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f'write-behind-{self.model._meta.model_name}',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stop = False
+        while True:
+            # A batch kept after a failed flush takes no more items, so the
+            # queue fills up and submit() saves inline instead
+            if not stop and len(batch) < self.flush_size:
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    stop = True
+                elif item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            elif not stop:
+                time.sleep(max(0, deadline - time.monotonic()))
+
+            if batch and (stop or len(batch) >= self.flush_size or time.monotonic() >= deadline):
+                if self._write(batch):
+                    batch, deadline = [], None
+                elif stop:
+                    logger.error(
+                        'Write-behind shutdown lost %d %s: %r', len(batch), self.model.__name__, batch,
+                    )
+                    return
+                else:
+                    deadline = time.monotonic() + self.flush_interval
+            if stop and not batch:
+                return
+
+    def _save(self, batch):
+        """``bulk_create`` the batch, retrying with backoff; raise the last ``DatabaseError``."""
+        for delay in (*self.retry_delays, None):
+            close_old_connections()
+            try:
+                self.model.objects.bulk_create(batch)
+                return
+            except DatabaseError:
+                if delay is None:
+                    raise
+                logger.warning(
+                    'Write-behind flush of %d %s failed, retrying in %ss',
+                    len(batch), self.model.__name__, delay, exc_info=True,
+                )
+                time.sleep(delay)
+            finally:
+                close_old_connections()
+
+    def _write(self, batch):
+        """Save and hand on ``batch``; False to keep it for the next flush."""
+        try:
+            self._save(batch)
+        except OperationalError:
+            logger.exception(
+                'Write-behind flush of %d %s failed; keeping them for the next flush',
+                len(batch), self.model.__name__,
+            )
+            return False
+        except DatabaseError:
+            # Not the database being unavailable: isolate the rows it rejects
+            saved = []
+            for index, instance in enumerate(batch):
+                try:
+                    self._save([instance])
+                except OperationalError:
+                    del batch[:index]  # keep the rest for the next flush
+                    self._flushed(saved)
+                    return False
+                except DatabaseError:
+                    logger.exception('Write-behind dropped an invalid %s: %r', self.model.__name__, instance)
+                else:
+                    saved.append(instance)
+            batch = saved
+        self._flushed(batch)
+        return True
+
+    def _flushed(self, batch):
+        if self.on_flush is None or not batch:
+            return
+        try:
+            self.on_flush(batch)
+        except Exception:
+            logger.exception('Write-behind on_flush for %d %s failed', len(batch), self.model.__name__)
+
+
+class MailWorker:
+    """Send queued emails from one thread over a reused SMTP connection."""
+
+    def __init__(self, idle_timeout=30, batch_size=50, max_size=1000, retry_delays=(1.0, 5.0)):
+        self.idle_timeout = idle_timeout
+        self.batch_size = batch_size
+        self.retry_delays = retry_delays
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, messages):
+        """Queue ``messages``; when the queue is full (SMTP down) they are logged and dropped."""
+        self._ensure_started()
+        for message in messages:
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                logger.error('Mail queue is full, dropping the notification %r to %s', message.subject, message.to)
+
+    def shutdown(self, timeout=10):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mail-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        connection = None
+        stop = False
+        while not stop:
+            try:
+                message = self._queue.get(timeout=self.idle_timeout if connection else None)
+            except queue.Empty:
+                connection = _close(connection)
+                continue
+
+            batch = []
+            while message is not None:
+                if message is _STOP:
+                    stop = True
+                    break
+                batch.append(message)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    message = None
+
+            if batch:
+                connection = self._deliver(connection, batch)
+
+        _close(connection)
+
+    def _deliver(self, connection, batch):
+        """Send ``batch``, reconnecting and retrying; return the connection to reuse (or None)."""
+        for delay in (*self.retry_delays, None):
+            try:
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                connection.send_messages(batch)
+                return connection
+            except Exception:
+                connection = _close(connection)
+                if delay is None:
+                    logger.exception('Sending %d notification emails failed, dropping them', len(batch))
+                    return None
+                logger.warning(
+                    'Sending %d notification emails failed, retrying in %ss', len(batch), delay, exc_info=True,
+                )
+                time.sleep(delay)
+
+
+def _close(connection):
+    """Close an email connection, ignoring errors of one that already broke; return None."""
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            logger.debug('Closing the email connection failed', exc_info=True)
+    return None
+
+
+def notification_emails(messages):
+    """Build one notification email per contact message."""
+    recipients = settings.CONTACT_NOTIFY_EMAILS
+    if not recipients:
+        return []
+    return [
+        EmailMessage(
+            subject=f'[Portfolio] ข้อความจาก {message.name} {message.lastname}',
+            body=f'{message.message}\n\n-- {message.name} {message.lastname} <{message.email}>',
+            to=recipients,
+            reply_to=[message.email],
+        )
+        for message in messages
+    ]
+
+
+_mail_worker = None
+_contact_buffer = None
+_setup_lock = threading.Lock()
+
+
+def _notify_in_background(messages):
+    emails = notification_emails(messages)
+    if emails:
+        _mail_worker.send(emails)
+
+
+def get_contact_buffer():
+    global _mail_worker, _contact_buffer
+    if _contact_buffer is None:
+        with _setup_lock:
+            if _contact_buffer is None:
+                _mail_worker = MailWorker(max_size=settings.CONTACT_BUFFER_SIZE)
+                _contact_buffer = WriteBehindBuffer(
+                    ContactMessage,
+                    max_size=settings.CONTACT_BUFFER_SIZE,
+                    flush_size=settings.CONTACT_FLUSH_SIZE,
+                    flush_interval=settings.CONTACT_FLUSH_INTERVAL,
+                    on_flush=_notify_in_background,
+                )
+                atexit.register(shutdown)
+    return _contact_buffer
+
+
+def submit_contact_message(message):
+    """
+    Persist ``message`` and notify, in the background when enabled.
+    Return False when the message was neither stored nor sent, so the
+    visitor can be told to try again.
+    """
+    if settings.CONTACT_WRITE_BEHIND:
+        try:
+            get_contact_buffer().submit(message)
+        except DatabaseError:
+            logger.exception('Could not store the contact message from %s', message.email)
+            return False
+        return True
+    stored = notified = False
+    try:
+        message.save()
+        stored = True
+    except DatabaseError:
+        # Read-only deployments (immutable SQLite snapshot) still get the email
+        logger.exception('Could not store the contact message from %s', message.email)
+    emails = notification_emails([message])
+    if emails:
+        try:
+            notified = bool(get_connection(fail_silently=False).send_messages(emails))
+        except Exception:
+            logger.exception('Sending the notification for the contact message from %s failed', message.email)
+    return stored or notified
+
+
+def shutdown():
+    """Flush pending contact messages and notifications (process exit hook)."""
+    if _contact_buffer is not None:
+        _contact_buffer.shutdown()
+    if _mail_worker is not None:
+        _mail_worker.shutdown()
@@ -2,15 +2,32 @@
 ASGI config for portfolio project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with uvicorn, for example::
+
+    DJANGO_ENV=production gunicorn portfolio.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import sys
+from pathlib import Path
 
-from django.core.asgi import get_asgi_application
+# Add the project directory to Python path
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings')
+# Pick the settings module from DJANGO_ENV, like portfolio/settings/__init__.py
+# (unknown values fall back to development there as well)
+SETTINGS_MODULES = {
+    'production': 'portfolio.settings.production',
+    'public': 'portfolio.settings.public',
+    'testing': 'portfolio.settings.testing',
+}
+env = os.environ.get('DJANGO_ENV', 'development')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS_MODULES.get(env, 'portfolio.settings.development'))
+
+from django.core.asgi import get_asgi_application
 
 application = get_asgi_application()
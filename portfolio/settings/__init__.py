@@ -5,14 +5,21 @@ Automatically loads appropriate settings based on environment.
 
 import os
 
-# Determine which settings to use
-env = os.environ.get('DJANGO_ENV', 'development')
+# Determine which settings to use. When DJANGO_SETTINGS_MODULE already
+# names a submodule (e.g. portfolio.settings.production), follow it so the
+# development settings are not imported as a side effect.
+_module = os.environ.get('DJANGO_SETTINGS_MODULE', '')
+_default_env = _module.rpartition('.')[2] if _module.startswith(__name__ + '.') else 'development'
+env = os.environ.get('DJANGO_ENV', _default_env)
 
 if env == 'production':
     from .production import *
+elif env == 'public':
+    from .public import *
 elif env == 'testing':
     from .testing import *
 else:
     from .development import *
 
-print(f"⚙️  Loaded settings: {env}")
+if env not in ('production', 'public'):
+    print(f"⚙️  Loaded settings: {env}")
@@ -5,6 +5,7 @@ Common settings that apply to all environments.
 
 from pathlib import Path
 import os
+import tempfile
 # Remove decouple import since it's not installed yet
 # from decouple import config
 
@@ -26,29 +27,42 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',  # Server-Timing and /metrics
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files
+    'main.middleware.AsyncWhiteNoiseMiddleware',  # For static files
+    'main.middleware.CompressionMiddleware',  # br/zstd/gzip for dynamic responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.QueryPlanMiddleware',  # EXPLAIN checks when QUERY_PLAN_CHECK is set
 ]
 
 ROOT_URLCONF = 'portfolio.urls'
 
+# Project templates are minified once, when the cached loader compiles
+# them (see main/template_minify.py)
+TEMPLATE_LOADERS = [
+    ('django.template.loaders.cached.Loader', [
+        'main.template_minify.FilesystemLoader',
+        'main.template_minify.AppDirectoriesLoader',
+    ]),
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that times renders for Server-Timing (main/metrics.py)
+        'BACKEND': 'main.metrics.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -84,16 +98,126 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
-# WhiteNoise configuration
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise configuration - hashed, compressed static files. Django 5.1
+# only reads STORAGES (STATICFILES_STORAGE was removed). Missing manifest
+# entries fall back to the plain name instead of raising.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MANIFEST_STRICT = False
+
+# Bundled page templates and assets (manage.py build_assets, before collectstatic)
+ASSET_BUILD_ROOT = os.path.join(BASE_DIR, 'build', 'assets')
 
-# Media files (for future use - user uploads)
+# Media files - user uploads (project images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Responsive image derivatives (see main/images.py). Sources are resized to
+# these widths and offered as IMAGE_FORMATS, with a JPEG (or PNG) fallback
+IMAGE_WIDTHS = (320, 640, 960, 1280, 1920)
+IMAGE_FORMATS = ('avif', 'webp')
+IMAGE_QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 80, 'png': 100}  # png is lossless
+IMAGE_CACHE_ROOT = os.environ.get('IMAGE_CACHE_ROOT', os.path.join(BASE_DIR, 'build', 'images'))
+# Cache lifetime of derivative URLs without the current ?v= source digest
+IMAGE_MAX_AGE = 60 * 60
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache - per-process memory cache (development/testing use DummyCache).
+# Page-cache tag versions must be seen by every worker process, so they
+# live in a cache shared through the filesystem; point 'tags' at Redis or
+# Memcached when the workers run on more than one host.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'portfolio',
+    },
+    'tags': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'PAGE_CACHE_TAG_LOCATION', os.path.join(tempfile.gettempdir(), 'portfolio-page-cache-tags'),
+        ),
+    },
+}
+
+# Full-page cache for the public pages (see main/page_cache.py)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True') == 'True'
+PAGE_CACHE_ALIAS = 'default'
+PAGE_CACHE_TAG_ALIAS = 'tags'
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Response compression (see main/compression.py). Encodings in server
+# preference order; zstd is used only when the zstandard package is installed
+COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')
+COMPRESSION_MIN_SIZE = 512
+# (normal, fast) level per encoding; fast is used for streams and under load
+COMPRESSION_LEVELS = {'br': (5, 1), 'zstd': (6, 1), 'gzip': (6, 1)}
+# One-minute load average per CPU above which the fast levels are used
+COMPRESSION_PRESSURE_LOAD = float(os.environ.get('COMPRESSION_PRESSURE_LOAD', 1.0))
+
+# Students page - keyset pagination and streaming render
+STUDENTS_PAGE_SIZE = int(os.environ.get('STUDENTS_PAGE_SIZE', 50))
+STUDENTS_MAX_PAGE_SIZE = 500
+STUDENTS_STREAM_CHUNK_SIZE = 500
+# /api/students/ page size (?limit=) - see main/api.py
+STUDENTS_API_PAGE_SIZE = 1000
+STUDENTS_API_MAX_PAGE_SIZE = 10_000
+# POST /api/students/batch (main/batch.py): rows per transaction, and the
+# bearer token for upstream systems (staff sessions work without it)
+STUDENTS_BATCH_CHUNK_SIZE = 500
+STUDENTS_API_TOKEN = os.environ.get('STUDENTS_API_TOKEN', '')
+# Read-only Students snapshot from manage.py build_snapshot (main/snapshot.py);
+# only the public settings, whose database cannot change, serve from it. It
+# sits next to db.sqlite3 so it ships with the functions like the database
+STUDENTS_SNAPSHOT = False
+STUDENTS_SNAPSHOT_PATH = os.environ.get(
+    'STUDENTS_SNAPSHOT_PATH', os.path.join(BASE_DIR, 'students.snapshot'),
+)
+# Width of the student_id ranges in the materialized statistics (main/stats.py);
+# 10-digit ids are grouped by their first two digits
+STUDENT_STATS_RANGE_SIZE = 100_000_000
+
+# Students admin (see main/admin.py): filtered counts stop at ADMIN_COUNT_LIMIT
+# and bulk actions change ADMIN_BULK_CHUNK_SIZE rows per statement
+ADMIN_COUNT_LIMIT = 10_000
+ADMIN_BULK_CHUNK_SIZE = 500
+
+# Query-plan guard (see main/query_plans.py): 'warn' logs and 'raise' fails
+# main/admin queries that scan or temp-sort a table of QUERY_PLAN_MIN_ROWS rows
+QUERY_PLAN_CHECK = os.environ.get('QUERY_PLAN_CHECK', '')
+QUERY_PLAN_MIN_ROWS = 10_000
+
+# Route budgets (see main/budgets.py): the ms budgets are multiplied by this;
+# 0 checks only queries and allocations (shared CI runners)
+ROUTE_BUDGET_MS_SCALE = float(os.environ.get('ROUTE_BUDGET_MS_SCALE', 1.0))
+
+# Multiplication tables (see main/multiplication.py): the for-loop form's
+# number, and the size of the public /for-loop/table/ endpoint
+MULTIPLICATION_NUMBER_MAX = 100
+MULTIPLICATION_TABLE_MAX_ROWS = 10_000
+MULTIPLICATION_TABLE_MAX_COLUMNS = 100
+MULTIPLICATION_TABLE_MAX_AGE = 60 * 60 * 24
+
+# Contact form - write-behind persistence and notifications (see main/write_behind.py)
+CONTACT_WRITE_BEHIND = True
+CONTACT_BUFFER_SIZE = 1000
+CONTACT_FLUSH_SIZE = 50
+CONTACT_FLUSH_INTERVAL = 2.0
+CONTACT_NOTIFY_EMAILS = [
+    address.strip() for address in os.environ.get('CONTACT_NOTIFY_EMAILS', '').split(',') if address.strip()
+]
+
+# Request metrics - /metrics accepts staff sessions or this bearer token
+# (for Prometheus scrapers); see main/metrics.py
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Admin URL (can be customized via environment variable)
 ADMIN_URL = os.environ.get('ADMIN_URL', 'admin/')
 
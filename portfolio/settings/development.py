@@ -33,6 +33,9 @@ INSTALLED_APPS += [
     # 'django_extensions',  # Uncomment if installed
 ]
 
+# Warn about queries that scan or sort large tables (main/query_plans.py)
+QUERY_PLAN_CHECK = os.environ.get('QUERY_PLAN_CHECK', 'warn')
+
 # Development middleware
 # if 'debug_toolbar' in INSTALLED_APPS:
 #     MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
@@ -42,11 +45,19 @@ INSTALLED_APPS += [
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'tags': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
 
 # Static files - Django serves them in development
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # Development logging - more verbose
 LOGGING['handlers']['console']['level'] = 'DEBUG'
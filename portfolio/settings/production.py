@@ -5,6 +5,7 @@ Optimized for Vercel deployment.
 
 import os
 from .base import *
+from ..sqlite import sqlite_database
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
@@ -18,12 +19,16 @@ ALLOWED_HOSTS = [
     '*'
 ]
 
-# Database - SQLite for Vercel
+# Database - SQLite for Vercel, tuned and with persistent connections
+# (portfolio/sqlite.py). SQLITE_READ_ONLY=True opens the file as an
+# immutable snapshot instead of switching it to WAL; only the public entry
+# point (index.py) sets it, since the admin and the batch API write.
+# SQLITE_PATH points at another copy of the database (index_admin.py uses
+# one in the temporary directory on a read-only filesystem).
+SQLITE_PATH = os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3')
+SQLITE_READ_ONLY = os.environ.get('SQLITE_READ_ONLY', 'False') == 'True'
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': sqlite_database(SQLITE_PATH, read_only=SQLITE_READ_ONLY),
 }
 
 # Static files configuration
@@ -36,8 +41,10 @@ STATICFILES_DIRS = [
 
 # Middleware configuration
 MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.middleware.AsyncWhiteNoiseMiddleware',
+    'main.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,8 +53,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# Static files storage
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Use the templates rewritten by manage.py build_assets, and collect their
+# bundles, when the build ran; otherwise the inline CSS/JS stays in place
+ASSET_BUILD_TEMPLATES = os.path.join(ASSET_BUILD_ROOT, 'templates')
+if os.path.isdir(ASSET_BUILD_TEMPLATES):
+    TEMPLATES[0]['DIRS'] = [ASSET_BUILD_TEMPLATES, *TEMPLATES[0]['DIRS']]
+    STATICFILES_DIRS = [*STATICFILES_DIRS, os.path.join(ASSET_BUILD_ROOT, 'static')]
 
 # Security settings (relaxed for Vercel)
 SECURE_SSL_REDIRECT = False
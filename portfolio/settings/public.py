@@ -0,0 +1,61 @@
+"""
+Slim settings for the public serverless entry point (index.py).
+Only the apps the public pages need are installed, so a cold start does
+not import the admin, auth, sessions or messages stacks. Vercel routes
+/admin/ to index_admin.py, which runs with the full production settings.
+"""
+
+import os
+import tempfile
+
+from .production import *
+from ..sqlite import sqlite_database
+
+# The public pages only read, so open the database as an immutable
+# snapshot: no locking, no journal, works on a read-only filesystem
+SQLITE_READ_ONLY = os.environ.get('SQLITE_READ_ONLY', 'True') == 'True'
+DATABASES = {
+    'default': sqlite_database(SQLITE_PATH, read_only=SQLITE_READ_ONLY),
+}
+
+INSTALLED_APPS = [
+    'django.contrib.staticfiles',
+    'main',
+]
+
+MIDDLEWARE = [
+    'main.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'main.middleware.AsyncWhiteNoiseMiddleware',
+    'main.middleware.CompressionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+            'loaders': TEMPLATE_LOADERS,
+        },
+    },
+]
+
+# Bundled templates from manage.py build_assets (see production.py)
+if os.path.isdir(ASSET_BUILD_TEMPLATES):
+    TEMPLATES[0]['DIRS'] = [ASSET_BUILD_TEMPLATES]
+
+# Serve the students pages from the build's snapshot (main/snapshot.py);
+# it is ignored when missing or built from another database
+STUDENTS_SNAPSHOT = SQLITE_READ_ONLY and os.environ.get('STUDENTS_SNAPSHOT', 'True') == 'True'
+
+# Serverless functions freeze after the response, so no background writers
+CONTACT_WRITE_BEHIND = False
+
+# Only the temporary directory is writable on serverless platforms
+IMAGE_CACHE_ROOT = os.environ.get('IMAGE_CACHE_ROOT', os.path.join(tempfile.gettempdir(), 'image-cache'))
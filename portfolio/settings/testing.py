@@ -26,11 +26,17 @@ SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = False
 
+# Contact form - save and notify inline so tests see the rows and mail
+CONTACT_WRITE_BEHIND = False
+
 # Cache settings for testing
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'tags': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
 
 # Password hashers - faster for testing
@@ -39,7 +45,12 @@ PASSWORD_HASHERS = [
 ]
 
 # Static files - disable for testing
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # Testing logging - minimal
 LOGGING = {
@@ -425,30 +425,6 @@ window.addEventListener('scroll', function() {
     }
 });
 
-// Loading progress for images
-document.addEventListener('DOMContentLoaded', function() {
-    const images = document.querySelectorAll('img');
-    let loadedImages = 0;
-    
-    images.forEach(img => {
-        if (img.complete) {
-            loadedImages++;
-        } else {
-            img.addEventListener('load', () => {
-                loadedImages++;
-                if (loadedImages === images.length) {
-                    // All images loaded
-                    document.body.classList.add('images-loaded');
-                }
-            });
-        }
-    });
-    
-    if (loadedImages === images.length) {
-        document.body.classList.add('images-loaded');
-    }
-});
-
 // Mouse move parallax effect
 document.addEventListener('mousemove', function(e) {
     const floatingIcons = document.querySelectorAll('.floating-icon');